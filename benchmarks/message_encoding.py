@@ -0,0 +1,91 @@
+"""Measures the serialisation throughput of source completed plate event messages for each of the
+available message codecs.
+
+Run from the project root with:
+
+    python -m benchmarks.message_encoding --iterations 2000
+"""
+
+import argparse
+import time
+from typing import Any, Dict, List
+from uuid import uuid4
+
+from lighthouse.constants import PLATE_EVENT_SOURCE_COMPLETED
+from lighthouse.messages.codecs import CODECS, PreSerialised
+from lighthouse.messages.message import Message
+
+
+def build_message_content(number_of_samples: int) -> Dict[str, Any]:
+    """Builds the content of a source completed event message with the given number of samples.
+
+    Arguments:
+        number_of_samples {int} -- The number of sample subjects in the message.
+
+    Returns:
+        {Dict[str, Any]} -- The message content.
+    """
+    subjects: List[Dict[str, str]] = [
+        PreSerialised(
+            {
+                "role_type": "robot",
+                "subject_type": "robot",
+                "friendly_name": "BKRB0001",
+                "uuid": str(uuid4()),
+            }
+        ),
+        {
+            "role_type": "cherrypicking_source_labware",
+            "subject_type": "plate",
+            "friendly_name": "AP-rna-00110029",
+            "uuid": str(uuid4()),
+        },
+    ]
+    subjects.extend(
+        {
+            "role_type": "sample",
+            "subject_type": "sample",
+            "friendly_name": f"MCM{index:05d}__AP-rna-00110029_A{index:02d}__AP__Positive",
+            "uuid": str(uuid4()),
+        }
+        for index in range(number_of_samples)
+    )
+    return {
+        "event": {
+            "uuid": str(uuid4()),
+            "event_type": PLATE_EVENT_SOURCE_COMPLETED,
+            "occured_at": "2020-11-20T10:12:32",
+            "user_identifier": "user1",
+            "subjects": subjects,
+            "metadata": {},
+        },
+        "lims": "LH_BENCHMARK",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'codec':<8} {'samples':>7} {'messages/s':>12} {'MB/s':>8}")
+    for number_of_samples in (96, 384):
+        content = build_message_content(number_of_samples)
+        for codec in CODECS.values():
+            message = Message(content, codec)
+            payload_size = len(message.payload().encode())
+
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                message.payload()
+            elapsed = time.perf_counter() - start
+
+            rate = args.iterations / elapsed
+            print(
+                f"{codec.name:<8} {number_of_samples:>7} {rate:>12,.0f} "
+                f"{rate * payload_size / 1_000_000:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
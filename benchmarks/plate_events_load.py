@@ -0,0 +1,148 @@
+"""Drives /plate-events/create at a target request rate and reports the latency distribution.
+
+By default requests are sent to an in-process app configured by EVE_SETTINGS (development.py if
+unset) which publishes to the in-memory broker, so no RabbitMQ server is needed. Use --url to
+benchmark a running lighthouse instead. Each request carries a unique event_id so that none of
+them are treated as robot retries.
+
+Run from the project root with:
+
+    python -m benchmarks.plate_events_load --rate 50 --duration 30
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import requests
+
+from lighthouse.constants import PLATE_EVENT_SOURCE_NOT_RECOGNISED
+
+ENDPOINT = "/plate-events/create"
+
+
+def in_process_sender() -> Callable[[Dict[str, str]], int]:
+    """Creates an app which publishes to the in-memory broker and returns a function which sends
+    requests to it.
+
+    Returns:
+        {Callable[[Dict[str, str]], int]} -- Sends a request and returns the response status code.
+    """
+    from lighthouse import create_app
+    from lighthouse.messages.in_memory import clear_published_messages
+
+    os.environ.setdefault("EVE_SETTINGS", "development.py")
+    app = create_app()
+    app.config["RMQ_IN_MEMORY"] = True
+    clear_published_messages()
+
+    clients = threading.local()
+
+    def send(params: Dict[str, str]) -> int:
+        if not hasattr(clients, "client"):
+            clients.client = app.test_client()
+        return clients.client.get(ENDPOINT, query_string=params).status_code
+
+    return send
+
+
+def http_sender(url: str) -> Callable[[Dict[str, str]], int]:
+    """Returns a function which sends requests to a running lighthouse.
+
+    Arguments:
+        url {str} -- The base URL of lighthouse, e.g. http://localhost:5000
+
+    Returns:
+        {Callable[[Dict[str, str]], int]} -- Sends a request and returns the response status code.
+    """
+    sessions = threading.local()
+
+    def send(params: Dict[str, str]) -> int:
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+        return sessions.session.get(f"{url}{ENDPOINT}", params=params).status_code
+
+    return send
+
+
+def run(
+    send: Callable[[Dict[str, str]], int],
+    params: Dict[str, str],
+    rate: float,
+    duration: float,
+    concurrency: int,
+) -> Tuple[List[float], int]:
+    """Sends requests on an open-loop schedule of `rate` requests per second. Latency is measured
+    from when each request was scheduled, so queueing behind slow requests is included.
+
+    Returns:
+        {Tuple[List[float], int]} -- The latency of each request in seconds and the number of
+        requests which did not respond with 200.
+    """
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed_send(scheduled_at: float) -> None:
+        nonlocal errors
+        status_code: Optional[int] = None
+        try:
+            status_code = send({**params, "event_id": str(uuid4())})
+        finally:
+            latency = time.perf_counter() - scheduled_at
+            with lock:
+                latencies.append(latency)
+                if status_code != 200:
+                    errors += 1
+
+    number_of_requests = int(rate * duration)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for index in range(number_of_requests):
+            scheduled_at = start + index / rate
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(timed_send, scheduled_at)
+
+    return latencies, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=20, help="requests per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--url", help="base URL of a running lighthouse")
+    parser.add_argument("--event-type", default=PLATE_EVENT_SOURCE_NOT_RECOGNISED)
+    parser.add_argument("--robot", default="BKRB0001")
+    parser.add_argument("--user-id", default="benchmark")
+    parser.add_argument("--barcode", default="")
+    args = parser.parse_args()
+
+    send = http_sender(args.url) if args.url else in_process_sender()
+    params = {"event_type": args.event_type, "robot": args.robot, "user_id": args.user_id}
+    if args.barcode:
+        params["barcode"] = args.barcode
+
+    start = time.perf_counter()
+    latencies, errors = run(send, params, args.rate, args.duration, args.concurrency)
+    elapsed = time.perf_counter() - start
+
+    if len(latencies) < 2:
+        print("Not enough requests were sent to report latencies")
+        return
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f"requests: {len(latencies)}  errors: {errors}  rate: {len(latencies) / elapsed:.1f}/s")
+    for percentile in (50, 95, 99):
+        print(f"p{percentile}: {percentiles[percentile - 1] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
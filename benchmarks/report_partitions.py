@@ -0,0 +1,117 @@
+"""Measures how long the positive samples in the report window take to gather - the Mongo query,
+declaration join and cherrypicked check - in one process, and partitioned by centre and day tested
+across pools of worker processes.
+
+Synthetic samples are added to the samples collection of the app configured by EVE_SETTINGS
+(development.py if unset) and removed again afterwards. As when creating a report, Mongo and the
+warehouses configured there need to be available.
+
+Run from the project root with:
+
+    python -m benchmarks.report_partitions --samples 200000 --centres 8 --parallelism 2 4 8
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from lighthouse.constants import (
+    FIELD_COORDINATE,
+    FIELD_DATE_TESTED,
+    FIELD_PLATE_BARCODE,
+    FIELD_RESULT,
+    FIELD_ROOT_SAMPLE_ID,
+    FIELD_SOURCE,
+)
+
+SOURCE_PREFIX = "benchmark-centre-"
+
+
+def build_samples(
+    number_of_samples: int, number_of_centres: int, window_size: int
+) -> List[Dict[str, Any]]:
+    """Builds samples spread over the centres and the days of the report window, a tenth of which
+    are positive.
+
+    Arguments:
+        number_of_samples {int} -- The number of samples to build.
+        number_of_centres {int} -- The number of centres the samples are from.
+        window_size {int} -- The report window size, in days.
+
+    Returns:
+        {List[Dict[str, Any]]} -- The samples.
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    coordinates = [f"{row}{column:02}" for row in "ABCDEFGH" for column in range(1, 13)]
+
+    samples = []
+    for index in range(number_of_samples):
+        date_tested = today - timedelta(days=random.randint(0, window_size), hours=-1)
+        samples.append(
+            {
+                FIELD_SOURCE: f"{SOURCE_PREFIX}{index % number_of_centres}",
+                FIELD_ROOT_SAMPLE_ID: f"BENCH{index:08}",
+                FIELD_PLATE_BARCODE: f"BENCH-{index // len(coordinates):06}",
+                FIELD_COORDINATE: coordinates[index % len(coordinates)],
+                FIELD_RESULT: "Positive" if random.random() < 0.1 else "Negative",
+                FIELD_DATE_TESTED: date_tested.strftime("%Y-%m-%d %H:%M:%S UTC"),
+            }
+        )
+
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--centres", type=int, default=8)
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+
+    os.environ.setdefault("EVE_SETTINGS", "development.py")
+
+    from lighthouse import create_app
+    from lighthouse.helpers.reports import (
+        add_cherrypicked_column,
+        get_all_positive_samples,
+        join_samples_declarations,
+    )
+    from lighthouse.jobs.reports import get_positive_samples_in_parallel
+
+    app = create_app(run_scheduler=False)
+    with app.app_context():
+        samples_collection = app.data.driver.db.samples
+        samples_collection.insert_many(
+            build_samples(args.samples, args.centres, app.config["REPORT_WINDOW_SIZE"])
+        )
+
+        try:
+            start = time.perf_counter()
+            positive_samples_df = get_all_positive_samples(samples_collection)
+            positive_samples_df = join_samples_declarations(positive_samples_df)
+            positive_samples_df = add_cherrypicked_column(positive_samples_df)
+            in_process = time.perf_counter() - start
+            print(
+                f"in process: {len(positive_samples_df.index)} positive samples in "
+                f"{in_process:.2f}s"
+            )
+
+            for parallelism in args.parallelism:
+                start = time.perf_counter()
+                positive_samples_df = get_positive_samples_in_parallel(
+                    samples_collection, parallelism
+                )
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{parallelism} processes: {len(positive_samples_df.index)} positive samples "
+                    f"in {elapsed:.2f}s ({in_process / elapsed:.2f}x)"
+                )
+        finally:
+            samples_collection.delete_many({FIELD_SOURCE: {"$regex": f"^{SOURCE_PREFIX}"}})
+
+
+if __name__ == "__main__":
+    main()
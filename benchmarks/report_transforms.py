@@ -0,0 +1,136 @@
+"""Compares the time and memory taken by the positive samples report's DataFrame transforms - the
+coordinate unpadding, 'plate and well' column and cherrypicked merge - when done row by row on
+object columns and when vectorised on categorical columns. No services are needed.
+
+Run from the project root with:
+
+    python -m benchmarks.report_transforms --rows 500000
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, Tuple
+
+import pandas as pd  # type: ignore
+from pandas import DataFrame  # type: ignore
+
+from lighthouse.constants import (
+    FIELD_COORDINATE,
+    FIELD_PLATE_BARCODE,
+    FIELD_RESULT,
+    FIELD_ROOT_SAMPLE_ID,
+    FIELD_SOURCE,
+)
+from lighthouse.helpers.reports import categorise_columns, unpad_coordinate
+
+
+def build_frames(rows: int) -> Tuple[DataFrame, DataFrame]:
+    """Builds positive samples as they come out of Mongo, and the cherrypicked samples among them
+    as they come out of the warehouses.
+
+    Arguments:
+        rows {int} -- The number of positive samples.
+
+    Returns:
+        {Tuple[DataFrame, DataFrame]} -- The positive samples and the cherrypicked samples.
+    """
+    coordinates = [f"{row}{column:02}" for row in "ABCDEFGH" for column in range(1, 13)]
+    positive_samples_df = pd.DataFrame(
+        {
+            FIELD_SOURCE: [f"Centre {random.randint(1, 8)}" for _ in range(rows)],
+            FIELD_ROOT_SAMPLE_ID: [f"RSID{index:08}" for index in range(rows)],
+            FIELD_PLATE_BARCODE: [f"DN{index // 96:06}" for index in range(rows)],
+            FIELD_COORDINATE: [coordinates[index % 96] for index in range(rows)],
+            FIELD_RESULT: ["Positive"] * rows,
+        }
+    )
+    cherrypicked_samples_df = positive_samples_df.sample(frac=0.2)[
+        [FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, FIELD_COORDINATE]
+    ].copy()
+    cherrypicked_samples_df[FIELD_COORDINATE] = cherrypicked_samples_df[FIELD_COORDINATE].map(
+        unpad_coordinate
+    )
+    cherrypicked_samples_df["Result_lower"] = "positive"
+    cherrypicked_samples_df["LIMS submission"] = "Yes"
+
+    return positive_samples_df, cherrypicked_samples_df
+
+
+def row_by_row(positive_samples_df: DataFrame, cherrypicked_samples_df: DataFrame) -> DataFrame:
+    """The transforms as they were, unpadding each coordinate in turn on object columns."""
+    positive_samples_df[FIELD_COORDINATE] = positive_samples_df[FIELD_COORDINATE].map(
+        lambda coord: unpad_coordinate(coord)
+    )
+    positive_samples_df["plate and well"] = (
+        positive_samples_df[FIELD_PLATE_BARCODE] + ":" + positive_samples_df[FIELD_COORDINATE]
+    )
+    positive_samples_df["Result_lower"] = positive_samples_df[FIELD_RESULT].str.lower()
+    merged = positive_samples_df.merge(
+        cherrypicked_samples_df,
+        how="left",
+        on=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, "Result_lower", FIELD_COORDINATE],
+    )
+    merged = merged.fillna({"LIMS submission": "No"})
+
+    return merged.drop(columns=["Result_lower"])
+
+
+def vectorised(positive_samples_df: DataFrame, cherrypicked_samples_df: DataFrame) -> DataFrame:
+    """The transforms as get_all_positive_samples and add_cherrypicked_column now do them."""
+    positive_samples_df[FIELD_COORDINATE] = (
+        positive_samples_df[FIELD_COORDINATE]
+        .astype("category")
+        .str.replace(r"0(\d+)$", r"\1", regex=True)
+    )
+    positive_samples_df["plate and well"] = (
+        positive_samples_df[FIELD_PLATE_BARCODE] + ":" + positive_samples_df[FIELD_COORDINATE]
+    )
+    positive_samples_df = categorise_columns(positive_samples_df)
+    merged = positive_samples_df.merge(
+        cherrypicked_samples_df,
+        how="left",
+        left_on=[
+            FIELD_ROOT_SAMPLE_ID,
+            FIELD_PLATE_BARCODE,
+            positive_samples_df[FIELD_RESULT].str.lower().rename("Result_lower"),
+            FIELD_COORDINATE,
+        ],
+        right_on=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, "Result_lower", FIELD_COORDINATE],
+    )
+    merged["LIMS submission"] = merged["LIMS submission"].fillna("No")
+
+    return categorise_columns(merged.drop(columns=["Result_lower"]))
+
+
+def measure(
+    transform: Callable[[DataFrame, DataFrame], DataFrame],
+    positive_samples_df: DataFrame,
+    cherrypicked_samples_df: DataFrame,
+) -> Tuple[float, int]:
+    """Times a transform of a copy of the positive samples.
+
+    Returns:
+        {Tuple[float, int]} -- The time taken in seconds and the memory taken by each row of the
+        result in bytes.
+    """
+    start = time.perf_counter()
+    report_df = transform(positive_samples_df.copy(), cherrypicked_samples_df)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, int(report_df.memory_usage(deep=True).sum()) // len(report_df.index)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    positive_samples_df, cherrypicked_samples_df = build_frames(args.rows)
+    for name, transform in (("row by row", row_by_row), ("vectorised", vectorised)):
+        elapsed, bytes_per_row = measure(transform, positive_samples_df, cherrypicked_samples_df)
+        print(f"{name}: {elapsed:.2f}s, {bytes_per_row} bytes per row")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ from eve import Eve  # type: ignore
 from flask_apscheduler import APScheduler  # type: ignore
 from lighthouse.authorization import APIKeyAuth
 from lighthouse.validators.samples_declarations import (
+    inserted_samples_declarations_callback,
     pre_samples_declarations_post_callback,
     post_samples_declarations_post_callback,
     SamplesDeclarationsValidator,
@@ -14,10 +15,11 @@ from lighthouse.validators.samples_declarations import (
 scheduler = APScheduler()
 
 
-def create_app() -> Eve:
+def create_app(run_scheduler: bool = True) -> Eve:
     app = Eve(__name__, validator=SamplesDeclarationsValidator, auth=APIKeyAuth)
     app.on_pre_POST_samples_declarations += pre_samples_declarations_post_callback
     app.on_post_POST_samples_declarations += post_samples_declarations_post_callback
+    app.on_inserted_samples_declarations += inserted_samples_declarations_callback
 
     # setup logging
     logging.config.dictConfig(app.config["LOGGING"])
@@ -26,13 +28,20 @@ def create_app() -> Eve:
     from lighthouse.blueprints import cherrypicked_plates
     from lighthouse.blueprints import reports
     from lighthouse.blueprints import plate_events
+    from lighthouse.blueprints import stats
 
     app.register_blueprint(plates.bp)
     app.register_blueprint(cherrypicked_plates.bp)
     app.register_blueprint(reports.bp)
     app.register_blueprint(plate_events.bp)
+    app.register_blueprint(stats.bp)
 
-    if app.config.get("SCHEDULER_RUN", False):
+    from lighthouse.commands import COMMANDS
+
+    for command in COMMANDS:
+        app.cli.add_command(command)
+
+    if run_scheduler and app.config.get("SCHEDULER_RUN", False):
         scheduler.init_app(app)
         scheduler.start()
 
@@ -6,8 +6,10 @@ from flask import Blueprint, request
 from flask_cors import CORS  # type: ignore
 
 from lighthouse.messages.broker import Broker  # type: ignore
+from lighthouse.helpers.mongo_db import claim_plate_event, release_plate_event
 from lighthouse.helpers.plate_events import (
     construct_event_message,
+    get_event_key,
     get_routing_key,
 )
 
@@ -40,15 +42,30 @@ def create_plate_event() -> Tuple[Dict[str, Any], int]:
         # By this stage we know the event type is valid as we have been able to construct a message
         routing_key = get_routing_key(event_type)
 
+        # Robots retry the request when they time out waiting for a response, so only publish the
+        # first of any repeated events
+        event_key = get_event_key(event_type, request.args)
+        if not claim_plate_event(event_key):
+            logger.info(
+                f"Acknowledging a duplicate '{event_type}' plate event message without publishing"
+            )
+            return {"errors": []}, HTTPStatus.OK
+
         logger.info("Attempting to publish the constructed plate event message")
-        broker = Broker()
-        broker.connect()
+        try:
+            broker = Broker()
+            broker.connect()
+        except Exception:
+            release_plate_event(event_key)
+            raise
+
         try:
             broker.publish(message, routing_key)
             broker.close_connection()
             logger.info(f"Successfully published a '{event_type}' plate event message")
             return ({"errors": []}, HTTPStatus.OK)
         except Exception:
+            release_plate_event(event_key)
             broker.close_connection()
             raise
     except Exception as e:
@@ -1,11 +1,25 @@
 import logging
+import mimetypes
+from datetime import datetime, timezone
 from http import HTTPStatus
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
 
-from flask import Blueprint, request
+from flask import Blueprint, request, url_for
+from flask import current_app as app
 from flask_cors import CORS  # type: ignore
-from lighthouse.helpers.reports import delete_reports, get_reports_details
-from lighthouse.jobs.reports import create_report
+from lighthouse.constants import REPORT_JOB_STATUS_COMPLETED
+from lighthouse.helpers.report_jobs import enqueue_report_job, get_report_job
+from lighthouse.helpers.report_runs import get_report_runs
+from lighthouse.helpers.reports import (
+    delete_reports,
+    get_catalogued_reports_details,
+    get_positive_samples_page,
+    get_report_path,
+    get_reports_details,
+    validate_report_formats,
+)
+from lighthouse.jobs.reports import run_report_job_in_background
+from werkzeug.wsgi import wrap_file
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +29,101 @@ CORS(bp)
 
 @bp.route("/reports", methods=["GET"])
 def get_reports() -> Tuple[Dict[str, Any], int]:
+    """A Flask route which lists the reports, newest first. The list can be paginated with the
+    "page" and "max_results" parameters, in which case the pagination details are returned in
+    "_meta"; otherwise all reports are listed.
+    """
     logger.debug("Getting reports")
     try:
-        return {"reports": get_reports_details()}, HTTPStatus.OK
+        if "page" not in request.args and "max_results" not in request.args:
+            return {"reports": get_reports_details()}, HTTPStatus.OK
+
+        page = request.args.get("page", 1, type=int)
+        max_results = min(
+            request.args.get("max_results", app.config["PAGINATION_DEFAULT"], type=int),
+            app.config["PAGINATION_LIMIT"],
+        )
+        if page < 1 or max_results < 1:
+            return (
+                {"errors": ["page and max_results must be positive integers"]},
+                HTTPStatus.BAD_REQUEST,
+            )
+
+        reports_details, total = get_catalogued_reports_details(page, max_results)
+        return (
+            {
+                "reports": reports_details,
+                "_meta": {"page": page, "max_results": max_results, "total": total},
+            },
+            HTTPStatus.OK,
+        )
+    except Exception as e:
+        logger.exception(e)
+
+        return {"errors": [type(e).__name__]}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@bp.route("/reports/positives", methods=["GET"])
+def get_positive_samples_endpoint() -> Tuple[Dict[str, Any], int]:
+    """A Flask route which returns a page of the positive samples in the report, in order of date
+    tested. The samples can be filtered with the "centre", "date_from" and "date_to" (YYYY-MM-DD,
+    date_to being exclusive), "has_location" (true or false) and "lims_submission" (Yes or No)
+    parameters. The page size is set with "max_results", and the next page is found by passing the
+    "next" cursor of "_meta" as the "after" parameter.
+    """
+    errors = []
+
+    def parse_date(param: str) -> Optional[datetime]:
+        value = request.args.get(param)
+        if value is None:
+            return None
+        try:
+            return datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            errors.append(f"{param} must be a date in the format YYYY-MM-DD")
+            return None
+
+    date_from = parse_date("date_from")
+    date_to = parse_date("date_to")
+
+    has_location_param = request.args.get("has_location")
+    if has_location_param not in (None, "true", "false"):
+        errors.append("has_location must be true or false")
+
+    lims_submission = request.args.get("lims_submission")
+    if lims_submission not in (None, "Yes", "No"):
+        errors.append("lims_submission must be Yes or No")
+
+    max_results = min(
+        request.args.get("max_results", app.config["PAGINATION_DEFAULT"], type=int),
+        app.config["PAGINATION_LIMIT"],
+    )
+    if max_results < 1:
+        errors.append("max_results must be a positive integer")
+
+    if errors:
+        return {"errors": errors}, HTTPStatus.BAD_REQUEST
+
+    try:
+        positive_samples, next_cursor = get_positive_samples_page(
+            max_results,
+            after=request.args.get("after"),
+            source=request.args.get("centre"),
+            date_from=date_from,
+            date_to=date_to,
+            has_location=None if has_location_param is None else has_location_param == "true",
+            lims_submission=lims_submission,
+        )
+
+        return (
+            {
+                "positives": positive_samples,
+                "_meta": {"max_results": max_results, "next": next_cursor},
+            },
+            HTTPStatus.OK,
+        )
+    except ValueError as e:
+        return {"errors": [str(e)]}, HTTPStatus.BAD_REQUEST
     except Exception as e:
         logger.exception(e)
 
@@ -26,21 +132,132 @@ def get_reports() -> Tuple[Dict[str, Any], int]:
 
 @bp.route("/reports/new", methods=["POST"])
 def create_report_endpoint():
+    """A Flask route which starts a job creating the positive samples report, returning the job
+    which can be followed at /reports/jobs/<job_id>. The formats to create the report in can be
+    given as a comma separated "format" parameter, e.g. ?format=xlsx,parquet; otherwise the formats
+    in the REPORT_FORMATS config are created.
+    """
+    format_param = request.args.get("format", "")
+    report_formats = [report_format for report_format in format_param.split(",") if report_format]
+    errors = validate_report_formats(report_formats)
+    if errors:
+        return {"errors": errors}, HTTPStatus.BAD_REQUEST
+
+    try:
+        # the report takes minutes to create so is created in the background, unless a report is
+        # already being created in which case that job is returned. Unlike the scheduled report,
+        # the latest report is not reused so that its locations are current
+        job_id, created = enqueue_report_job(report_formats)
+        if created:
+            run_report_job_in_background(job_id, report_formats, reuse_unchanged=False)
+
+        return (
+            {"job": get_report_job(job_id)},
+            HTTPStatus.ACCEPTED,
+            {"Location": url_for("reports.get_report_job_endpoint", job_id=str(job_id))},
+        )
+    except Exception as e:
+        logger.exception(e)
+
+        return {"errors": [type(e).__name__]}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@bp.route("/reports/jobs/<job_id>", methods=["GET"])
+def get_report_job_endpoint(job_id: str) -> Tuple[Dict[str, Any], int]:
+    """A Flask route which returns the progress of a report job. Once the job has completed the
+    details of the reports created are included.
+
+    Arguments:
+        job_id {str} -- the id of the report job
+
+    Returns:
+        {Dict[str, Any]}, HTTPStatus
+    """
+    try:
+        job = get_report_job(job_id)
+        if job is None:
+            return {"errors": [f"Report job {job_id} not found"]}, HTTPStatus.NOT_FOUND
+
+        response: Dict[str, Any] = {"job": job}
+        if job["status"] == REPORT_JOB_STATUS_COMPLETED:
+            response["reports"] = get_reports_details(job["report_names"])
+
+        return response, HTTPStatus.OK
+    except Exception as e:
+        logger.exception(e)
+
+        return {"errors": [type(e).__name__]}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@bp.route("/reports/runs", methods=["GET"])
+def get_report_runs_endpoint() -> Tuple[Dict[str, Any], int]:
+    """A Flask route which returns the latest runs of the positive samples report, newest first,
+    with the wall time, peak memory and number of rows of each of their stages. The number of runs
+    is set with "max_results".
+    """
+    max_results = min(
+        request.args.get("max_results", app.config["PAGINATION_DEFAULT"], type=int),
+        app.config["PAGINATION_LIMIT"],
+    )
+    if max_results < 1:
+        return {"errors": ["max_results must be a positive integer"]}, HTTPStatus.BAD_REQUEST
+
     try:
-        report_name = create_report()
-        return {"reports": get_reports_details(report_name)}, HTTPStatus.CREATED
+        return {"runs": get_report_runs(max_results)}, HTTPStatus.OK
     except Exception as e:
         logger.exception(e)
 
         return {"errors": [type(e).__name__]}, HTTPStatus.INTERNAL_SERVER_ERROR
 
 
+@bp.route("/reports/<filename>", methods=["GET"])
+def download_report_endpoint(filename: str):
+    """A Flask route which sends a report file. The response has a strong ETag, built from the
+    file's modification time and size, so that conditional (If-None-Match) and ranged requests can
+    be answered without sending the whole file again. If REPORTS_X_ACCEL_REDIRECT_LOCATION is set
+    the file is instead sent by the web server in front of lighthouse.
+
+    Arguments:
+        filename {str} -- the filename of the report
+
+    Returns:
+        Response
+    """
+    report_path = get_report_path(filename)
+    if report_path is None:
+        return {"errors": [f"Report {filename} not found"]}, HTTPStatus.NOT_FOUND
+
+    mimetype, encoding = mimetypes.guess_type(filename)
+    if encoding == "gzip":
+        mimetype = "application/gzip"
+
+    x_accel_redirect_location = app.config["REPORTS_X_ACCEL_REDIRECT_LOCATION"]
+    if x_accel_redirect_location:
+        response = app.response_class(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = f"{x_accel_redirect_location}/{filename}"
+    else:
+        stat = report_path.stat()
+        response = app.response_class(
+            wrap_file(request.environ, open(report_path, "rb")),
+            mimetype=mimetype or "application/octet-stream",
+            direct_passthrough=True,
+        )
+        response.content_length = stat.st_size
+        response.last_modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+        response.set_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+        response.make_conditional(request, accept_ranges=True, complete_length=stat.st_size)
+
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+
+    return response
+
+
 @bp.route("/delete_reports", methods=["POST"])
 def delete_reports_endpoint():
     """A Flask route which accepts a list of report filenames and then deletes them
     from the reports path.
     This endpoint should be json and the body should be in
-    the format {"data":"filenames":["file1.xlsx","file2.xlsx", ...]}
+    the format {"data":"filenames":["file1.xlsx","file2.csv.gz", ...]}
     This is a POST request but is a destructive action but this does not need to be
     delete as it is not a REST resource.
     Arguments:
@@ -0,0 +1,51 @@
+import logging
+from datetime import datetime
+from http import HTTPStatus
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Blueprint, request
+from flask_cors import CORS  # type: ignore
+from lighthouse.helpers.positive_rollups import get_positive_counts
+from lighthouse.jobs.samples_watcher import catch_up_sample_changes
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint("stats", __name__)
+CORS(bp)
+
+
+@bp.route("/stats/positives", methods=["GET"])
+def get_positive_counts_endpoint() -> Tuple[Dict[str, Any], int]:
+    """A Flask route which returns the number of samples, positives and filtered positives tested
+    by each centre on each day, read from the positive rollups. The rollups are caught up first if
+    an import has been recorded since they were last refreshed. The counts can be filtered with the
+    "centre", "date_from" and "date_to" (YYYY-MM-DD, date_to being exclusive) parameters.
+    """
+    errors = []
+
+    def parse_date(param: str) -> Optional[datetime]:
+        value = request.args.get(param)
+        if value is None:
+            return None
+        try:
+            return datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            errors.append(f"{param} must be a date in the format YYYY-MM-DD")
+            return None
+
+    date_from = parse_date("date_from")
+    date_to = parse_date("date_to")
+    if errors:
+        return {"errors": errors}, HTTPStatus.BAD_REQUEST
+
+    try:
+        catch_up_sample_changes()
+        positive_counts = get_positive_counts(
+            source=request.args.get("centre"), date_from=date_from, date_to=date_to
+        )
+
+        return {"positives": positive_counts}, HTTPStatus.OK
+    except Exception as e:
+        logger.exception(e)
+
+        return {"errors": [type(e).__name__]}, HTTPStatus.INTERNAL_SERVER_ERROR
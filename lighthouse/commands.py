@@ -0,0 +1,75 @@
+import click
+from flask import current_app as app
+from flask.cli import with_appcontext
+from lighthouse.helpers.cherrypicked_samples import refresh_cherrypicked_samples
+from lighthouse.helpers.mongo_db import backfill_date_tested, rebuild_latest_samples_declarations
+from lighthouse.helpers.positive_rollups import rebuild_positive_rollups
+from lighthouse.helpers.reports import reconcile_report_catalogue
+from lighthouse.helpers.source_plate_summaries import rebuild_source_plate_summaries
+from lighthouse.jobs.samples_watcher import watch_samples
+
+
+@click.command("watch-samples")
+@with_appcontext
+def watch_samples_command() -> None:
+    """Keep data derived from samples up to date as samples are imported."""
+    watch_samples()
+
+
+@click.command("rebuild-source-plate-summaries")
+@with_appcontext
+def rebuild_source_plate_summaries_command() -> None:
+    """Rebuild the pre-built sample subjects of every source plate."""
+    number_of_plates = rebuild_source_plate_summaries()
+    click.echo(f"Rebuilt the summaries of {number_of_plates} source plates")
+
+
+@click.command("backfill-date-tested")
+@with_appcontext
+def backfill_date_tested_command() -> None:
+    """Set the parsed date_tested field on samples which do not have one yet."""
+    number_of_samples = backfill_date_tested(app.data.driver.db.samples)
+    click.echo(f"Set date_tested on {number_of_samples} samples")
+
+
+@click.command("reconcile-report-catalogue")
+@with_appcontext
+def reconcile_report_catalogue_command() -> None:
+    """Rebuild the report catalogue from the reports in the reports folder."""
+    number_of_reports, number_removed = reconcile_report_catalogue()
+    click.echo(f"Catalogued {number_of_reports} reports, removed {number_removed} missing reports")
+
+
+@click.command("rebuild-latest-samples-declarations")
+@with_appcontext
+def rebuild_latest_samples_declarations_command() -> None:
+    """Rebuild the latest declaration of every sample from all samples declarations."""
+    number_of_samples = rebuild_latest_samples_declarations()
+    click.echo(f"Rebuilt the latest declarations of {number_of_samples} samples")
+
+
+@click.command("refresh-cherrypicked-samples")
+@with_appcontext
+def refresh_cherrypicked_samples_command() -> None:
+    """Add the samples cherrypicked since the last refresh to the index of cherrypicked samples."""
+    number_of_samples = refresh_cherrypicked_samples()
+    click.echo(f"Refreshed {number_of_samples} cherrypicked samples")
+
+
+@click.command("rebuild-positive-rollups")
+@with_appcontext
+def rebuild_positive_rollups_command() -> None:
+    """Rebuild the positive counts of every plate for each centre and day tested."""
+    number_of_plates = rebuild_positive_rollups()
+    click.echo(f"Rebuilt the positive rollups of {number_of_plates} plates")
+
+
+COMMANDS = [
+    backfill_date_tested_command,
+    watch_samples_command,
+    rebuild_source_plate_summaries_command,
+    reconcile_report_catalogue_command,
+    rebuild_latest_samples_declarations_command,
+    refresh_cherrypicked_samples_command,
+    rebuild_positive_rollups_command,
+]
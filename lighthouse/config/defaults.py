@@ -6,6 +6,9 @@ DOWNLOAD_REPORTS_URL = "http://localhost:5000/reports"
 LABWHERE_URL = "localhost:3010"
 LIGHTHOUSE_API_KEY = "develop"
 REPORTS_DIR = "data/reports"
+# When set, report downloads are handed to the web server with an X-Accel-Redirect to this internal
+# location (e.g. "/protected-reports") rather than being sent by lighthouse
+REPORTS_X_ACCEL_REDIRECT_LOCATION = ""
 
 SS_API_KEY = "develop"
 SS_HOST = "localhost:3000"
@@ -23,6 +26,69 @@ WAREHOUSES_RW_CONN_STRING = "root:root@localhost"
 # The window size when generating the positive samples report
 REPORT_WINDOW_SIZE = 2
 
+# The formats the scheduled positive samples report is written in: any of "xlsx", "csv.gz" and
+# "parquet" (which requires pyarrow)
+REPORT_FORMATS = ["xlsx"]
+
+# How often (in seconds) a running report job records a heartbeat, and how long it can go without
+# one before it is assumed to have died, allowing another report job to start
+REPORT_JOB_HEARTBEAT_INTERVAL = 60
+REPORT_JOB_STALE_AFTER = 600
+
+# Whether the memory allocated by each stage of creating the positive samples report is traced (with
+# tracemalloc) and recorded with the report run. Only turn this on for diagnostic runs: tracemalloc
+# traces every thread in the process, including those serving requests, for the whole run
+REPORT_PROFILE_MEMORY = False
+
+# The number of worker processes the positive samples report is created in. Above 1, the report
+# window is partitioned by centre and day tested, and each worker queries the warehouses with up to
+# CHERRYPICKED_QUERY_MAX_WORKERS connections of its own
+REPORT_PARALLELISM = 1
+
+# The number of plate barcodes sent to LabWhere in each location request, and how many of those
+# requests may be in flight at once, when generating the positive samples report
+LABWHERE_CHUNK_SIZE = 1000
+LABWHERE_MAX_WORKERS = 4
+
+# The number of root sample ids in each query for cherrypicked samples, and how many of those
+# queries are run at once, when generating the positive samples report
+CHERRYPICKED_QUERY_CHUNK_SIZE = 50000
+CHERRYPICKED_QUERY_MAX_WORKERS = 4
+
+# Whether the positive samples report finds cherrypicked samples in the local index of cherrypicked
+# samples, which is refreshed from the warehouses before each report, rather than querying the
+# warehouses for every positive sample. The index is refreshed in batches of
+# CHERRYPICKED_SAMPLES_REFRESH_BATCH_SIZE cherrypick_layout_set events. Event ids are not committed
+# in order, so each refresh also re-reads the CHERRYPICKED_SAMPLES_REFRESH_OVERLAP latest
+# cherrypick_layout_set events up to the last one indexed, to pick up events committed after a
+# later event was indexed
+CHERRYPICKED_SAMPLES_INDEX = True
+CHERRYPICKED_SAMPLES_REFRESH_BATCH_SIZE = 1000
+CHERRYPICKED_SAMPLES_REFRESH_OVERLAP = 100
+
+# The number of root sample ids checked for samples in each query when samples declarations are
+# posted, and how many of those queries are run at once
+SAMPLES_EXISTENCE_CHUNK_SIZE = 5000
+SAMPLES_EXISTENCE_MAX_WORKERS = 4
+
+# Whether the root sample ids of posted samples declarations are first checked against an in-memory
+# Bloom filter of the root sample ids of all samples, so that those which definitely have no samples
+# are not looked up. The filter is rebuilt in the background after each import, and is sized for the
+# given rate of false positives (which are looked up as usual)
+ROOT_SAMPLE_IDS_BLOOM_FILTER = False
+ROOT_SAMPLE_IDS_BLOOM_FILTER_ERROR_RATE = 0.01
+
+# The number of root sample ids whose declarations are looked up at once when generating the
+# positive samples report
+SAMPLES_DECLARATIONS_CHUNK_SIZE = 10000
+
+# How long (in seconds) plate locations looked up in LabWhere are cached for
+LABWHERE_LOCATIONS_CACHE_TTL = 3600
+
+# The window (in seconds) within which a repeated plate event is treated as a robot retry and is
+# acknowledged without being published again
+PLATE_EVENTS_DEDUPLICATION_WINDOW = 300
+
 X_DOMAINS = "*"
 
 # APScheduler config
@@ -34,7 +100,14 @@ JOBS = [
         "trigger": "cron",
         "day": "*",
         "hour": 2,
-    }
+    },
+    {
+        # keeps data derived from samples current after each import, without a change stream
+        "id": "catch_up_sample_changes",
+        "func": "lighthouse.jobs.samples_watcher:catch_up_sample_changes_job",
+        "trigger": "interval",
+        "minutes": 5,
+    },
 ]
 
 
@@ -69,15 +142,120 @@ DATE_FORMAT = r"%Y-%m-%dT%H:%M:%S"
 PAGINATION_LIMIT = 10000
 
 DOMAIN: Dict = {
-    "samples": {},
-    "imports": {},
+    "samples": {
+        "mongo_indexes": {
+            # used to check that the samples of posted declarations exist
+            "root_sample_id": [("Root Sample ID", 1)],
+            # used to find positive samples in order of date tested, optionally for one centre
+            "date_tested_id": [("date_tested", 1), ("_id", 1)],
+            "source_date_tested_id": [("source", 1), ("date_tested", 1), ("_id", 1)],
+            # used to refresh the positive rollups of a plate
+            "plate_barcode": [("plate_barcode", 1)],
+            # used to catch up the samples updated since the last import, see
+            # catch_up_sample_changes
+            "updated_at": [("updated_at", 1)],
+            # used to find the samples of a source plate, and to check whether its summary is
+            # current, see get_source_plate_samples_version
+            "lh_source_plate_uuid_updated_at": [("lh_source_plate_uuid", 1), ("updated_at", -1)],
+        },
+    },
+    "imports": {
+        "mongo_indexes": {
+            # used to find the latest import, see get_report_inputs_fingerprint
+            "date": [("date", -1)],
+        },
+    },
     "centres": {},
     "samples_declarations": {
         "resource_methods": ["GET", "POST"],
         "bulk_enabled": True,
         "schema": SAMPLES_DECLARATIONS_SCHEMA,
+        "mongo_indexes": {
+            # used to find the latest declaration of each sample in the positive samples report
+            "root_sample_id_declared_at": [("root_sample_id", 1), ("declared_at", -1)],
+            # used to find the latest change to the declarations, see get_report_inputs_fingerprint
+            "updated": [("_updated", -1)],
+        },
     },
     "schema": {},
+    "published_plate_events": {
+        "internal_resource": True,
+        "mongo_indexes": {
+            "published_at_ttl": (
+                [("published_at", 1)],
+                {"expireAfterSeconds": PLATE_EVENTS_DEDUPLICATION_WINDOW},
+            ),
+        },
+    },
+    "report_jobs": {
+        "internal_resource": True,
+        "mongo_indexes": {
+            # only allow one report job to be active at a time
+            "active_unique": (
+                [("active", 1)],
+                {"unique": True, "partialFilterExpression": {"active": True}},
+            ),
+        },
+    },
+    "samples_declarations_latest": {
+        "internal_resource": True,
+        "mongo_indexes": {
+            "root_sample_id_unique": ([("root_sample_id", 1)], {"unique": True}),
+        },
+    },
+    "rebuilds": {
+        "internal_resource": True,
+    },
+    "report_runs": {
+        "internal_resource": True,
+        "mongo_indexes": {
+            "started_at": [("started_at", -1), ("_id", -1)],
+        },
+    },
+    "report_catalogue": {
+        "internal_resource": True,
+        "mongo_indexes": {
+            "created_at": [("created_at", -1)],
+            "fingerprint": [("fingerprint", 1)],
+        },
+    },
+    "cherrypicked_samples": {
+        "internal_resource": True,
+        "mongo_indexes": {
+            "cherrypicked_sample_unique": (
+                [
+                    ("Root Sample ID", 1),
+                    ("plate_barcode", 1),
+                    ("Result", 1),
+                    ("coordinate", 1),
+                ],
+                {"unique": True},
+            ),
+            # used to find the last event indexed
+            "event_id": [("event_id", -1)],
+        },
+    },
+    "positive_rollups": {
+        "internal_resource": True,
+        "mongo_indexes": {
+            "source_test_date_plate_barcode_unique": (
+                [("source", 1), ("test_date", 1), ("plate_barcode", 1)],
+                {"unique": True},
+            ),
+            # used to count positives across centres, and to refresh the rollups of a plate
+            "test_date": [("test_date", 1)],
+            "plate_barcode": [("plate_barcode", 1)],
+        },
+    },
+    "labware_locations": {
+        "internal_resource": True,
+        "mongo_indexes": {
+            "cached_at_ttl": (
+                [("cached_at", 1)],
+                {"expireAfterSeconds": LABWHERE_LOCATIONS_CACHE_TTL},
+            ),
+        },
+    },
 }
 
 MONGO_HOST = "localhost"
@@ -131,6 +309,12 @@ RMQ_EXCHANGE = "lighthouse.examples"
 RMQ_EXCHANGE_TYPE = "topic"
 RMQ_ROUTING_KEY = "staging.event.#"
 RMQ_LIMS_ID = "LH_LOCAL"
+# Publish messages to an in-process stand-in for RabbitMQ, e.g. when benchmarking the event path
+RMQ_IN_MEMORY = False
+# The codec used to encode messages. "orjson" is faster, and embeds pre-serialised subjects rather
+# than encoding them again for every message, but orjson is not one of the Pipfile's packages so
+# it is only used where it has been installed separately; without it "orjson" falls back to "json"
+RMQ_MESSAGE_CODEC = "json"
 
 BECKMAN_ROBOTS = {
     "BKRB0001": {"name": "Robot 1", "uuid": "082effc3-f769-4e83-9073-dc7aacd5f71b"},
@@ -19,6 +19,9 @@ LOGGING["loggers"]["lighthouse"]["handlers"] = ["colored_stream"]  # noqa: F405
 
 REPORTS_DIR = "tests/data/reports"
 
+# the warehouses are queried directly for cherrypicked samples unless a test enables the index
+CHERRYPICKED_SAMPLES_INDEX = False
+
 WAREHOUSES_RO_CONN_STRING = "root@localhost"
 ML_WH_DB = "unified_warehouse_test"
 EVENTS_WH_DB = "event_warehouse_test"
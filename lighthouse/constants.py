@@ -14,12 +14,28 @@ FIELD_LAB_ID = "Lab ID"
 FIELD_PLATE_BARCODE = "plate_barcode"
 FIELD_COG_BARCODE = "cog_barcode"
 FIELD_DATE_TESTED = "Date Tested"
+FIELD_PARSED_DATE_TESTED = "date_tested"
 FIELD_CH1_CQ = "CH1-Cq"
 FIELD_CH2_CQ = "CH2-Cq"
 FIELD_CH3_CQ = "CH3-Cq"
 FIELD_LH_SOURCE_PLATE_UUID = "lh_source_plate_uuid"
 FIELD_LH_SAMPLE_UUID = "lh_sample_uuid"
 FIELD_BARCODE = "barcode"
+FIELD_LOCATION_BARCODE = "location_barcode"
+FIELD_CACHED_AT = "cached_at"
+FIELD_PUBLISHED_AT = "published_at"
+FIELD_SAMPLE_SUBJECTS = "sample_subjects"
+FIELD_SAMPLE_COUNT = "sample_count"
+FIELD_SAMPLES_UPDATED_AT = "samples_updated_at"
+FIELD_UPDATED_AT = "updated_at"
+FIELD_CREATED_AT = "created_at"
+FIELD_SIZE = "size"
+FIELD_EVENT_ID = "event_id"
+FIELD_FINGERPRINT = "fingerprint"
+FIELD_TEST_DATE = "test_date"
+FIELD_SAMPLES = "samples"
+FIELD_POSITIVES = "positives"
+FIELD_FILTERED_POSITIVES = "filtered_positives"
 
 # DART specific column names:
 FIELD_DART_DESTINATION_BARCODE = os.environ.get("FIELD_DART_DESTINATION_BARCODE", "Labware BarCode")
@@ -73,6 +89,27 @@ STAGE_MATCH_POSITIVE = {
     }
 }
 
+# Expression which parses the 'Date Tested' string into a date. The date is extracted using a
+# substring since most dates look like "2020-05-10 07:30:00 UTC" but the `dateFromString` function
+# does not handle the timezone string "UTC". If it cannot parse the date using the first format it
+# tries with the other format found in the data, and is null if neither format matches
+EXPRESSION_PARSE_DATE_TESTED = {
+    "$dateFromString": {
+        "dateString": {"$substrBytes": [f"${FIELD_DATE_TESTED}", 0, 19]},
+        "format": "%Y-%m-%d %H:%M:%S",
+        "timezone": "UTC",
+        "onError": {
+            "$dateFromString": {
+                "dateString": {"$substrBytes": [f"${FIELD_DATE_TESTED}", 0, 19]},
+                "format": "%d/%m/%Y %H:%M",
+                "timezone": "UTC",
+                "onError": None,
+            },
+        },
+        "onNull": None,
+    },
+}
+
 # TODO: use the stage above and an aggregate intead
 POSITIVE_SAMPLES_MONGODB_FILTER = {
     FIELD_RESULT: {"$regex": "^positive", "$options": "i"},
@@ -93,3 +130,26 @@ PLATE_EVENT_SOURCE_COMPLETED = "lh_beckman_cp_source_completed"
 PLATE_EVENT_SOURCE_NOT_RECOGNISED = "lh_beckman_cp_source_plate_unrecognised"
 PLATE_EVENT_SOURCE_NO_MAP_DATA = "lh_beckman_cp_source_no_plate_map_data"
 PLATE_EVENT_SOURCE_ALL_NEGATIVES = "lh_beckman_cp_source_all_negatives"
+
+# Formats the positive samples report can be written in
+REPORT_FORMAT_XLSX = "xlsx"
+REPORT_FORMAT_CSV_GZ = "csv.gz"
+REPORT_FORMAT_PARQUET = "parquet"
+REPORT_FORMATS = (REPORT_FORMAT_XLSX, REPORT_FORMAT_CSV_GZ, REPORT_FORMAT_PARQUET)
+
+# Statuses of positive samples report jobs
+REPORT_JOB_STATUS_QUEUED = "queued"
+REPORT_JOB_STATUS_RUNNING = "running"
+REPORT_JOB_STATUS_COMPLETED = "completed"
+REPORT_JOB_STATUS_FAILED = "failed"
+
+# Status of a positive samples report run which found the latest reports already up to date; runs
+# otherwise share the statuses of report jobs
+REPORT_RUN_STATUS_UNCHANGED = "unchanged"
+
+# Stages of creating the positive samples report
+REPORT_STAGE_POSITIVE_SAMPLES = "positive_samples"
+REPORT_STAGE_LOCATIONS = "locations"
+REPORT_STAGE_DECLARATIONS = "declarations"
+REPORT_STAGE_CHERRYPICKED = "cherrypicked"
+REPORT_STAGE_WRITING = "writing"
@@ -0,0 +1,50 @@
+import hashlib
+import math
+from typing import Iterable, Iterator
+
+
+class BloomFilter:
+    """A compact set of strings which answers whether a string is definitely not in the set, or is
+    possibly in it. Strings which were added are always found; strings which were not are wrongly
+    found at about the error rate the filter was sized for.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        """Size a Bloom filter.
+
+        Arguments:
+            capacity {int} -- The number of strings which will be added.
+
+        Keyword Arguments:
+            error_rate {float} -- The rate of false positives once the filter is at capacity
+            (default: {0.01})
+        """
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.number_of_hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str) -> Iterator[int]:
+        # the positions are derived from two halves of a single hash (double hashing)
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], "little")
+        second_hash = int.from_bytes(digest[8:], "little") | 1
+
+        for index in range(self.number_of_hashes):
+            yield (first_hash + index * second_hash) % self.size
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def update(self, values: Iterable[str]) -> None:
+        for value in values:
+            self.add(value)
+
+    def __contains__(self, value: object) -> bool:
+        if not isinstance(value, str):
+            return False
+
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value)
+        )
@@ -0,0 +1,232 @@
+import logging
+from typing import List, Optional
+
+import pandas as pd  # type: ignore
+from flask import current_app as app
+from lighthouse.constants import (
+    FIELD_COORDINATE,
+    FIELD_EVENT_ID,
+    FIELD_PLATE_BARCODE,
+    FIELD_RESULT,
+    FIELD_ROOT_SAMPLE_ID,
+)
+from lighthouse.helpers.mysql_db import get_warehouses_ro_engine
+from pandas import DataFrame
+from pymongo import DESCENDING, UpdateOne  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# The fields which identify a cherrypicked sample; the result is the lowercased phenotype recorded
+# in MLWH
+CHERRYPICKED_SAMPLE_KEY = [
+    FIELD_ROOT_SAMPLE_ID,
+    FIELD_PLATE_BARCODE,
+    FIELD_RESULT,
+    FIELD_COORDINATE,
+]
+
+
+def get_last_cherrypicked_event_id() -> int:
+    """Get the id of the latest cherrypick_layout_set event which has been indexed.
+
+    Returns:
+        {int} -- The event id; otherwise 0 if nothing has been indexed yet.
+    """
+    last_sample = app.data.driver.db.cherrypicked_samples.find_one(
+        {}, {FIELD_EVENT_ID: True}, sort=[(FIELD_EVENT_ID, DESCENDING)]
+    )
+
+    return last_sample[FIELD_EVENT_ID] if last_sample is not None else 0
+
+
+def get_latest_cherrypick_event_id() -> Optional[int]:
+    """Get the id of the latest cherrypick_layout_set event in the events warehouse.
+
+    Returns:
+        {Optional[int]} -- The event id; otherwise None if there are no cherrypick events.
+    """
+    events_wh_db = app.config["EVENTS_WH_DB"]
+    sql = (
+        "SELECT MAX(mlwh_events_events.id) as id FROM"
+        f" {events_wh_db}.events mlwh_events_events"
+        f" JOIN {events_wh_db}.event_types mlwh_events_event_types ON (mlwh_events_events.event_type_id = mlwh_events_event_types.id)"  # noqa: E501
+        " WHERE mlwh_events_event_types.key = 'cherrypick_layout_set'"
+    )
+    latest_event_id = pd.read_sql(sql, get_warehouses_ro_engine())["id"][0]
+
+    return None if pd.isna(latest_event_id) else int(latest_event_id)
+
+
+def get_refresh_start_event_id(sql_engine, last_event_id: int) -> int:
+    """Get the id after which cherrypick_layout_set events are read when the index of cherrypicked
+    samples is refreshed: the CHERRYPICKED_SAMPLES_REFRESH_OVERLAP latest cherrypick_layout_set
+    events up to the last one indexed are read again. The overlap is counted in events of that type
+    rather than in ids, which are shared by every type of event.
+
+    Arguments:
+        sql_engine -- The engine of the warehouses.
+        last_event_id {int} -- The id of the latest event which has been indexed.
+
+    Returns:
+        {int} -- The event id; otherwise 0 if there are not enough events to overlap.
+    """
+    overlap = app.config["CHERRYPICKED_SAMPLES_REFRESH_OVERLAP"]
+    if overlap == 0 or last_event_id == 0:
+        return last_event_id
+
+    events_wh_db = app.config["EVENTS_WH_DB"]
+    sql = (
+        "SELECT MIN(overlap_events.id) as id FROM ("
+        "SELECT mlwh_events_events.id FROM"
+        f" {events_wh_db}.events mlwh_events_events"
+        f" JOIN {events_wh_db}.event_types mlwh_events_event_types ON (mlwh_events_events.event_type_id = mlwh_events_event_types.id)"  # noqa: E501
+        " WHERE mlwh_events_event_types.key = 'cherrypick_layout_set'"
+        " AND mlwh_events_events.id <= %(last_indexed_event_id)s"
+        " ORDER BY mlwh_events_events.id DESC"
+        " LIMIT %(overlap)s"
+        ") overlap_events"
+    )
+    first_overlap_event_id = pd.read_sql(
+        sql, sql_engine, params={"last_indexed_event_id": last_event_id, "overlap": overlap}
+    )["id"][0]
+
+    return 0 if pd.isna(first_overlap_event_id) else int(first_overlap_event_id) - 1
+
+
+def refresh_cherrypicked_samples() -> int:
+    """Add the samples cherrypicked since the last refresh to the local index of cherrypicked
+    samples. The cherrypick_layout_set events after the last one indexed, and the
+    CHERRYPICKED_SAMPLES_REFRESH_OVERLAP latest ones before it, are read from the events warehouse
+    in batches of CHERRYPICKED_SAMPLES_REFRESH_BATCH_SIZE, and the samples they cherrypicked are
+    found in MLWH. Event ids are allocated before their rows are committed, so an event can appear
+    after a later one has been indexed; re-reading the trailing events picks these up, and
+    re-indexing a sample does not change it.
+
+    Returns:
+        {int} -- The number of cherrypicked samples found.
+    """
+    cherrypicked_samples = app.data.driver.db.cherrypicked_samples
+    batch_size = app.config["CHERRYPICKED_SAMPLES_REFRESH_BATCH_SIZE"]
+    ml_wh_db = app.config["ML_WH_DB"]
+    events_wh_db = app.config["EVENTS_WH_DB"]
+
+    events_sql = (
+        "SELECT mlwh_events_events.id FROM"
+        f" {events_wh_db}.events mlwh_events_events"
+        f" JOIN {events_wh_db}.event_types mlwh_events_event_types ON (mlwh_events_events.event_type_id = mlwh_events_event_types.id)"  # noqa: E501
+        " WHERE mlwh_events_event_types.key = 'cherrypick_layout_set'"
+        " AND mlwh_events_events.id > %(last_event_id)s"
+        " ORDER BY mlwh_events_events.id"
+        " LIMIT %(batch_size)s"
+    )
+    samples_sql = (
+        f"SELECT mlwh_sample.description as `{FIELD_ROOT_SAMPLE_ID}`, mlwh_stock_resource.labware_human_barcode as `{FIELD_PLATE_BARCODE}`"  # noqa: E501
+        f", mlwh_sample.phenotype as `{FIELD_RESULT}`, mlwh_stock_resource.labware_coordinate as `{FIELD_COORDINATE}`"  # noqa: E501
+        f", MAX(mlwh_events_roles.event_id) as `{FIELD_EVENT_ID}`"
+        f" FROM {ml_wh_db}.sample as mlwh_sample"
+        f" JOIN {ml_wh_db}.stock_resource mlwh_stock_resource ON (mlwh_sample.id_sample_tmp = mlwh_stock_resource.id_sample_tmp)"  # noqa: E501
+        f" JOIN {events_wh_db}.subjects mlwh_events_subjects ON (mlwh_events_subjects.friendly_name = sanger_sample_id)"  # noqa: E501
+        f" JOIN {events_wh_db}.roles mlwh_events_roles ON (mlwh_events_roles.subject_id = mlwh_events_subjects.id)"  # noqa: E501
+        " WHERE mlwh_events_roles.event_id IN %(event_ids)s"
+        " GROUP BY mlwh_sample.description, mlwh_stock_resource.labware_human_barcode, mlwh_sample.phenotype, mlwh_stock_resource.labware_coordinate"  # noqa: E501
+    )
+
+    try:
+        sql_engine = get_warehouses_ro_engine()
+        last_event_id = get_refresh_start_event_id(sql_engine, get_last_cherrypicked_event_id())
+        logger.info(f"Refreshing cherrypicked samples from event {last_event_id}")
+
+        number_of_samples = 0
+        while True:
+            event_ids = pd.read_sql(
+                events_sql,
+                sql_engine,
+                params={"last_event_id": last_event_id, "batch_size": batch_size},
+            )["id"].to_list()
+            if len(event_ids) == 0:
+                break
+
+            samples_df = pd.read_sql(
+                samples_sql, sql_engine, params={"event_ids": tuple(event_ids)}
+            )
+            if len(samples_df.index) > 0:
+                # samples which are cherrypicked again keep the id of their latest event
+                cherrypicked_samples.bulk_write(
+                    [
+                        UpdateOne(
+                            {field: sample[field] for field in CHERRYPICKED_SAMPLE_KEY},
+                            {"$max": {FIELD_EVENT_ID: int(sample[FIELD_EVENT_ID])}},
+                            upsert=True,
+                        )
+                        for sample in samples_df.to_dict("records")
+                    ],
+                    ordered=False,
+                )
+
+            number_of_samples += len(samples_df.index)
+            last_event_id = max(event_ids)
+            logger.debug(
+                f"Indexed {len(samples_df.index)} cherrypicked samples from {len(event_ids)} "
+                f"events, up to event {last_event_id}"
+            )
+
+            if len(event_ids) < batch_size:
+                break
+
+        logger.info(f"Refreshed {number_of_samples} cherrypicked samples")
+
+        return number_of_samples
+    except Exception as e:
+        logger.error("An error occurred attempting to refresh cherrypicked samples")
+        logger.exception(e)
+        raise
+
+
+def get_indexed_cherrypicked_samples(
+    root_sample_ids: List[str], plate_barcodes: List[str], chunk_size: Optional[int] = None
+) -> DataFrame:
+    """Find which of the given samples have been cherrypicked using the local index of cherrypicked
+    samples, see refresh_cherrypicked_samples. The same columns are returned as by
+    get_cherrypicked_samples.
+
+    Arguments:
+        root_sample_ids {List[str]} -- The root sample ids of the samples.
+        plate_barcodes {List[str]} -- The plate barcodes of the samples, aligned with their root
+        sample ids.
+
+    Keyword Arguments:
+        chunk_size {Optional[int]} -- The number of samples looked up at once; otherwise
+        CHERRYPICKED_QUERY_CHUNK_SIZE (default: {None})
+
+    Returns:
+        {DataFrame} -- The root sample id, plate barcode, lowercased result and coordinate of the
+        samples which have been cherrypicked.
+    """
+    cherrypicked_samples = app.data.driver.db.cherrypicked_samples
+    chunk_size = chunk_size or app.config["CHERRYPICKED_QUERY_CHUNK_SIZE"]
+
+    records = []
+    for x in range(0, len(root_sample_ids), chunk_size):
+        records.extend(
+            cherrypicked_samples.find(
+                {
+                    FIELD_ROOT_SAMPLE_ID: {
+                        "$in": list(set(root_sample_ids[x : (x + chunk_size)]))  # noqa: E203
+                    },
+                    FIELD_PLATE_BARCODE: {
+                        "$in": list(set(plate_barcodes[x : (x + chunk_size)]))  # noqa: E203
+                    },
+                },
+                {"_id": False, **{field: True for field in CHERRYPICKED_SAMPLE_KEY}},
+            )
+        )
+
+    cherrypicked_samples_df = (
+        pd.DataFrame.from_records(records, columns=CHERRYPICKED_SAMPLE_KEY)
+        .rename(columns={FIELD_RESULT: "Result_lower"})
+        .drop_duplicates()
+    )
+
+    return cherrypicked_samples_df.sort_values(
+        by=cherrypicked_samples_df.columns.to_list()
+    ).reset_index(drop=True)
@@ -1,10 +1,40 @@
 from flask import current_app as app
 import logging
-from typing import List, Dict, Any, Optional
-from lighthouse.constants import FIELD_LH_SOURCE_PLATE_UUID, FIELD_BARCODE
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Set
+from pymongo import ReplaceOne, UpdateOne  # type: ignore
+from pymongo.errors import BulkWriteError, DuplicateKeyError  # type: ignore
+from pymongo.collection import Collection  # type: ignore
+from lighthouse.constants import (
+    EXPRESSION_PARSE_DATE_TESTED,
+    FIELD_BARCODE,
+    FIELD_CACHED_AT,
+    FIELD_LH_SOURCE_PLATE_UUID,
+    FIELD_LOCATION_BARCODE,
+    FIELD_PARSED_DATE_TESTED,
+    FIELD_PUBLISHED_AT,
+    FIELD_ROOT_SAMPLE_ID,
+)
+from lighthouse.helpers.bloom_filter import BloomFilter
 
 logger = logging.getLogger(__name__)
 
+# The id of the document recording that the latest samples declarations have been built
+LATEST_SAMPLES_DECLARATIONS_REBUILD_ID = "samples_declarations_latest"
+
+# The code of the write errors of inserts which break a unique index
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+# The Bloom filter of the root sample ids of all samples, the id of the latest import when it was
+# built and the thread building its replacement, see get_known_root_sample_ids
+known_root_sample_ids: Optional[BloomFilter] = None
+known_root_sample_ids_import_id: Any = None
+known_root_sample_ids_rebuild: Optional[threading.Thread] = None
+known_root_sample_ids_lock = threading.Lock()
+
 
 def get_source_plate_uuid(barcode: str) -> Optional[str]:
     """Attempt to get a uuid for a source plate barcode.
@@ -49,3 +79,392 @@ def get_samples(source_plate_uuid: str) -> Optional[List[Dict[str, Any]]]:
         )
         logger.exception(e)
         return None
+
+
+def claim_plate_event(event_key: str) -> bool:
+    """Attempt to record that a plate event is being published, so that retries of the same event
+    within the de-duplication window can be recognised. If the record cannot be written the event
+    is allowed through rather than being lost.
+
+    Arguments:
+        event_key {str} -- The key identifying the plate event.
+
+    Returns:
+        {bool} -- True if the event should be published; otherwise False if it is a duplicate.
+    """
+    try:
+        published_plate_events = app.data.driver.db.published_plate_events
+        now = datetime.utcnow()
+        try:
+            published_plate_events.insert_one({"_id": event_key, FIELD_PUBLISHED_AT: now})
+            return True
+        except DuplicateKeyError:
+            # the TTL monitor only runs periodically, so the previous record may have expired
+            # without having been removed yet
+            window_start = now - timedelta(seconds=app.config["PLATE_EVENTS_DEDUPLICATION_WINDOW"])
+            expired_event = published_plate_events.find_one_and_update(
+                {"_id": event_key, FIELD_PUBLISHED_AT: {"$lt": window_start}},
+                {"$set": {FIELD_PUBLISHED_AT: now}},
+            )
+            return expired_event is not None
+    except Exception as e:
+        logger.error(f"An error occurred attempting to record plate event '{event_key}'")
+        logger.exception(e)
+        return True
+
+
+def release_plate_event(event_key: str) -> None:
+    """Remove the record of a plate event, so that it can be published again. Used when publishing
+    the event failed.
+
+    Arguments:
+        event_key {str} -- The key identifying the plate event.
+    """
+    try:
+        app.data.driver.db.published_plate_events.delete_one({"_id": event_key})
+    except Exception as e:
+        logger.error(f"An error occurred attempting to release plate event '{event_key}'")
+        logger.exception(e)
+
+
+def backfill_date_tested(
+    samples_collection: Collection,
+    query: Optional[Dict[str, Any]] = None,
+    missing_only: bool = True,
+) -> int:
+    """Set the parsed date_tested field on samples from their 'Date Tested' string. Samples whose
+    date cannot be parsed are given a null date_tested so that they are not parsed again.
+
+    Arguments:
+        samples_collection {Collection} -- the samples collection.
+
+    Keyword Arguments:
+        query {Dict[str, Any]} -- further restricts which samples are updated (default: {None})
+        missing_only {bool} -- only set date_tested on samples which do not have one yet; otherwise
+        it is parsed again, e.g. for samples whose 'Date Tested' has been re-imported
+        (default: {True})
+
+    Returns:
+        {int} -- The number of samples updated.
+    """
+    match = {**(query or {})}
+    if missing_only:
+        match[FIELD_PARSED_DATE_TESTED] = {"$exists": False}
+
+    result = samples_collection.update_many(
+        match, [{"$set": {FIELD_PARSED_DATE_TESTED: EXPRESSION_PARSE_DATE_TESTED}}]
+    )
+    logger.debug(f"Set {FIELD_PARSED_DATE_TESTED} on {result.modified_count} samples")
+
+    return result.modified_count
+
+
+def backfill_date_tested_for_samples(samples: List[Dict[str, Any]]) -> None:
+    """Set the parsed date_tested field on the given samples, which have been written since it was
+    last set so their 'Date Tested' may have changed. Samples whose date_tested is unchanged are
+    left as they are.
+
+    Arguments:
+        samples {List[Dict[str, Any]]} -- The samples which have changed.
+    """
+    sample_ids = [sample["_id"] for sample in samples]
+    if len(sample_ids) > 0:
+        backfill_date_tested(
+            app.data.driver.db.samples, {"_id": {"$in": sample_ids}}, missing_only=False
+        )
+
+
+def get_cached_labware_locations(labware_barcodes: List[str]) -> Dict[str, str]:
+    """Get the locations of labware which have been cached within the cache TTL. The cache is read
+    in chunks of LABWHERE_CHUNK_SIZE barcodes so that each query stays well within the size of a
+    MongoDB document. If the cache cannot be read every labware is treated as a miss.
+
+    Arguments:
+        labware_barcodes {List[str]} -- The barcodes of the labware to locate.
+
+    Returns:
+        {Dict[str, str]} -- The cached location barcode of each labware which was found.
+    """
+    try:
+        cache_start = datetime.utcnow() - timedelta(
+            seconds=app.config["LABWHERE_LOCATIONS_CACHE_TTL"]
+        )
+        chunk_size = app.config["LABWHERE_CHUNK_SIZE"]
+
+        cached_locations = {}
+        for x in range(0, len(labware_barcodes), chunk_size):
+            chunk_locations = app.data.driver.db.labware_locations.find(
+                {
+                    "_id": {"$in": labware_barcodes[x : (x + chunk_size)]},  # noqa: E203
+                    FIELD_CACHED_AT: {"$gte": cache_start},
+                }
+            )
+            cached_locations.update(
+                {location["_id"]: location[FIELD_LOCATION_BARCODE] for location in chunk_locations}
+            )
+
+        return cached_locations
+    except Exception as e:
+        logger.error("An error occurred attempting to read cached labware locations")
+        logger.exception(e)
+        return {}
+
+
+def cache_labware_locations(locations: Dict[str, str]) -> None:
+    """Cache the locations of labware looked up in LabWhere.
+
+    Arguments:
+        locations {Dict[str, str]} -- The location barcode of each labware, keyed by its barcode.
+    """
+    if len(locations) == 0:
+        return
+
+    try:
+        now = datetime.utcnow()
+        app.data.driver.db.labware_locations.bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": barcode},
+                    {FIELD_LOCATION_BARCODE: location_barcode, FIELD_CACHED_AT: now},
+                    upsert=True,
+                )
+                for barcode, location_barcode in locations.items()
+            ],
+            ordered=False,
+        )
+    except Exception as e:
+        logger.error("An error occurred attempting to cache labware locations")
+        logger.exception(e)
+
+
+def update_latest_samples_declarations(samples_declarations: List[Dict[str, Any]]) -> None:
+    """Record the given samples declarations as the latest declarations of their samples, unless a
+    sample already has a later declaration. The declarations are upserted in a single unordered
+    bulk write.
+
+    Arguments:
+        samples_declarations {List[Dict[str, Any]]} -- The samples declarations which have been
+        inserted.
+    """
+    requests = [
+        UpdateOne(
+            {
+                "root_sample_id": declaration["root_sample_id"],
+                "declared_at": {"$lte": declaration["declared_at"]},
+            },
+            {
+                "$set": {
+                    "value_in_sequencing": declaration["value_in_sequencing"],
+                    "declared_at": declaration["declared_at"],
+                }
+            },
+            upsert=True,
+        )
+        for declaration in samples_declarations
+    ]
+    if len(requests) == 0:
+        return
+
+    # An upsert fails with a duplicate key error when the sample already has a later declaration,
+    # as it attempts to insert a second document for the sample, or when another upsert inserted
+    # the sample's first declaration at the same time. The failed upserts are retried once, when
+    # the sample has a document to update; any which fail again are of the first kind
+    retry = _upsert_latest_samples_declarations(requests)
+    if len(retry) > 0:
+        _upsert_latest_samples_declarations(retry)
+
+
+def _upsert_latest_samples_declarations(requests: List[UpdateOne]) -> List[UpdateOne]:
+    """Write upserts of the latest samples declarations, ignoring duplicate key errors.
+
+    Arguments:
+        requests {List[UpdateOne]} -- The upserts.
+
+    Raises:
+        BulkWriteError: if any upsert fails other than with a duplicate key error
+
+    Returns:
+        {List[UpdateOne]} -- The upserts which failed with a duplicate key error.
+    """
+    try:
+        app.data.driver.db.samples_declarations_latest.bulk_write(requests, ordered=False)
+
+        return []
+    except BulkWriteError as e:
+        write_errors = e.details["writeErrors"]
+        if any(error["code"] != DUPLICATE_KEY_ERROR_CODE for error in write_errors):
+            raise
+
+        return [requests[error["index"]] for error in write_errors]
+
+
+def rebuild_latest_samples_declarations() -> int:
+    """Rebuild the latest declaration of every sample from all samples declarations.
+
+    Returns:
+        {int} -- The number of samples with a declaration.
+    """
+    db = app.data.driver.db
+    db.samples_declarations.aggregate(
+        [
+            {"$sort": {"root_sample_id": 1, "declared_at": -1}},
+            {
+                "$group": {
+                    "_id": "$root_sample_id",
+                    "root_sample_id": {"$first": "$root_sample_id"},
+                    "value_in_sequencing": {"$first": "$value_in_sequencing"},
+                    "declared_at": {"$first": "$declared_at"},
+                }
+            },
+            {"$project": {"_id": False}},
+            # replaces the collection once the aggregation has completed, keeping its indexes
+            {"$out": "samples_declarations_latest"},
+        ],
+        allowDiskUse=True,
+    )
+    db.rebuilds.replace_one(
+        {"_id": LATEST_SAMPLES_DECLARATIONS_REBUILD_ID},
+        {"rebuilt_at": datetime.utcnow()},
+        upsert=True,
+    )
+
+    return db.samples_declarations_latest.count_documents({})
+
+
+def is_latest_samples_declarations_built() -> bool:
+    """Whether the latest declaration of every sample has been built, see
+    rebuild_latest_samples_declarations. Until it has, only the samples declared since deploying
+    have a latest declaration.
+
+    Returns:
+        {bool} -- True if the latest samples declarations have been built.
+    """
+    rebuild = app.data.driver.db.rebuilds.find_one({"_id": LATEST_SAMPLES_DECLARATIONS_REBUILD_ID})
+
+    return rebuild is not None
+
+
+def find_existing_root_sample_ids(root_sample_ids: List[str]) -> Set[str]:
+    """Find which of the given root sample ids have samples. The ids are looked up in chunks of
+    SAMPLES_EXISTENCE_CHUNK_SIZE, with up to SAMPLES_EXISTENCE_MAX_WORKERS queries running at once,
+    each of which is covered by the index on the root sample id.
+
+    Arguments:
+        root_sample_ids {List[str]} -- The root sample ids to look up.
+
+    Returns:
+        {Set[str]} -- The root sample ids which have samples.
+    """
+    samples_collection = app.data.driver.db.samples
+    chunk_size = app.config["SAMPLES_EXISTENCE_CHUNK_SIZE"]
+
+    root_sample_ids = list(dict.fromkeys(root_sample_ids))
+    chunked_root_sample_ids = [
+        root_sample_ids[x : (x + chunk_size)]  # noqa: E203
+        for x in range(0, len(root_sample_ids), chunk_size)
+    ]
+
+    # the queries are run from worker threads, so pass them the collection rather than relying on
+    # the app context
+    def find_existing(chunk: List[str]) -> Set[str]:
+        return {
+            sample[FIELD_ROOT_SAMPLE_ID]
+            for sample in samples_collection.find(
+                {FIELD_ROOT_SAMPLE_ID: {"$in": chunk}}, {"_id": False, FIELD_ROOT_SAMPLE_ID: True}
+            )
+        }
+
+    existing_root_sample_ids: Set[str] = set()
+    with ThreadPoolExecutor(max_workers=app.config["SAMPLES_EXISTENCE_MAX_WORKERS"]) as executor:
+        for chunk_existing_root_sample_ids in executor.map(find_existing, chunked_root_sample_ids):
+            existing_root_sample_ids.update(chunk_existing_root_sample_ids)
+
+    return existing_root_sample_ids
+
+
+def get_known_root_sample_ids() -> Optional[BloomFilter]:
+    """Get a Bloom filter of the root sample ids of all samples, if ROOT_SAMPLE_IDS_BLOOM_FILTER is
+    set. A root sample id which is not in the filter definitely has no samples. The filter is
+    rebuilt in the background whenever an import has been recorded since it was built, and the
+    crawler records an import after adding its samples. Until the rebuilt filter is ready None is
+    returned, so the samples of the new import are looked up rather than reported as missing.
+
+    Returns:
+        {Optional[BloomFilter]} -- The filter; otherwise None if it is not used or is being built.
+    """
+    global known_root_sample_ids_rebuild
+
+    if not app.config["ROOT_SAMPLE_IDS_BLOOM_FILTER"]:
+        return None
+
+    try:
+        db = app.data.driver.db
+        # the latest import is found before the samples are read, so that samples imported while
+        # the filter is built are added by the next rebuild
+        latest_import = db.imports.find_one({}, {"_id": True}, sort=[("_id", -1)])
+        latest_import_id = latest_import["_id"] if latest_import is not None else None
+
+        with known_root_sample_ids_lock:
+            if (
+                known_root_sample_ids is not None
+                and latest_import_id == known_root_sample_ids_import_id
+            ):
+                return known_root_sample_ids
+
+            if (
+                known_root_sample_ids_rebuild is None
+                or not known_root_sample_ids_rebuild.is_alive()
+            ):
+                # the thread is passed the collection and config rather than relying on the app
+                # context
+                known_root_sample_ids_rebuild = threading.Thread(
+                    target=rebuild_known_root_sample_ids,
+                    args=(
+                        db.samples,
+                        latest_import_id,
+                        app.config["ROOT_SAMPLE_IDS_BLOOM_FILTER_ERROR_RATE"],
+                    ),
+                    daemon=True,
+                )
+                known_root_sample_ids_rebuild.start()
+
+        return None
+    except Exception as e:
+        logger.error("An error occurred attempting to get the filter of known root sample ids")
+        logger.exception(e)
+        return None
+
+
+def rebuild_known_root_sample_ids(
+    samples_collection: Collection, import_id: Any, error_rate: float
+) -> None:
+    """Build the Bloom filter of the root sample ids of all samples and replace the filter returned
+    by get_known_root_sample_ids with it.
+
+    Arguments:
+        samples_collection {Collection} -- The samples collection.
+        import_id {Any} -- The id of the latest import before the samples are read.
+        error_rate {float} -- The rate of false positives the filter is sized for.
+    """
+    global known_root_sample_ids, known_root_sample_ids_import_id
+
+    try:
+        start = time.time()
+        bloom_filter = BloomFilter(samples_collection.estimated_document_count(), error_rate)
+        # the range over all strings lets the index on the root sample id cover the query
+        bloom_filter.update(
+            sample[FIELD_ROOT_SAMPLE_ID]
+            for sample in samples_collection.find(
+                {FIELD_ROOT_SAMPLE_ID: {"$gt": ""}}, {"_id": False, FIELD_ROOT_SAMPLE_ID: True}
+            )
+        )
+        logger.info(
+            f"Built the filter of known root sample ids in {round(time.time() - start, 2)}s"
+        )
+
+        with known_root_sample_ids_lock:
+            known_root_sample_ids = bloom_filter
+            known_root_sample_ids_import_id = import_id
+    except Exception as e:
+        logger.error("An error occurred attempting to build the filter of known root sample ids")
+        logger.exception(e)
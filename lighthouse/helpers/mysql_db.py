@@ -1,4 +1,5 @@
 import sqlalchemy  # type: ignore
+from flask import current_app as app
 from sqlalchemy import MetaData  # type: ignore
 from sqlalchemy.engine.base import Engine  # type: ignore
 
@@ -8,6 +9,24 @@ def create_mysql_connection_engine(connection_string: str, database: str) -> Eng
     return sqlalchemy.create_engine(create_engine_string, pool_recycle=3600)
 
 
+def get_warehouses_ro_engine() -> Engine:
+    """Get the pooled engine for read only queries across the warehouses, creating it the first
+    time it is needed by the app. The pool is sized to allow every cherrypicked samples query worker
+    its own connection.
+
+    Returns:
+        {Engine} -- The engine for the warehouses read only connection string.
+    """
+    if "warehouses_ro_engine" not in app.extensions:
+        app.extensions["warehouses_ro_engine"] = sqlalchemy.create_engine(
+            f"mysql+pymysql://{app.config['WAREHOUSES_RO_CONN_STRING']}",
+            pool_recycle=3600,
+            pool_size=app.config["CHERRYPICKED_QUERY_MAX_WORKERS"],
+        )
+
+    return app.extensions["warehouses_ro_engine"]
+
+
 def get_table(sql_engine: Engine, table_name: str):
     metadata = MetaData(sql_engine)
     metadata.reflect()
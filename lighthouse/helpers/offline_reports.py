@@ -0,0 +1,347 @@
+import gzip
+import logging
+import pathlib
+import re
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, cast
+
+import bson  # type: ignore
+import pandas as pd  # type: ignore
+from bson import json_util  # type: ignore
+from bson.decimal128 import Decimal128  # type: ignore
+from lighthouse.constants import (
+    CT_VALUE_LIMIT,
+    FIELD_CH1_CQ,
+    FIELD_CH2_CQ,
+    FIELD_CH3_CQ,
+    FIELD_COORDINATE,
+    FIELD_DATE_TESTED,
+    FIELD_LOCATION_BARCODE,
+    FIELD_PARSED_DATE_TESTED,
+    FIELD_PLATE_BARCODE,
+    FIELD_RESULT,
+    FIELD_ROOT_SAMPLE_ID,
+    FIELD_SOURCE,
+)
+from lighthouse.exceptions import ReportCreationError
+from lighthouse.helpers.cherrypicked_samples import CHERRYPICKED_SAMPLE_KEY
+from lighthouse.helpers.reports import (
+    REPORT_WRITERS,
+    build_declaration_record,
+    build_positive_samples_dataframe,
+    get_new_report_name_and_path,
+    merge_cherrypicked_samples,
+    merge_locations,
+    merge_samples_declarations,
+    report_query_window_start,
+)
+from pandas import DataFrame  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# The fields of the samples in the positive samples report, in the order they are projected
+POSITIVE_SAMPLE_FIELDS = [
+    FIELD_SOURCE,
+    FIELD_PLATE_BARCODE,
+    FIELD_ROOT_SAMPLE_ID,
+    FIELD_RESULT,
+    FIELD_DATE_TESTED,
+    FIELD_COORDINATE,
+]
+
+# The formats of the 'Date Tested' strings, see EXPRESSION_PARSE_DATE_TESTED
+DATE_TESTED_FORMATS = ["%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M"]
+
+
+def open_snapshot(snapshot_path: pathlib.Path) -> BinaryIO:
+    """Open a snapshot file, which may be gzipped (e.g. by mongodump --gzip).
+
+    Arguments:
+        snapshot_path {pathlib.Path} -- the path of the snapshot
+
+    Returns:
+        BinaryIO -- the uncompressed contents of the snapshot
+    """
+    if snapshot_path.suffix == ".gz":
+        return cast(BinaryIO, gzip.open(snapshot_path, "rb"))
+
+    return open(snapshot_path, "rb")
+
+
+def iter_snapshot(snapshot_path: pathlib.Path) -> Iterator[Dict[str, Any]]:
+    """Read the documents of a collection snapshot one at a time, without loading the whole snapshot
+    into memory. Snapshots ending in .bson (or .bson.gz) are read as mongodump output; any other
+    snapshot is read as mongoexport output, with one extended JSON document on each line.
+
+    Arguments:
+        snapshot_path {pathlib.Path} -- the path of the snapshot
+
+    Yields:
+        Dict[str, Any] -- the documents in the snapshot
+    """
+    is_bson = ".bson" in snapshot_path.suffixes
+    with open_snapshot(snapshot_path) as snapshot:
+        if is_bson:
+            yield from bson.decode_file_iter(snapshot)
+        else:
+            for line in snapshot:
+                if line.strip():
+                    yield json_util.loads(line)
+
+
+def parse_date_tested(sample: Dict[str, Any]) -> Optional[datetime]:
+    """Get the date a sample was tested, parsing its 'Date Tested' string as
+    EXPRESSION_PARSE_DATE_TESTED does if it does not have a parsed date_tested.
+
+    Arguments:
+        sample {Dict[str, Any]} -- the sample
+
+    Returns:
+        Optional[datetime] -- the date tested; otherwise None if it cannot be parsed
+    """
+    if isinstance(sample.get(FIELD_PARSED_DATE_TESTED), datetime):
+        return sample[FIELD_PARSED_DATE_TESTED].replace(tzinfo=None)
+
+    date_tested = sample.get(FIELD_DATE_TESTED)
+    if not isinstance(date_tested, str):
+        return None
+
+    for date_format in DATE_TESTED_FORMATS:
+        try:
+            return datetime.strptime(date_tested[:19].strip(), date_format)
+        except ValueError:
+            pass
+
+    return None
+
+
+def is_ct_value_within_limit(ct_value: Any) -> bool:
+    """Whether a CT value is matched by the {"$lte": CT_VALUE_LIMIT} of STAGE_MATCH_POSITIVE, which
+    only matches numbers, including those stored as Decimal128.
+
+    Arguments:
+        ct_value {Any} -- the CT value
+
+    Returns:
+        bool -- True if the CT value is a number no greater than the limit
+    """
+    if isinstance(ct_value, Decimal128):
+        ct_value = ct_value.to_decimal()
+
+    if isinstance(ct_value, bool) or not isinstance(ct_value, (int, float, Decimal)):
+        return False
+
+    return ct_value <= CT_VALUE_LIMIT
+
+
+def is_positive_sample(sample: Dict[str, Any]) -> bool:
+    """Whether a sample is matched by STAGE_MATCH_POSITIVE, which this mirrors.
+
+    Arguments:
+        sample {Dict[str, Any]} -- the sample
+
+    Returns:
+        bool -- True if the sample is a positive sample in the report
+    """
+    result = sample.get(FIELD_RESULT)
+    if not isinstance(result, str) or not re.match("^positive", result, re.IGNORECASE):
+        return False
+
+    root_sample_id = sample.get(FIELD_ROOT_SAMPLE_ID)
+    if isinstance(root_sample_id, str) and root_sample_id.startswith("CBIQA_"):
+        return False
+
+    ct_fields = [FIELD_CH1_CQ, FIELD_CH2_CQ, FIELD_CH3_CQ]
+    if any(ct_field in sample for ct_field in ct_fields) and not any(
+        is_ct_value_within_limit(sample.get(ct_field)) for ct_field in ct_fields
+    ):
+        return False
+
+    return sample.get(FIELD_DATE_TESTED) not in (None, "")
+
+
+def read_positive_samples(samples_path: pathlib.Path, window_start: datetime) -> DataFrame:
+    """Read the positive samples tested in the report window from a snapshot of the samples
+    collection. Only the positive samples are kept in memory.
+
+    Arguments:
+        samples_path {pathlib.Path} -- the path of the samples snapshot
+        window_start {datetime} -- the start of the report window
+
+    Returns:
+        DataFrame -- the positive samples, see build_positive_samples_dataframe
+    """
+    number_of_samples = 0
+    positive_samples = []
+    for sample in iter_snapshot(samples_path):
+        number_of_samples += 1
+        date_tested = parse_date_tested(sample)
+        if date_tested is not None and date_tested >= window_start and is_positive_sample(sample):
+            positive_samples.append(
+                {field: sample[field] for field in POSITIVE_SAMPLE_FIELDS if field in sample}
+            )
+
+    logger.info(f"Read {number_of_samples} samples from {samples_path}")
+
+    return build_positive_samples_dataframe(positive_samples)
+
+
+def read_latest_declarations(
+    declarations_path: Optional[pathlib.Path], root_sample_ids: Set[str]
+) -> List[Dict[str, Any]]:
+    """Read the latest declaration of each of the given samples from a snapshot of the
+    samples_declarations (or samples_declarations_latest) collection.
+
+    Arguments:
+        declarations_path {Optional[pathlib.Path]} -- the path of the declarations snapshot; no
+        samples have declarations without one
+        root_sample_ids {Set[str]} -- the root sample ids of the samples
+
+    Returns:
+        List[Dict[str, Any]] -- the latest declarations, see build_declaration_record
+    """
+    if declarations_path is None:
+        return []
+
+    latest_declarations: Dict[str, Dict[str, Any]] = {}
+    for declaration in iter_snapshot(declarations_path):
+        root_sample_id = declaration.get("root_sample_id")
+        if root_sample_id not in root_sample_ids:
+            continue
+
+        latest_declaration = latest_declarations.get(root_sample_id)
+        if (
+            latest_declaration is None
+            or declaration["declared_at"] > latest_declaration["declared_at"]
+        ):
+            latest_declarations[root_sample_id] = declaration
+
+    return [build_declaration_record(declaration) for declaration in latest_declarations.values()]
+
+
+def read_cherrypicked_samples(
+    cherrypicked_path: Optional[pathlib.Path], root_sample_ids: Set[str]
+) -> DataFrame:
+    """Read which of the given samples have been cherrypicked from a snapshot of the index of
+    cherrypicked samples, see refresh_cherrypicked_samples.
+
+    Arguments:
+        cherrypicked_path {Optional[pathlib.Path]} -- the path of the cherrypicked samples
+        snapshot; no samples have been cherrypicked without one
+        root_sample_ids {Set[str]} -- the root sample ids of the samples
+
+    Returns:
+        DataFrame -- the root sample id, plate barcode, lowercased result and coordinate of the
+        samples which have been cherrypicked, as get_cherrypicked_samples returns
+    """
+    records = (
+        [
+            [cherrypicked_sample.get(field) for field in CHERRYPICKED_SAMPLE_KEY]
+            for cherrypicked_sample in iter_snapshot(cherrypicked_path)
+            if cherrypicked_sample.get(FIELD_ROOT_SAMPLE_ID) in root_sample_ids
+        ]
+        if cherrypicked_path is not None
+        else []
+    )
+
+    return (
+        pd.DataFrame.from_records(records, columns=CHERRYPICKED_SAMPLE_KEY)
+        .rename(columns={FIELD_RESULT: "Result_lower"})
+        .drop_duplicates()
+    )
+
+
+def read_locations(locations_path: Optional[pathlib.Path], plate_barcodes: Set[str]) -> DataFrame:
+    """Read the locations of the given plates from a snapshot of the cache of labware locations,
+    see cache_labware_locations. Plates which are not in the snapshot have a null location.
+
+    Arguments:
+        locations_path {Optional[pathlib.Path]} -- the path of the labware locations snapshot; no
+        plates have a location without one
+        plate_barcodes {Set[str]} -- the barcodes of the plates
+
+    Returns:
+        DataFrame -- plate_barcode to location_barcode mapping, as map_labware_to_location returns
+    """
+    # as with LabWhere, plates which are not found are left out so that they have a null location,
+    # and plates which are found without a location have an empty one
+    locations = {}
+    if locations_path is not None:
+        for location in iter_snapshot(locations_path):
+            if location["_id"] in plate_barcodes:
+                locations[location["_id"]] = str(location.get(FIELD_LOCATION_BARCODE) or "")
+
+    logger.info(f"{len(locations)} of {len(plate_barcodes)} plates located from the snapshot")
+
+    return pd.DataFrame.from_records(
+        list(locations.items()), columns=[FIELD_PLATE_BARCODE, FIELD_LOCATION_BARCODE]
+    )
+
+
+def create_offline_report(
+    samples_path: pathlib.Path,
+    report_formats: List[str],
+    declarations_path: Optional[pathlib.Path] = None,
+    locations_path: Optional[pathlib.Path] = None,
+    cherrypicked_path: Optional[pathlib.Path] = None,
+    output_dir: Optional[pathlib.Path] = None,
+) -> List[pathlib.PurePath]:
+    """Create the positive samples report from snapshots of the collections it is created from,
+    rather than from Mongo, LabWhere and the warehouses, so that it can be created away from the
+    primary database. Each snapshot is streamed, keeping only what the report needs in memory. The
+    report is not added to the report catalogue.
+
+    Arguments:
+        samples_path {pathlib.Path} -- the path of the samples snapshot
+        report_formats {List[str]} -- the formats to write the report in
+
+    Keyword Arguments:
+        declarations_path {Optional[pathlib.Path]} -- the path of the samples_declarations snapshot;
+        otherwise no samples have declarations (default: {None})
+        locations_path {Optional[pathlib.Path]} -- the path of the labware_locations snapshot;
+        otherwise no plates have locations (default: {None})
+        cherrypicked_path {Optional[pathlib.Path]} -- the path of the cherrypicked_samples snapshot;
+        otherwise no samples have been cherrypicked (default: {None})
+        output_dir {Optional[pathlib.Path]} -- the folder to write the report to; otherwise the
+        REPORTS_DIR config (default: {None})
+
+    Raises:
+        ReportCreationError: if there are no positive samples in the report window
+
+    Returns:
+        List[pathlib.PurePath] -- the paths of the reports created, one for each format
+    """
+    logger.info(f"Creating positive samples report from snapshot {samples_path}")
+
+    positive_samples_df = read_positive_samples(samples_path, report_query_window_start())
+    if len(positive_samples_df.index) == 0:
+        raise ReportCreationError("There are no positive samples in the report window")
+
+    root_sample_ids = set(positive_samples_df[FIELD_ROOT_SAMPLE_ID].dropna())
+
+    positive_samples_df = merge_samples_declarations(
+        positive_samples_df, read_latest_declarations(declarations_path, root_sample_ids)
+    )
+    positive_samples_df = merge_cherrypicked_samples(
+        positive_samples_df, read_cherrypicked_samples(cherrypicked_path, root_sample_ids)
+    )
+
+    plate_barcodes = {
+        plate_barcode
+        for plate_barcode in positive_samples_df[FIELD_PLATE_BARCODE].dropna().unique()
+        if plate_barcode
+    }
+    merged = merge_locations(positive_samples_df, read_locations(locations_path, plate_barcodes))
+
+    report_paths = []
+    for report_format in report_formats:
+        report_name, report_path = get_new_report_name_and_path(report_format)
+        if output_dir is not None:
+            report_path = output_dir.joinpath(report_name)
+
+        logger.info(f"Writing results to {report_path}")
+        REPORT_WRITERS[report_format](merged, report_path)
+        report_paths.append(report_path)
+
+    return report_paths
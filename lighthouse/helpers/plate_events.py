@@ -1,24 +1,20 @@
+import hashlib
 import logging
+from functools import lru_cache
 from typing import Optional, Dict, Tuple, List
 from uuid import uuid4
 from datetime import datetime
 from flask import current_app as app
+from lighthouse.messages.codecs import get_codec, PreSerialised
 from lighthouse.messages.message import Message  # type: ignore
 from lighthouse.constants import (
     PLATE_EVENT_SOURCE_COMPLETED,
     PLATE_EVENT_SOURCE_NOT_RECOGNISED,
     PLATE_EVENT_SOURCE_NO_MAP_DATA,
     PLATE_EVENT_SOURCE_ALL_NEGATIVES,
-    FIELD_ROOT_SAMPLE_ID,
-    FIELD_RNA_ID,
-    FIELD_LAB_ID,
-    FIELD_RESULT,
-    FIELD_LH_SAMPLE_UUID,
-)
-from lighthouse.helpers.mongo_db import (
-    get_source_plate_uuid,
-    get_samples,
 )
+from lighthouse.helpers.mongo_db import get_source_plate_uuid
+from lighthouse.helpers.source_plate_summaries import get_source_plate_sample_subjects
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +57,34 @@ def get_routing_key(event_type: str) -> str:
     return app.config["RMQ_ROUTING_KEY"].replace("#", event_type)
 
 
+def get_event_key(event_type: str, params: Dict[str, str]) -> str:
+    """Determines the key used to recognise retries of the same plate event. A client supplied
+    'event_id' is used when present; otherwise the key is a fingerprint of the event type, barcode,
+    robot, user and the current minute.
+
+    Arguments:
+        event_type {str} -- The event type of the plate event message.
+        params {Dict[str, str]} -- All parameters of the plate event message request.
+
+    Returns:
+        {str} -- The plate event key.
+    """
+    event_id = params.get("event_id", "")
+    if len(event_id) > 0:
+        return f"event_id:{event_id}"
+
+    fingerprint = "|".join(
+        [
+            event_type,
+            params.get("barcode", ""),
+            params.get("robot", ""),
+            params.get("user_id", ""),
+            datetime.now().strftime("%Y-%m-%dT%H:%M"),
+        ]
+    )
+    return f"fingerprint:{hashlib.sha1(fingerprint.encode()).hexdigest()}"
+
+
 def construct_source_plate_completed_message(
     params: Dict[str, str]
 ) -> Tuple[List[str], Optional[Message]]:
@@ -92,15 +116,15 @@ def construct_source_plate_completed_message(
         if source_plate_uuid is None:
             return [f"Unable to determine a uuid for source plate '{barcode}'"], None
 
-        samples = get_samples(source_plate_uuid)
-        if samples is None:
+        sample_subjects = get_source_plate_sample_subjects(source_plate_uuid)
+        if sample_subjects is None:
             return [f"Unable to determine samples that belong to source plate '{barcode}'"], None
 
         event_subjects = [
             __construct_robot_message_subject(robot_serial_number, robot_uuid),
             __construct_source_plate_message_subject(barcode, source_plate_uuid),
         ]
-        event_subjects.extend([__construct_sample_message_subject(sample) for sample in samples])
+        event_subjects.extend(sample_subjects)
         message_content = {
             "event": {
                 "uuid": str(uuid4()),
@@ -112,7 +136,7 @@ def construct_source_plate_completed_message(
             },
             "lims": app.config["RMQ_LIMS_ID"],
         }
-        return [], Message(message_content)
+        return [], Message(message_content, get_codec(app.config["RMQ_MESSAGE_CODEC"]))
     except Exception as e:
         logger.error(f"Failed to construct a {PLATE_EVENT_SOURCE_COMPLETED} message")
         logger.exception(e)
@@ -159,7 +183,7 @@ def construct_source_plate_not_recognised_message(
             },
             "lims": app.config["RMQ_LIMS_ID"],
         }
-        return [], Message(message_content)
+        return [], Message(message_content, get_codec(app.config["RMQ_MESSAGE_CODEC"]))
     except Exception as e:
         logger.error(f"Failed to construct a {PLATE_EVENT_SOURCE_NOT_RECOGNISED} message")
         logger.exception(e)
@@ -273,7 +297,7 @@ def __construct_default_source_plate_on_robot_message(
             },
             "lims": app.config["RMQ_LIMS_ID"],
         }
-        return [], Message(message_content)
+        return [], Message(message_content, get_codec(app.config["RMQ_MESSAGE_CODEC"]))
     except Exception as e:
         logger.error(f"Failed to construct a {event_type} message")
         logger.exception(e)
@@ -282,8 +306,10 @@ def __construct_default_source_plate_on_robot_message(
         ], None
 
 
+@lru_cache(maxsize=None)
 def __construct_robot_message_subject(serial_number: str, uuid: str) -> Dict[str, str]:
-    """Generates a robot subject for a plate event message.
+    """Generates a robot subject for a plate event message. Robots are static configuration, so the
+    subject is pre-serialised once per robot and shared between messages.
 
     Arguments:
         serial_number {str} -- The robot serial number.
@@ -292,12 +318,14 @@ def __construct_robot_message_subject(serial_number: str, uuid: str) -> Dict[str
     Returns:
         {Dict[str, str]} -- The robot message subject.
     """
-    return {
-        "role_type": "robot",
-        "subject_type": "robot",
-        "friendly_name": serial_number,
-        "uuid": uuid,
-    }
+    return PreSerialised(
+        {
+            "role_type": "robot",
+            "subject_type": "robot",
+            "friendly_name": serial_number,
+            "uuid": uuid,
+        }
+    )
 
 
 def __construct_source_plate_message_subject(barcode: str, uuid: str) -> Dict[str, str]:
@@ -316,28 +344,3 @@ def __construct_source_plate_message_subject(barcode: str, uuid: str) -> Dict[st
         "friendly_name": barcode,
         "uuid": uuid,
     }
-
-
-def __construct_sample_message_subject(sample: Dict[str, str]) -> Dict[str, str]:
-    """Generates sample subject for a plate event message.
-
-    Arguments:
-        samples {Dict[str, str]} -- The sample for which to generate a subject.
-
-    Returns:
-        {Dict[str, str]} -- The plate message sample subject.
-    """
-    friendly_name = "__".join(
-        [
-            sample[FIELD_ROOT_SAMPLE_ID],
-            sample[FIELD_RNA_ID],
-            sample[FIELD_LAB_ID],
-            sample[FIELD_RESULT],
-        ]
-    )
-    return {
-        "role_type": "sample",
-        "subject_type": "sample",
-        "friendly_name": friendly_name,
-        "uuid": sample[FIELD_LH_SAMPLE_UUID],
-    }
@@ -0,0 +1,182 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app as app
+from lighthouse.constants import (
+    FIELD_FILTERED_POSITIVES,
+    FIELD_PARSED_DATE_TESTED,
+    FIELD_PLATE_BARCODE,
+    FIELD_POSITIVES,
+    FIELD_RESULT,
+    FIELD_SAMPLES,
+    FIELD_SOURCE,
+    FIELD_TEST_DATE,
+    FIELD_UPDATED_AT,
+    STAGE_MATCH_POSITIVE,
+)
+
+logger = logging.getLogger(__name__)
+
+# The format of the day tested which rollups are kept for; sorts in date order
+TEST_DATE_FORMAT = "%Y-%m-%d"
+
+# The counts kept in each rollup
+ROLLUP_COUNTS = [FIELD_SAMPLES, FIELD_POSITIVES, FIELD_FILTERED_POSITIVES]
+
+
+def refresh_positive_rollups_for_plate(plate_barcode: str) -> None:
+    """Recount the samples, positives and filtered positives (those matched by
+    STAGE_MATCH_POSITIVE) on a plate for each source and day tested, replacing the plate's rollups.
+    Should be called whenever samples on the plate change. Samples without a parsed date_tested are
+    not counted.
+
+    Arguments:
+        plate_barcode {str} -- The barcode of the plate for which to refresh the rollups.
+    """
+    try:
+        samples_collection = app.data.driver.db.samples
+        positive_rollups = app.data.driver.db.positive_rollups
+
+        filtered_positive_ids = {
+            sample["_id"]
+            for sample in samples_collection.find(
+                {FIELD_PLATE_BARCODE: plate_barcode, **STAGE_MATCH_POSITIVE["$match"]},
+                {"_id": True},
+            )
+        }
+
+        counts: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(
+            lambda: {count: 0 for count in ROLLUP_COUNTS}
+        )
+        for sample in samples_collection.find(
+            {FIELD_PLATE_BARCODE: plate_barcode, FIELD_PARSED_DATE_TESTED: {"$ne": None}},
+            {FIELD_SOURCE: True, FIELD_RESULT: True, FIELD_PARSED_DATE_TESTED: True},
+        ):
+            rollup = counts[
+                (
+                    sample.get(FIELD_SOURCE),
+                    sample[FIELD_PARSED_DATE_TESTED].strftime(TEST_DATE_FORMAT),
+                )
+            ]
+            rollup[FIELD_SAMPLES] += 1
+            if str(sample.get(FIELD_RESULT, "")).lower().startswith("positive"):
+                rollup[FIELD_POSITIVES] += 1
+            if sample["_id"] in filtered_positive_ids:
+                rollup[FIELD_FILTERED_POSITIVES] += 1
+
+        updated_at = datetime.utcnow()
+        for (source, test_date), rollup in counts.items():
+            positive_rollups.replace_one(
+                {
+                    FIELD_SOURCE: source,
+                    FIELD_TEST_DATE: test_date,
+                    FIELD_PLATE_BARCODE: plate_barcode,
+                },
+                {
+                    FIELD_SOURCE: source,
+                    FIELD_TEST_DATE: test_date,
+                    FIELD_PLATE_BARCODE: plate_barcode,
+                    **rollup,
+                    FIELD_UPDATED_AT: updated_at,
+                },
+                upsert=True,
+            )
+
+        # remove the rollups of days or sources the plate no longer has samples for
+        stale_rollups: Dict[str, Any] = {FIELD_PLATE_BARCODE: plate_barcode}
+        if len(counts) > 0:
+            stale_rollups["$nor"] = [
+                {FIELD_SOURCE: source, FIELD_TEST_DATE: test_date} for source, test_date in counts
+            ]
+        positive_rollups.delete_many(stale_rollups)
+    except Exception as e:
+        logger.error(
+            "An error occurred attempting to refresh the positive rollups of plate "
+            f"'{plate_barcode}'"
+        )
+        logger.exception(e)
+
+
+def refresh_positive_rollups_for_samples(samples: Iterable[Dict[str, Any]]) -> None:
+    """Refresh the positive rollups of all plates which the given samples are on.
+
+    Arguments:
+        samples {Iterable[Dict[str, Any]]} -- The samples which have changed.
+    """
+    plate_barcodes = {
+        sample[FIELD_PLATE_BARCODE] for sample in samples if sample.get(FIELD_PLATE_BARCODE)
+    }
+    logger.info(f"Refreshing the positive rollups of {len(plate_barcodes)} plates")
+
+    for plate_barcode in plate_barcodes:
+        refresh_positive_rollups_for_plate(plate_barcode)
+
+
+def rebuild_positive_rollups() -> int:
+    """Rebuild the positive rollups of every plate which has samples.
+
+    Returns:
+        {int} -- The number of plates rolled up.
+    """
+    plate_barcodes = app.data.driver.db.samples.distinct(
+        FIELD_PLATE_BARCODE, {FIELD_PLATE_BARCODE: {"$nin": ["", None]}}
+    )
+    logger.info(f"Rebuilding the positive rollups of {len(plate_barcodes)} plates")
+
+    for plate_barcode in plate_barcodes:
+        refresh_positive_rollups_for_plate(plate_barcode)
+
+    return len(plate_barcodes)
+
+
+def get_positive_counts(
+    source: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """Get the number of samples, positives and filtered positives tested by each centre on each
+    day, from the positive rollups rather than the samples themselves.
+
+    Keyword Arguments:
+        source {Optional[str]} -- only count samples from this centre (default: {None})
+        date_from {Optional[datetime]} -- only count samples tested on or after this day
+        (default: {None})
+        date_to {Optional[datetime]} -- only count samples tested before this day (default: {None})
+
+    Returns:
+        {List[Dict[str, Any]]} -- The counts, and number of plates, for each centre and day tested,
+        in order of day tested.
+    """
+    match: Dict[str, Any] = {}
+    if source is not None:
+        match[FIELD_SOURCE] = source
+    if date_from is not None or date_to is not None:
+        match[FIELD_TEST_DATE] = {}
+        if date_from is not None:
+            match[FIELD_TEST_DATE]["$gte"] = date_from.strftime(TEST_DATE_FORMAT)
+        if date_to is not None:
+            match[FIELD_TEST_DATE]["$lt"] = date_to.strftime(TEST_DATE_FORMAT)
+
+    pipeline = [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {FIELD_SOURCE: f"${FIELD_SOURCE}", FIELD_TEST_DATE: f"${FIELD_TEST_DATE}"},
+                "plates": {"$sum": 1},
+                **{count: {"$sum": f"${count}"} for count in ROLLUP_COUNTS},
+            }
+        },
+        {"$sort": {f"_id.{FIELD_TEST_DATE}": 1, f"_id.{FIELD_SOURCE}": 1}},
+    ]
+
+    return [
+        {
+            FIELD_SOURCE: counts["_id"][FIELD_SOURCE],
+            FIELD_TEST_DATE: counts["_id"][FIELD_TEST_DATE],
+            "plates": counts["plates"],
+            **{count: counts[count] for count in ROLLUP_COUNTS},
+        }
+        for counts in app.data.driver.db.positive_rollups.aggregate(pipeline)
+    ]
@@ -0,0 +1,192 @@
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from threading import Event, Thread
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bson.objectid import ObjectId  # type: ignore
+from bson.errors import InvalidId  # type: ignore
+from flask import current_app as app
+from lighthouse.constants import (
+    REPORT_JOB_STATUS_COMPLETED,
+    REPORT_JOB_STATUS_FAILED,
+    REPORT_JOB_STATUS_QUEUED,
+    REPORT_JOB_STATUS_RUNNING,
+)
+from pymongo.errors import DuplicateKeyError  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_report_job(report_formats: List[str]) -> Tuple[ObjectId, bool]:
+    """Record a new report job, unless a report is already being created in which case that job is
+    returned instead. Only one job can be active at a time, which is enforced by the unique partial
+    index on the "active" field. An active job which has not recorded a heartbeat (see
+    report_job_heartbeat) for REPORT_JOB_STALE_AFTER seconds is assumed to have died with the
+    process running it, and is failed so that a new job can take its place.
+
+    Arguments:
+        report_formats {List[str]} -- The formats to create the report in.
+
+    Returns:
+        {Tuple[ObjectId, bool]} -- The id of the job, and whether it was newly created (and so needs
+        to be run).
+    """
+    report_jobs = app.data.driver.db.report_jobs
+    now = datetime.utcnow()
+    try:
+        result = report_jobs.insert_one(
+            {
+                "status": REPORT_JOB_STATUS_QUEUED,
+                "stage": None,
+                "report_formats": report_formats,
+                "report_names": [],
+                "errors": [],
+                "active": True,
+                "created_at": now,
+                "updated_at": now,
+                "heartbeat_at": now,
+            }
+        )
+        return result.inserted_id, True
+    except DuplicateKeyError:
+        stale_before = now - timedelta(seconds=app.config["REPORT_JOB_STALE_AFTER"])
+        stale_job = report_jobs.find_one_and_update(
+            {"active": True, "heartbeat_at": {"$lt": stale_before}},
+            {
+                "$set": {
+                    "status": REPORT_JOB_STATUS_FAILED,
+                    "errors": ["Report job stopped responding"],
+                    "updated_at": now,
+                },
+                "$unset": {"active": ""},
+            },
+        )
+        if stale_job is not None:
+            logger.warning(f"Failed stale report job {stale_job['_id']}")
+            return enqueue_report_job(report_formats)
+
+        active_job = report_jobs.find_one({"active": True}, {"_id": True})
+        if active_job is None:
+            # the active job finished in the meantime
+            return enqueue_report_job(report_formats)
+
+        return active_job["_id"], False
+
+
+def mark_report_job_running(job_id: ObjectId) -> None:
+    """Mark a report job as running.
+
+    Arguments:
+        job_id {ObjectId} -- The id of the job.
+    """
+    _update_report_job(job_id, {"status": REPORT_JOB_STATUS_RUNNING})
+
+
+@contextmanager
+def report_job_heartbeat(job_id: ObjectId) -> Iterator[None]:
+    """Record a heartbeat for a report job every REPORT_JOB_HEARTBEAT_INTERVAL seconds while the
+    block runs, from a background thread, so that a job whose stages take a long time is not
+    mistaken for one which has died.
+
+    Arguments:
+        job_id {ObjectId} -- The id of the job.
+    """
+    # the heartbeat is recorded from a background thread, so pass it the collection and interval
+    # rather than relying on the app context
+    report_jobs = app.data.driver.db.report_jobs
+    interval = app.config["REPORT_JOB_HEARTBEAT_INTERVAL"]
+    stopped = Event()
+
+    def beat() -> None:
+        while not stopped.wait(interval):
+            try:
+                report_jobs.update_one(
+                    {"_id": job_id, "active": True}, {"$set": {"heartbeat_at": datetime.utcnow()}}
+                )
+            except Exception as e:
+                logger.error(f"An error occurred attempting to record a heartbeat for job {job_id}")
+                logger.exception(e)
+
+    heartbeat = Thread(target=beat, name=f"report-job-heartbeat-{job_id}", daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        heartbeat.join()
+
+
+def set_report_job_stage(job_id: ObjectId, stage: str) -> None:
+    """Record the stage a running report job has reached.
+
+    Arguments:
+        job_id {ObjectId} -- The id of the job.
+        stage {str} -- The stage of report creation being started.
+    """
+    _update_report_job(job_id, {"stage": stage})
+
+
+def complete_report_job(job_id: ObjectId, report_names: List[str]) -> None:
+    """Mark a report job as completed, allowing another job to start.
+
+    Arguments:
+        job_id {ObjectId} -- The id of the job.
+        report_names {List[str]} -- The filenames of the reports created.
+    """
+    _update_report_job(
+        job_id,
+        {"status": REPORT_JOB_STATUS_COMPLETED, "stage": None, "report_names": report_names},
+        finished=True,
+    )
+
+
+def fail_report_job(job_id: ObjectId, errors: List[str]) -> None:
+    """Mark a report job as failed, allowing another job to start.
+
+    Arguments:
+        job_id {ObjectId} -- The id of the job.
+        errors {List[str]} -- The errors which caused the job to fail.
+    """
+    _update_report_job(
+        job_id, {"status": REPORT_JOB_STATUS_FAILED, "errors": errors}, finished=True
+    )
+
+
+def get_report_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get the details of a report job.
+
+    Arguments:
+        job_id {str} -- The id of the job.
+
+    Returns:
+        {Optional[Dict[str, Any]]} -- The job's status, stage, report filenames and errors;
+        otherwise None if there is no job with the id.
+    """
+    try:
+        job = app.data.driver.db.report_jobs.find_one({"_id": ObjectId(job_id)})
+    except (InvalidId, TypeError):
+        return None
+
+    if job is None:
+        return None
+
+    return {
+        "id": str(job["_id"]),
+        "status": job["status"],
+        "stage": job["stage"],
+        "report_formats": job["report_formats"],
+        "report_names": job["report_names"],
+        "errors": job["errors"],
+        "created_at": job["created_at"].isoformat(),
+        "updated_at": job["updated_at"].isoformat(),
+    }
+
+
+def _update_report_job(job_id: ObjectId, fields: Dict[str, Any], finished: bool = False) -> None:
+    now = datetime.utcnow()
+    update: Dict[str, Any] = {"$set": {**fields, "updated_at": now, "heartbeat_at": now}}
+    if finished:
+        update["$unset"] = {"active": ""}
+
+    app.data.driver.db.report_jobs.update_one({"_id": job_id}, update)
@@ -0,0 +1,153 @@
+import logging
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from bson.objectid import ObjectId  # type: ignore
+from flask import current_app as app
+from lighthouse.constants import REPORT_JOB_STATUS_RUNNING
+from lighthouse.helpers.reports import convert_size
+from pymongo import DESCENDING  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+def get_max_rss() -> int:
+    """Get the peak resident set size of the process so far.
+
+    Returns:
+        {int} -- The peak resident set size, in bytes.
+    """
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def start_report_run() -> Optional[ObjectId]:
+    """Record the start of creating the positive samples report. The profile of each stage is added
+    to the run as the stage finishes, so a run which is killed part way through, e.g. for running
+    out of memory, shows the stages it got through.
+
+    Returns:
+        {Optional[ObjectId]} -- The id of the run; otherwise None if it could not be recorded.
+    """
+    try:
+        result = app.data.driver.db.report_runs.insert_one(
+            {
+                "status": REPORT_JOB_STATUS_RUNNING,
+                "stages": [],
+                "report_names": [],
+                "started_at": datetime.utcnow(),
+            }
+        )
+        return result.inserted_id
+    except Exception as e:
+        logger.error("An error occurred attempting to record a report run")
+        logger.exception(e)
+        return None
+
+
+@contextmanager
+def profile_report_stage(run_id: Optional[ObjectId], name: str) -> Iterator[Dict[str, Any]]:
+    """Profile a stage of creating the positive samples report, adding its wall time, the peak
+    memory allocated during it (traced with tracemalloc if REPORT_PROFILE_MEMORY is set), the
+    process' peak resident set size after it and the number of rows it produced to the report run.
+    The stage sets the number of rows on the profile it is given.
+
+    Arguments:
+        run_id {Optional[ObjectId]} -- The id of the report run, see start_report_run.
+        name {str} -- The name of the stage.
+
+    Yields:
+        {Dict[str, Any]} -- The profile of the stage.
+    """
+    profile: Dict[str, Any] = {"name": name, "rows": None}
+    # a trace which is already running, e.g. one stage within another, is left alone
+    trace_memory = app.config["REPORT_PROFILE_MEMORY"] and not tracemalloc.is_tracing()
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.time()
+    try:
+        yield profile
+    finally:
+        profile["elapsed"] = round(time.time() - start, 3)
+        profile["peak_memory"] = None
+        if trace_memory:
+            _, profile["peak_memory"] = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        profile["max_rss"] = get_max_rss()
+
+        logger.info(
+            f"Report stage {name}: {profile['rows']} rows in {profile['elapsed']}s, peak memory "
+            f"{convert_size(profile['peak_memory'] or 0)}, "
+            f"peak RSS {convert_size(profile['max_rss'])}"
+        )
+        _update_report_run(run_id, {"$push": {"stages": profile}})
+
+
+def finish_report_run(
+    run_id: Optional[ObjectId], status: str, report_names: Optional[List[str]] = None
+) -> None:
+    """Record the end of creating the positive samples report.
+
+    Arguments:
+        run_id {Optional[ObjectId]} -- The id of the report run, see start_report_run.
+        status {str} -- Whether the report was created ("completed"), was unchanged ("unchanged")
+        or failed ("failed").
+
+    Keyword Arguments:
+        report_names {Optional[List[str]]} -- The filenames of the reports (default: {None})
+    """
+    _update_report_run(
+        run_id,
+        {
+            "$set": {
+                "status": status,
+                "report_names": report_names or [],
+                "max_rss": get_max_rss(),
+                "finished_at": datetime.utcnow(),
+            }
+        },
+    )
+
+
+def get_report_runs(max_results: int) -> List[Dict[str, Any]]:
+    """Get the latest report runs, with the profile of each of their stages.
+
+    Arguments:
+        max_results {int} -- The number of runs to get.
+
+    Returns:
+        {List[Dict[str, Any]]} -- The runs, newest first.
+    """
+    report_runs = app.data.driver.db.report_runs.find(
+        {}, sort=[("started_at", DESCENDING), ("_id", DESCENDING)], limit=max_results
+    )
+
+    return [
+        {
+            "id": str(run["_id"]),
+            "status": run["status"],
+            "report_names": run["report_names"],
+            "stages": run["stages"],
+            "max_rss": run.get("max_rss"),
+            "started_at": run["started_at"].isoformat(),
+            "finished_at": run["finished_at"].isoformat() if "finished_at" in run else None,
+        }
+        for run in report_runs
+    ]
+
+
+def _update_report_run(run_id: Optional[ObjectId], update: Dict[str, Any]) -> None:
+    if run_id is None:
+        return
+
+    # profiling is not allowed to fail the report
+    try:
+        app.data.driver.db.report_runs.update_one({"_id": run_id}, update)
+    except Exception as e:
+        logger.error(f"An error occurred attempting to update report run {run_id}")
+        logger.exception(e)
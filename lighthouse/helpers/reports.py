@@ -1,42 +1,111 @@
+import hashlib
+import json
 import logging
 import math
 import os
 import pathlib
 import re
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from http import HTTPStatus
-from typing import Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd  # type: ignore
 import requests
-import sqlalchemy  # type: ignore
+import xlsxwriter  # type: ignore
+from bson.errors import InvalidId  # type: ignore
+from bson.objectid import ObjectId  # type: ignore
 from flask import current_app as app
 from lighthouse.constants import (
     FIELD_COORDINATE,
+    FIELD_CREATED_AT,
     FIELD_DATE_TESTED,
+    FIELD_FINGERPRINT,
+    FIELD_LOCATION_BARCODE,
+    FIELD_PARSED_DATE_TESTED,
     FIELD_PLATE_BARCODE,
     FIELD_RESULT,
     FIELD_ROOT_SAMPLE_ID,
+    FIELD_SIZE,
     FIELD_SOURCE,
+    REPORT_FORMAT_CSV_GZ,
+    REPORT_FORMAT_PARQUET,
+    REPORT_FORMAT_XLSX,
+    REPORT_FORMATS,
     STAGE_MATCH_POSITIVE,
 )
 from lighthouse.exceptions import ReportCreationError
+from lighthouse.helpers.cherrypicked_samples import (
+    get_indexed_cherrypicked_samples,
+    get_last_cherrypicked_event_id,
+    get_latest_cherrypick_event_id,
+)
+from lighthouse.helpers.mongo_db import (
+    backfill_date_tested,
+    cache_labware_locations,
+    get_cached_labware_locations,
+    is_latest_samples_declarations_built,
+)
+from lighthouse.helpers.mysql_db import get_warehouses_ro_engine
 from lighthouse.utils import pretty
 from pandas import DataFrame
 from pymongo.collection import Collection  # type: ignore
 
+try:
+    import pyarrow  # type: ignore  # noqa: F401
+except ImportError:
+    pyarrow = None
+
 logger = logging.getLogger(__name__)
 PROJECT_ROOT = pathlib.Path(__file__).parent.parent.parent
 
+# The report columns with few distinct values, which are stored as categoricals where the format
+# supports it
+REPORT_CATEGORICAL_COLUMNS = [
+    FIELD_SOURCE,
+    FIELD_RESULT,
+    FIELD_PLATE_BARCODE,
+    FIELD_COORDINATE,
+    FIELD_LOCATION_BARCODE,
+    "Value In Sequencing",
+    "LIMS submission",
+]
+
+# The report columns with few distinct values which are held as categoricals while the report is
+# created, which takes far less memory than holding a Python string for each row
+POSITIVE_SAMPLES_CATEGORICAL_COLUMNS = [
+    FIELD_SOURCE,
+    FIELD_RESULT,
+    FIELD_PLATE_BARCODE,
+    "LIMS submission",
+]
+
+# A partition of the report window: the samples from a source tested between a start (inclusive)
+# and an end (exclusive, or None for no end)
+ReportPartition = Tuple[Optional[str], datetime, Optional[datetime]]
+
+# The id of the document recording that the report catalogue has been reconciled with the reports
+# folder, see reconcile_report_catalogue
+REPORT_CATALOGUE_REBUILD_ID = "report_catalogue"
+
+# The naming convention of report files
+REPORT_NAME_PATTERN = re.compile(
+    r"^\d{6}_\d{4}_positives_with_locations\.("
+    + "|".join(re.escape(report_format) for report_format in REPORT_FORMATS)
+    + ")$"
+)
 
-def get_reports_details(filename: str = None) -> List[Dict[str, str]]:
+
+def get_reports_details(filenames: Optional[List[str]] = None) -> List[Dict[str, str]]:
     """Get the details of reports, including:
     - size
     - created timestamp
     - download URL - should point to where the files will be hosted from
 
     Keyword Arguments:
-        filename {str} -- if filename is provided, only this report's details will be returned
+        filenames {List[str]} -- if filenames are provided, only these reports' details will be
+        returned, otherwise the details of all reports in the catalogue are returned, newest first
         (default: {None})
 
     Returns:
@@ -44,16 +113,11 @@ def get_reports_details(filename: str = None) -> List[Dict[str, str]]:
     """
     logger.debug("Getting reports' details")
 
-    REPORTS_PATH = PROJECT_ROOT.joinpath(app.config["REPORTS_DIR"])
+    if not filenames:
+        reports_details, _ = get_catalogued_reports_details()
+        return reports_details
 
-    if filename:
-        reports = iter([filename])
-    else:
-        (_, _, files) = next(os.walk(REPORTS_PATH))
-
-        # we only want files which match the report naming convention
-        report_pattern = re.compile(r"^\d{6}_\d{4}_positives_with_locations.xlsx$")
-        reports = filter(report_pattern.match, files)
+    REPORTS_PATH = PROJECT_ROOT.joinpath(app.config["REPORTS_DIR"])
 
     return [
         {
@@ -64,9 +128,204 @@ def get_reports_details(filename: str = None) -> List[Dict[str, str]]:
             ).strftime("%c"),
             "download_url": f"{app.config['DOWNLOAD_REPORTS_URL']}/{filename}",
         }
-        for filename in reports
+        for filename in filenames
+    ]
+
+
+def get_catalogued_reports_details(
+    page: int = 1, max_results: Optional[int] = None
+) -> Tuple[List[Dict[str, str]], int]:
+    """Get the details of reports from the report catalogue, newest first, without needing to read
+    the reports folder (other than to build the catalogue, if it has never been built).
+
+    Keyword Arguments:
+        page {int} -- the page of reports to get, starting from 1 (default: {1})
+        max_results {Optional[int]} -- the number of reports on each page; all reports are returned
+        if not given (default: {None})
+
+    Returns:
+        Tuple[List[Dict[str, str]], int] -- the details of the reports on the page, and the total
+        number of reports in the catalogue
+    """
+    ensure_report_catalogue_reconciled()
+
+    report_catalogue = app.data.driver.db.report_catalogue
+    reports = report_catalogue.find().sort(FIELD_CREATED_AT, -1)
+    if max_results is not None:
+        reports = reports.skip((page - 1) * max_results).limit(max_results)
+
+    reports_details = [
+        {
+            "filename": report["_id"],
+            "size": convert_size(report[FIELD_SIZE]),
+            "created": report[FIELD_CREATED_AT]
+            .replace(tzinfo=timezone.utc)
+            .astimezone()
+            .strftime("%c"),
+            "download_url": f"{app.config['DOWNLOAD_REPORTS_URL']}/{report['_id']}",
+        }
+        for report in reports
     ]
 
+    return reports_details, report_catalogue.count_documents({})
+
+
+def add_to_report_catalogue(
+    report_paths: List[pathlib.PurePath], fingerprint: Optional[str] = None
+) -> None:
+    """Add reports which have been written to the report catalogue, or update their entries.
+
+    Arguments:
+        report_paths {List[pathlib.PurePath]} -- the paths of the reports
+
+    Keyword Arguments:
+        fingerprint {Optional[str]} -- the fingerprint of the inputs the reports were created from,
+        see get_report_inputs_fingerprint; an existing fingerprint is kept if not given
+        (default: {None})
+    """
+    for report_path in report_paths:
+        stat = os.stat(report_path)
+        entry = {
+            FIELD_SIZE: stat.st_size,
+            FIELD_CREATED_AT: datetime.utcfromtimestamp(stat.st_mtime),
+        }
+        if fingerprint is not None:
+            entry[FIELD_FINGERPRINT] = fingerprint
+
+        app.data.driver.db.report_catalogue.update_one(
+            {"_id": report_path.name}, {"$set": entry}, upsert=True
+        )
+
+
+def get_report_inputs_fingerprint() -> Optional[str]:
+    """Get a fingerprint of the inputs to the positive samples report, which changes whenever the
+    report would: when samples are imported, samples are declared, samples are cherrypicked or the
+    report window moves on. Each is found with a single indexed query.
+
+    Returns:
+        Optional[str] -- the fingerprint; otherwise None if it cannot be determined
+    """
+    try:
+        db = app.data.driver.db
+        last_updated = app.config["LAST_UPDATED"]
+
+        latest_import = db.imports.find_one({}, {"date": True}, sort=[("date", -1)])
+        latest_declaration = db.samples_declarations.find_one(
+            {}, {last_updated: True}, sort=[(last_updated, -1)]
+        )
+        latest_cherrypick_event_id: Optional[int]
+        if app.config["CHERRYPICKED_SAMPLES_INDEX"]:
+            latest_cherrypick_event_id = get_last_cherrypicked_event_id()
+        else:
+            latest_cherrypick_event_id = get_latest_cherrypick_event_id()
+
+        inputs = {
+            "window_start": report_query_window_start().isoformat(),
+            "latest_import": latest_import and str(latest_import.get("date")),
+            "latest_declaration": latest_declaration and str(latest_declaration.get(last_updated)),
+            "latest_cherrypick_event_id": latest_cherrypick_event_id,
+        }
+        logger.debug(f"Report inputs: {inputs}")
+
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+    except Exception as e:
+        logger.error("An error occurred attempting to fingerprint the report inputs")
+        logger.exception(e)
+        return None
+
+
+def get_reports_with_fingerprint(
+    fingerprint: str, report_formats: List[str]
+) -> Optional[List[str]]:
+    """Find the latest report in each of the given formats which was created from inputs with the
+    given fingerprint.
+
+    Arguments:
+        fingerprint {str} -- the fingerprint of the report inputs, see
+        get_report_inputs_fingerprint
+        report_formats {List[str]} -- the formats of the reports
+
+    Returns:
+        Optional[List[str]] -- the filenames of the reports, one for each format; otherwise None if
+        any of the reports does not exist
+    """
+    report_names = []
+    for report_format in report_formats:
+        report = app.data.driver.db.report_catalogue.find_one(
+            {FIELD_FINGERPRINT: fingerprint, "_id": {"$regex": f"\\.{re.escape(report_format)}$"}},
+            sort=[(FIELD_CREATED_AT, -1)],
+        )
+        if report is None or get_report_path(report["_id"]) is None:
+            return None
+
+        report_names.append(report["_id"])
+
+    return report_names
+
+
+def remove_from_report_catalogue(filenames: List[str]) -> None:
+    """Remove reports from the report catalogue.
+
+    Arguments:
+        filenames {List[str]} -- the filenames of the reports
+    """
+    app.data.driver.db.report_catalogue.delete_many({"_id": {"$in": filenames}})
+
+
+def reconcile_report_catalogue() -> Tuple[int, int]:
+    """Rebuild the report catalogue from the reports in the reports folder, adding any reports
+    missing from the catalogue and removing entries for reports which no longer exist.
+
+    Returns:
+        Tuple[int, int] -- the number of reports catalogued, and the number of entries removed
+    """
+    REPORTS_PATH = PROJECT_ROOT.joinpath(app.config["REPORTS_DIR"])
+    _, _, files = next(os.walk(REPORTS_PATH))
+
+    # we only want files which match the report naming convention
+    filenames = list(filter(REPORT_NAME_PATTERN.match, files))
+    add_to_report_catalogue([REPORTS_PATH.joinpath(filename) for filename in filenames])
+
+    db = app.data.driver.db
+    result = db.report_catalogue.delete_many({"_id": {"$nin": filenames}})
+    db.rebuilds.replace_one(
+        {"_id": REPORT_CATALOGUE_REBUILD_ID}, {"rebuilt_at": datetime.utcnow()}, upsert=True
+    )
+    logger.info(
+        f"Catalogued {len(filenames)} reports, removed {result.deleted_count} missing reports"
+    )
+
+    return len(filenames), result.deleted_count
+
+
+def ensure_report_catalogue_reconciled() -> None:
+    """Reconcile the report catalogue with the reports folder if it has never been reconciled, such
+    as just after deploying, when the reports already in the folder have not been catalogued.
+    """
+    if app.data.driver.db.rebuilds.find_one({"_id": REPORT_CATALOGUE_REBUILD_ID}) is None:
+        logger.info("The report catalogue has never been reconciled, reconciling it")
+        reconcile_report_catalogue()
+
+
+def get_report_path(filename: str) -> Optional[pathlib.Path]:
+    """Get the path of an existing report file. Only files following the report naming convention
+    are returned, so that nothing else can be read from the reports folder.
+
+    Arguments:
+        filename {str} -- the filename of the report
+
+    Returns:
+        Optional[pathlib.Path] -- path of the report; otherwise None if there is no such report
+    """
+    if not REPORT_NAME_PATTERN.match(filename):
+        return None
+
+    report_path = PROJECT_ROOT.joinpath(app.config["REPORTS_DIR"], filename)
+    if not report_path.is_file():
+        return None
+
+    return report_path
+
 
 def get_file_size(file_path: pathlib.PurePath) -> str:
     """Get the size of a file in a human friendly format.
@@ -104,14 +363,20 @@ def convert_size(size_in_bytes: int) -> str:
     return f"{s} {size_name[i]}"
 
 
-def get_new_report_name_and_path() -> Tuple[str, pathlib.PurePath]:
+def get_new_report_name_and_path(
+    report_format: str = REPORT_FORMAT_XLSX,
+) -> Tuple[str, pathlib.PurePath]:
     """Get the name and path of a report which is being created.
 
+    Keyword Arguments:
+        report_format {str} -- the format of the report, used as its extension
+        (default: {REPORT_FORMAT_XLSX})
+
     Returns:
         Tuple[str, pathlib.PurePath] -- filename and path of report being created
     """
     report_date = datetime.now().strftime("%y%m%d_%H%M")
-    report_name = f"{report_date}_positives_with_locations.xlsx"
+    report_name = f"{report_date}_positives_with_locations.{report_format}"
     REPORTS_PATH = PROJECT_ROOT.joinpath(app.config["REPORTS_DIR"])
     report_path = REPORTS_PATH.joinpath(report_name)
 
@@ -139,110 +404,223 @@ def delete_reports(filenames):
         if os.path.isfile(full_path):
             os.remove(full_path)
 
+    remove_from_report_catalogue(filenames)
+
 
 def map_labware_to_location(labware_barcodes):
-    response = get_locations_from_labwhere(labware_barcodes)
+    """Look up the locations of the given labware. Locations cached within
+    LABWHERE_LOCATIONS_CACHE_TTL are used directly and the rest are looked up in LabWhere, in chunks
+    of LABWHERE_CHUNK_SIZE with up to LABWHERE_MAX_WORKERS requests in flight at once.
 
-    if response.status_code != HTTPStatus.OK:
-        raise ReportCreationError("Response from LabWhere is not OK")
+    Arguments:
+        labware_barcodes {List[str]} -- the barcodes of the labware to locate
 
-    # create a plate_barcode to location_barcode mapping to join with samples
-    # return none for samples where location barcode is not present
-    labware_to_location_barcode = [
-        {
-            FIELD_PLATE_BARCODE: record["barcode"],
-            "location_barcode": str(record["location_barcode"] or ""),
-        }
-        for record in response.json()
+    Returns:
+        DataFrame -- plate_barcode to location_barcode mapping, with an empty location barcode for
+        labware which does not have a location
+    """
+    labwhere_url = app.config["LABWHERE_URL"]
+    chunk_size = app.config["LABWHERE_CHUNK_SIZE"]
+
+    labware_barcodes = list(dict.fromkeys(labware_barcodes))
+    locations = get_cached_labware_locations(labware_barcodes)
+    uncached_labware_barcodes = [
+        barcode for barcode in labware_barcodes if barcode not in locations
+    ]
+
+    if len(labware_barcodes) > 0:
+        logger.info(
+            f"{len(locations)} of {len(labware_barcodes)} labware locations found in the cache "
+            f"({round(100 * len(locations) / len(labware_barcodes), 1)}% hit ratio)"
+        )
+
+    chunked_labware_barcodes = [
+        uncached_labware_barcodes[x : (x + chunk_size)]  # noqa: E203
+        for x in range(0, len(uncached_labware_barcodes), chunk_size)
     ]
+    logger.debug(
+        f"Requesting locations for {len(uncached_labware_barcodes)} labware in "
+        f"{len(chunked_labware_barcodes)} chunks"
+    )
+
+    # the requests are sent from worker threads, so pass them the LabWhere URL rather than relying
+    # on the app context
+    labwhere_locations = {}
+    with ThreadPoolExecutor(max_workers=app.config["LABWHERE_MAX_WORKERS"]) as executor:
+        responses = executor.map(
+            lambda barcodes: get_locations_from_labwhere(barcodes, labwhere_url),
+            chunked_labware_barcodes,
+        )
+
+        for response in responses:
+            if response.status_code != HTTPStatus.OK:
+                raise ReportCreationError("Response from LabWhere is not OK")
 
-    labware_to_location_barcode_df = pd.DataFrame.from_records(labware_to_location_barcode)
+            # return an empty location barcode for labware where it is not present
+            labwhere_locations.update(
+                {
+                    record["barcode"]: str(record["location_barcode"] or "")
+                    for record in response.json()
+                }
+            )
+
+    cache_labware_locations(labwhere_locations)
+    locations.update(labwhere_locations)
+
+    # create a plate_barcode to location_barcode mapping to join with samples
+    labware_to_location_barcode_df = pd.DataFrame.from_records(
+        list(locations.items()), columns=[FIELD_PLATE_BARCODE, FIELD_LOCATION_BARCODE]
+    )
     logger.info(f"{len(labware_to_location_barcode_df.index)} locations for plate barcodes found")
     pretty(logger, labware_to_location_barcode_df)
 
     return labware_to_location_barcode_df
 
 
-def get_locations_from_labwhere(labware_barcodes):
+def get_locations_from_labwhere(labware_barcodes, labwhere_url):
     """
     Example record from labwhere:
     { 'barcode': 'GLA001024R', 'location_barcode': 'lw-uk-biocentre-box-gsw--98-14813'}
     """
 
     return requests.post(
-        f"http://{app.config['LABWHERE_URL']}/api/labwares_by_barcode",
+        f"http://{labwhere_url}/api/labwares_by_barcode",
         json={"barcodes": labware_barcodes},
     )
 
 
-def get_cherrypicked_samples(root_sample_ids, plate_barcodes, chunk_size=50000):
+def get_cherrypicked_samples(root_sample_ids, plate_barcodes, chunk_size=None):
     # Find which samples have been cherrypicked using MLWH & Events warehouse
     # Returns dataframe with 4 columns: those needed to uniquely identify the sample
     # resulting dataframe only contains those samples that have been cherrypicked
     # (= those that have an entry for the relevant event type in the event warehouse)
+    # root_sample_ids and plate_barcodes are aligned, so that each chunk of root sample ids is
+    # queried with only the plate barcodes of those samples
     # TODO: move into external method.
 
     try:
-        # Create an empty DataFrame to merge into
-        concat_frame = pd.DataFrame()
-
-        chunk_root_sample_ids = [
-            root_sample_ids[x : (x + chunk_size)]  # noqa: E203
+        chunk_size = chunk_size or app.config["CHERRYPICKED_QUERY_CHUNK_SIZE"]
+        chunks = [
+            (
+                root_sample_ids[x : (x + chunk_size)],  # noqa: E203
+                plate_barcodes[x : (x + chunk_size)],  # noqa: E203
+            )
             for x in range(0, len(root_sample_ids), chunk_size)
         ]
 
-        sql_engine = sqlalchemy.create_engine(
-            f"mysql+pymysql://{app.config['WAREHOUSES_RO_CONN_STRING']}", pool_recycle=3600
-        )
-        db_connection = sql_engine.connect()
+        sql_engine = get_warehouses_ro_engine()
 
         ml_wh_db = app.config["ML_WH_DB"]
         events_wh_db = app.config["EVENTS_WH_DB"]
 
-        for chunk_root_sample_id in chunk_root_sample_ids:
-            sql = (
-                f"select mlwh_sample.description as `{FIELD_ROOT_SAMPLE_ID}`, mlwh_stock_resource.labware_human_barcode as `{FIELD_PLATE_BARCODE}`"  # noqa: E501
-                f",mlwh_sample.phenotype as `Result_lower`, mlwh_stock_resource.labware_coordinate as `{FIELD_COORDINATE}`"  # noqa: E501
-                f" FROM {ml_wh_db}.sample as mlwh_sample"
-                f" JOIN {ml_wh_db}.stock_resource mlwh_stock_resource ON (mlwh_sample.id_sample_tmp = mlwh_stock_resource.id_sample_tmp)"  # noqa: E501
-                f" JOIN {events_wh_db}.subjects mlwh_events_subjects ON (mlwh_events_subjects.friendly_name = sanger_sample_id)"  # noqa: E501
-                f" JOIN {events_wh_db}.roles mlwh_events_roles ON (mlwh_events_roles.subject_id = mlwh_events_subjects.id)"  # noqa: E501
-                f" JOIN {events_wh_db}.events mlwh_events_events ON (mlwh_events_roles.event_id = mlwh_events_events.id)"  # noqa: E501
-                f" JOIN {events_wh_db}.event_types mlwh_events_event_types ON (mlwh_events_events.event_type_id = mlwh_events_event_types.id)"  # noqa: E501
-                f" WHERE mlwh_sample.description IN %(root_sample_ids)s"
-                f" AND mlwh_stock_resource.labware_human_barcode IN %(plate_barcodes)s"
-                " AND mlwh_events_event_types.key = 'cherrypick_layout_set'"
-                " GROUP BY mlwh_sample.description, mlwh_stock_resource.labware_human_barcode, mlwh_sample.phenotype, mlwh_stock_resource.labware_coordinate"  # noqa: E501
-            )
+        sql = (
+            f"select mlwh_sample.description as `{FIELD_ROOT_SAMPLE_ID}`, mlwh_stock_resource.labware_human_barcode as `{FIELD_PLATE_BARCODE}`"  # noqa: E501
+            f",mlwh_sample.phenotype as `Result_lower`, mlwh_stock_resource.labware_coordinate as `{FIELD_COORDINATE}`"  # noqa: E501
+            f" FROM {ml_wh_db}.sample as mlwh_sample"
+            f" JOIN {ml_wh_db}.stock_resource mlwh_stock_resource ON (mlwh_sample.id_sample_tmp = mlwh_stock_resource.id_sample_tmp)"  # noqa: E501
+            f" JOIN {events_wh_db}.subjects mlwh_events_subjects ON (mlwh_events_subjects.friendly_name = sanger_sample_id)"  # noqa: E501
+            f" JOIN {events_wh_db}.roles mlwh_events_roles ON (mlwh_events_roles.subject_id = mlwh_events_subjects.id)"  # noqa: E501
+            f" JOIN {events_wh_db}.events mlwh_events_events ON (mlwh_events_roles.event_id = mlwh_events_events.id)"  # noqa: E501
+            f" JOIN {events_wh_db}.event_types mlwh_events_event_types ON (mlwh_events_events.event_type_id = mlwh_events_event_types.id)"  # noqa: E501
+            f" WHERE mlwh_sample.description IN %(root_sample_ids)s"
+            f" AND mlwh_stock_resource.labware_human_barcode IN %(plate_barcodes)s"
+            " AND mlwh_events_event_types.key = 'cherrypick_layout_set'"
+            " GROUP BY mlwh_sample.description, mlwh_stock_resource.labware_human_barcode, mlwh_sample.phenotype, mlwh_stock_resource.labware_coordinate"  # noqa: E501
+        )
+
+        def query_chunk(chunk_number, chunk):
+            chunk_root_sample_ids, chunk_plate_barcodes = chunk
+            start = time.time()
 
+            # each query checks out its own connection from the engine's pool
             frame = pd.read_sql(
                 sql,
-                db_connection,
+                sql_engine,
                 params={
-                    "root_sample_ids": tuple(chunk_root_sample_id),
-                    "plate_barcodes": tuple(plate_barcodes),
+                    "root_sample_ids": tuple(set(chunk_root_sample_ids)),
+                    "plate_barcodes": tuple(set(chunk_plate_barcodes)),
                 },
             )
+            logger.debug(
+                f"Cherrypicked samples chunk {chunk_number} of {len(chunks)}: {len(frame.index)} "
+                f"rows in {round(time.time() - start, 2)}s"
+            )
 
-            # drop_duplicates is needed because the same 'root sample id' could pop up in two
-            # different batches, and then it would retrieve the same rows for that root sample id
-            # twice do reset_index after dropping duplicates to make sure the rows are numbered in
-            # a way that makes sense
-            concat_frame = concat_frame.append(frame).drop_duplicates().reset_index(drop=True)
+            return frame
 
-        return concat_frame
+        max_workers = app.config["CHERRYPICKED_QUERY_MAX_WORKERS"]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(query_chunk, range(1, len(chunks) + 1), chunks))
+
+        if len(frames) == 0:
+            return pd.DataFrame(
+                columns=[
+                    FIELD_ROOT_SAMPLE_ID,
+                    FIELD_PLATE_BARCODE,
+                    "Result_lower",
+                    FIELD_COORDINATE,
+                ]
+            )
+
+        # drop_duplicates is needed because the same 'root sample id' could pop up in two different
+        # chunks, and then it would retrieve the same rows for that root sample id twice. The rows
+        # are sorted so that the result does not depend on the order the chunks completed in, and
+        # reset_index makes sure the rows are numbered in a way that makes sense
+        concat_frame = pd.concat(frames).drop_duplicates()
+
+        return concat_frame.sort_values(by=concat_frame.columns.to_list()).reset_index(drop=True)
     except Exception as e:
-        print("Error while connecting to MySQL", e)
+        logger.error("An error occurred attempting to find cherrypicked samples")
+        logger.exception(e)
         return None
-    finally:
-        db_connection.close()
 
 
-def get_all_positive_samples(samples_collection: Collection) -> DataFrame:
-    """Get all the positive samples from mongo from a specific date.
+def get_report_partitions(samples_collection: Collection) -> List[ReportPartition]:
+    """Split the report window into partitions which can be processed independently, one for each
+    centre and day tested. Samples without a source are in partitions of their own, with a None
+    source, before those of the centres as Mongo sorts a missing source first. The partitions are
+    ordered by centre and then by day, so that their samples, concatenated, are in the same order
+    as those of the whole window, see get_all_positive_samples.
+
+    Arguments:
+        samples_collection {Collection} -- the samples collection.
+
+    Returns:
+        List[ReportPartition] -- the source, start and end (None for the last day, so that samples
+        tested later are still included) of each partition
+    """
+    # Make sure any samples imported since the last run have a parsed date to partition on
+    backfill_date_tested(samples_collection)
+
+    window_start = report_query_window_start()
+    match_date_tested = {FIELD_PARSED_DATE_TESTED: {"$gte": window_start}}
+    sources: List[Optional[str]] = sorted(
+        source
+        for source in samples_collection.distinct(FIELD_SOURCE, match_date_tested)
+        if source is not None
+    )
+    # distinct skips samples which are missing the source, which a None source also matches
+    if samples_collection.find_one({FIELD_SOURCE: None, **match_date_tested}, {"_id": True}):
+        sources.insert(0, None)
+
+    days = [
+        window_start + timedelta(days=day) for day in range(app.config["REPORT_WINDOW_SIZE"] + 1)
+    ]
+    ends: List[Optional[datetime]] = [*days[1:], None]
+
+    return [(source, start, end) for source in sources for start, end in zip(days, ends)]
+
+
+def get_all_positive_samples(
+    samples_collection: Collection, partition: Optional[ReportPartition] = None
+) -> DataFrame:
+    """Get all the positive samples from mongo from a specific date, in order of centre, date
+    tested and then id.
 
     Args:
         samples_collection (Collection): the samples collection.
+        partition (Optional[ReportPartition]): only get the positive samples in this partition of
+            the report window, see get_report_partitions. Defaults to the whole report window.
 
     Returns:
         DataFrame: a pandas DataFrame with the positive samples.
@@ -261,68 +639,67 @@ def get_all_positive_samples(samples_collection: Collection) -> DataFrame:
         FIELD_COORDINATE: True,
     }
 
-    DATE_EXTRACTED = "extracted_date"
-    DATE_CONVERTED = "converted_date"
-    DATE_ERROR = "date_conversion_error"
+    if partition is None:
+        # Make sure any samples imported since the last run have a parsed date to filter on
+        backfill_date_tested(samples_collection)
+
+        match_date_tested: Dict[str, Any] = {
+            FIELD_PARSED_DATE_TESTED: {"$gte": report_query_window_start()}
+        }
+    else:
+        # the dates have already been backfilled when the window was partitioned
+        source, start, end = partition
+        match_date_tested = {
+            FIELD_SOURCE: source,
+            FIELD_PARSED_DATE_TESTED: {"$gte": start, **({"$lt": end} if end else {})},
+        }
 
     # The pipeline defines stages which execute in sequence
-    pipeline = [
-        # 1. First run the positive match stage
+    pipeline: List[Dict[str, Any]] = [
+        # 1. First find all the documents after a certain date, using the index on the parsed date
+        {"$match": match_date_tested},
+        # 2. Sort them by the index on the centre and parsed date, so that the rows are in the same
+        # order whether or not the window is partitioned
+        {"$sort": {FIELD_SOURCE: 1, FIELD_PARSED_DATE_TESTED: 1, "_id": 1}},
+        # 3. Then run the positive match stage
         STAGE_MATCH_POSITIVE,
-        {
-            # 2. We then need to extract the date using substring since most dates look like this:
-            # "2020-05-10 07:30:00 UTC" but the `dateFromString` function does not handle the
-            # timezone string "UTC"
-            "$addFields": {
-                DATE_EXTRACTED: {
-                    "$substrBytes": [f"${FIELD_DATE_TESTED}", 0, 19],
-                },
-            },
-        },
-        {
-            # 3. Then add a date field which converts the extracted date string to a mongo date
-            # type using the specified format. If it cannot parse the date using the first format
-            # it tries with the other format found in the data
-            # TODO: handle the case that no format is matched
-            "$addFields": {
-                DATE_CONVERTED: {
-                    "$dateFromString": {
-                        "dateString": f"${DATE_EXTRACTED}",
-                        "format": "%Y-%m-%d %H:%M:%S",
-                        "timezone": "UTC",
-                        "onError": {
-                            "$dateFromString": {
-                                "dateString": f"${DATE_EXTRACTED}",
-                                "format": "%d/%m/%Y %H:%M",
-                                "timezone": "UTC",
-                                "onError": DATE_ERROR,
-                            },
-                        },
-                    },
-                },
-            },
-        },
-        # 4. We only want documents which have valid dates that we can compare against
-        {"$match": {DATE_CONVERTED: {"$ne": DATE_ERROR}}},
-        # 5. Find all the document after a certain date
-        {"$match": {DATE_CONVERTED: {"$gte": report_query_window_start()}}},
-        # 6. Define which fields to have in the output documents
+        # 4. Define which fields to have in the output documents
         {"$project": projection},
     ]
 
     # Perform an aggregation using the defined pipeline - this will run through the pipeline
     # "stages" in sequence
-    results = samples_collection.aggregate(pipeline)
+    results = samples_collection.aggregate(pipeline, allowDiskUse=True)
+
+    return build_positive_samples_dataframe(results)
+
 
+def build_positive_samples_dataframe(results: Iterable[Dict[str, Any]]) -> DataFrame:
+    """Build a DataFrame of positive samples from the samples found in mongo, with unpadded
+    coordinates and a 'plate and well' column.
+
+    Args:
+        results (Iterable[Dict[str, Any]]): the positive samples.
+
+    Returns:
+        DataFrame: a pandas DataFrame with the positive samples.
+    """
     # converting to a dataframe to make it easy to join with data from labwhere
     positive_samples_df = pd.DataFrame.from_records(results)
 
     logger.info(f"{len(positive_samples_df.index)} positive samples")
     pretty(logger, positive_samples_df)
 
-    # strip zeros out of the well coordinates
-    positive_samples_df[FIELD_COORDINATE] = positive_samples_df[FIELD_COORDINATE].map(
-        lambda coord: unpad_coordinate(coord)
+    # without any positive samples, e.g. in most partitions of the window, there are no columns
+    if len(positive_samples_df.index) == 0:
+        return positive_samples_df
+
+    # strip zeros out of the well coordinates, as unpad_coordinate does; there are only a few
+    # distinct coordinates, and string methods on a categorical are applied to each category once
+    positive_samples_df[FIELD_COORDINATE] = (
+        positive_samples_df[FIELD_COORDINATE]
+        .astype("category")
+        .str.replace(r"0(\d+)$", r"\1", regex=True)
     )
 
     # create 'plate and well' column for copy-pasting into Sequencescape submission, e.g. DN1234:A1
@@ -330,35 +707,181 @@ def get_all_positive_samples(samples_collection: Collection) -> DataFrame:
         positive_samples_df[FIELD_PLATE_BARCODE] + ":" + positive_samples_df[FIELD_COORDINATE]
     )
 
+    return categorise_columns(positive_samples_df)
+
+
+def get_report_partition_samples(
+    samples_collection: Collection, partition: ReportPartition
+) -> DataFrame:
+    """Get the positive samples in a partition of the report window, joined with their
+    declarations and whether they have been cherrypicked.
+
+    Arguments:
+        samples_collection {Collection} -- the samples collection.
+        partition {ReportPartition} -- the partition of the report window, see
+        get_report_partitions
+
+    Returns:
+        DataFrame -- the positive samples in the partition
+    """
+    positive_samples_df = get_all_positive_samples(samples_collection, partition)
+    if len(positive_samples_df.index) == 0:
+        return positive_samples_df
+
+    positive_samples_df = join_samples_declarations(positive_samples_df)
+
+    return add_cherrypicked_column(positive_samples_df)
+
+
+def merge_report_partitions(partition_dfs: List[DataFrame]) -> DataFrame:
+    """Merge the positive samples of each partition of the report window, in order.
+
+    Arguments:
+        partition_dfs {List[DataFrame]} -- the positive samples of each partition, see
+        get_report_partition_samples
+
+    Returns:
+        DataFrame -- the positive samples in the report window
+    """
+    partition_dfs = [partition_df for partition_df in partition_dfs if len(partition_df.index) > 0]
+    if len(partition_dfs) == 0:
+        return pd.DataFrame()
+
+    # the categories of each partition differ, so the categorical columns are concatenated as
+    # strings and then categorised again
+    positive_samples_df = categorise_columns(
+        pd.concat(partition_dfs, ignore_index=True, sort=False)
+    )
+
+    # partitions without any declarations do not have the declaration columns, which are added
+    # after the columns of the first partition by concat
+    if "Value In Sequencing" in positive_samples_df.columns:
+        positive_samples_df = positive_samples_df.fillna({"Value In Sequencing": "Unknown"})
+        columns = positive_samples_df.columns.drop("LIMS submission").to_list()
+        positive_samples_df = positive_samples_df[[*columns, "LIMS submission"]]
+
     return positive_samples_df
 
 
+def add_location_column(positive_samples_df: DataFrame) -> DataFrame:
+    """Add the location barcode of the plate of each positive sample, found in LabWhere, after the
+    "plate and well" column.
+
+    Arguments:
+        positive_samples_df {DataFrame} -- the positive samples
+
+    Returns:
+        DataFrame -- the positive samples with their location barcodes
+    """
+    # only the plates with positive samples in the report window need to be located
+    plate_barcodes = positive_samples_df[FIELD_PLATE_BARCODE].dropna().unique()
+    labware_to_location_barcode_df = map_labware_to_location(
+        [plate_barcode for plate_barcode in plate_barcodes if plate_barcode]
+    )
+
+    return merge_locations(positive_samples_df, labware_to_location_barcode_df)
+
+
+def merge_locations(
+    positive_samples_df: DataFrame, labware_to_location_barcode_df: DataFrame
+) -> DataFrame:
+    """Add the location barcodes of the plates of the positive samples after the "plate and well"
+    column.
+
+    Arguments:
+        positive_samples_df {DataFrame} -- the positive samples
+        labware_to_location_barcode_df {DataFrame} -- plate_barcode to location_barcode mapping,
+        see map_labware_to_location
+
+    Returns:
+        DataFrame -- the positive samples with their location barcodes
+    """
+    logger.debug("Joining location data from labwhere")
+    merged = positive_samples_df.merge(
+        labware_to_location_barcode_df, how="left", on=FIELD_PLATE_BARCODE
+    )
+
+    columns = merged.columns.drop(FIELD_LOCATION_BARCODE).to_list()
+    columns.insert(columns.index("plate and well") + 1, FIELD_LOCATION_BARCODE)
+
+    return merged[columns]
+
+
 def add_cherrypicked_column(existing_dataframe):
     root_sample_ids = existing_dataframe[FIELD_ROOT_SAMPLE_ID].to_list()
-    plate_barcodes = existing_dataframe["plate_barcode"].unique()
+    plate_barcodes = existing_dataframe[FIELD_PLATE_BARCODE].to_list()
+
+    if app.config["CHERRYPICKED_SAMPLES_INDEX"]:
+        cherrypicked_samples_df = get_indexed_cherrypicked_samples(root_sample_ids, plate_barcodes)
+    else:
+        cherrypicked_samples_df = get_cherrypicked_samples(root_sample_ids, plate_barcodes)
 
-    cherrypicked_samples_df = get_cherrypicked_samples(root_sample_ids, plate_barcodes)
+    if cherrypicked_samples_df is None:
+        raise ReportCreationError("Unable to find the cherrypicked samples")
+
+    return merge_cherrypicked_samples(existing_dataframe, cherrypicked_samples_df)
+
+
+def merge_cherrypicked_samples(
+    existing_dataframe: DataFrame, cherrypicked_samples_df: DataFrame
+) -> DataFrame:
+    """Add a "LIMS submission" column to the positive samples, which is "Yes" for the samples which
+    have been cherrypicked and "No" otherwise.
+
+    Arguments:
+        existing_dataframe {DataFrame} -- the positive samples
+        cherrypicked_samples_df {DataFrame} -- the root sample id, plate barcode, lowercased result
+        and coordinate of the cherrypicked samples, see get_cherrypicked_samples
+
+    Returns:
+        DataFrame -- the positive samples with the "LIMS submission" column
+    """
     cherrypicked_samples_df["LIMS submission"] = "Yes"
 
     logger.info(f"{len(cherrypicked_samples_df.index)} cherrypicked samples")
 
     # The result value in the phenotype in MLWH.sample is all lowercase,
     # because it is converted in create_post_body in helpers/plates.py,
-    # whereas in the original data in MongoDB and MLWH.lighthouse_sample it is capitalised
-    existing_dataframe["Result_lower"] = existing_dataframe["Result"].str.lower()
-
+    # whereas in the original data in MongoDB and MLWH.lighthouse_sample it is capitalised.
+    # The lowercased results are merged on directly rather than being added to the existing
+    # dataframe, and lowercasing a categorical result only lowercases each of its categories
     existing_dataframe = existing_dataframe.merge(
         cherrypicked_samples_df,
         how="left",
-        on=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, "Result_lower", FIELD_COORDINATE],
+        left_on=[
+            FIELD_ROOT_SAMPLE_ID,
+            FIELD_PLATE_BARCODE,
+            existing_dataframe[FIELD_RESULT].str.lower().rename("Result_lower"),
+            FIELD_COORDINATE,
+        ],
+        right_on=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, "Result_lower", FIELD_COORDINATE],
     )
     # Fill any empty cells for the column with 'No' (those that do not have cherrypicking events)
-    existing_dataframe = existing_dataframe.fillna({"LIMS submission": "No"})
+    existing_dataframe["LIMS submission"] = existing_dataframe["LIMS submission"].fillna("No")
 
-    # remove the extra column we merged on as no longer needed
+    # remove the lowercased results the cherrypicked samples were merged on
     existing_dataframe = existing_dataframe.drop(columns=["Result_lower"])
 
-    return existing_dataframe
+    return categorise_columns(existing_dataframe)
+
+
+def categorise_columns(report_df: DataFrame) -> DataFrame:
+    """Convert the columns of the report which have few distinct values to categoricals, see
+    POSITIVE_SAMPLES_CATEGORICAL_COLUMNS.
+
+    Arguments:
+        report_df {DataFrame} -- the report, or part of it
+
+    Returns:
+        DataFrame -- the report with its categorical columns converted
+    """
+    return report_df.astype(
+        {
+            column: "category"
+            for column in POSITIVE_SAMPLES_CATEGORICAL_COLUMNS
+            if column in report_df.columns
+        }
+    )
 
 
 def get_distinct_plate_barcodes(samples):
@@ -375,34 +898,102 @@ def get_distinct_plate_barcodes(samples):
     return distinct_plate_barcodes
 
 
-def join_samples_declarations(positive_samples):
+def build_declaration_record(declaration: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the columns the report has for a sample's latest declaration.
 
-    samples_declarations = app.data.driver.db.samples_declarations
+    Arguments:
+        declaration {Dict[str, Any]} -- the latest declaration of the sample
 
-    # Latest declarations group by root_sample_id
-    # Id is needed to control the group aggregation
+    Returns:
+        Dict[str, Any] -- the root sample id, value in sequencing and declaration date
+    """
     # Excel formatter required date without timezone
-    declarations = samples_declarations.aggregate(
+    return {
+        FIELD_ROOT_SAMPLE_ID: declaration["root_sample_id"],
+        "Value In Sequencing": declaration["value_in_sequencing"],
+        "Declared At": declaration["declared_at"].strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def join_samples_declarations(positive_samples):
+
+    chunk_size = app.config["SAMPLES_DECLARATIONS_CHUNK_SIZE"]
+
+    latest_built = is_latest_samples_declarations_built()
+    if not latest_built:
+        logger.warning(
+            "The latest samples declarations have not been built (see flask "
+            "rebuild-latest-samples-declarations), finding the latest from all declarations"
+        )
+
+    # Only the declarations of the samples in the report are needed, so look up the latest
+    # declaration of each of them, in chunks of root sample ids
+    root_sample_ids = positive_samples[FIELD_ROOT_SAMPLE_ID].dropna().unique().tolist()
+
+    declarations_records = []
+    for x in range(0, len(root_sample_ids), chunk_size):
+        chunk_root_sample_ids = root_sample_ids[x : (x + chunk_size)]  # noqa: E203
+
+        declarations_records.extend(
+            build_declaration_record(declaration)
+            for declaration in find_latest_samples_declarations(chunk_root_sample_ids, latest_built)
+        )
+
+    return merge_samples_declarations(positive_samples, declarations_records)
+
+
+def find_latest_samples_declarations(
+    root_sample_ids: List[str], latest_built: bool
+) -> Iterable[Dict[str, Any]]:
+    """Find the latest declaration of each of the given samples.
+
+    Arguments:
+        root_sample_ids {List[str]} -- the root sample ids of the samples
+        latest_built {bool} -- whether the latest samples declarations have been built, see
+        is_latest_samples_declarations_built; if not the latest are found from all declarations
+
+    Returns:
+        Iterable[Dict[str, Any]] -- the root sample id, value in sequencing and declaration date of
+        the latest declaration of each sample which has been declared
+    """
+    db = app.data.driver.db
+    if latest_built:
+        return db.samples_declarations_latest.find(
+            {"root_sample_id": {"$in": root_sample_ids}}, {"_id": False}
+        )
+
+    # Latest declarations group by root_sample_id, where the match and sort use the
+    # (root_sample_id, declared_at) index
+    return db.samples_declarations.aggregate(
         [
-            {"$sort": {"declared_at": -1}},
+            {"$match": {"root_sample_id": {"$in": root_sample_ids}}},
+            {"$sort": {"root_sample_id": 1, "declared_at": -1}},
             {
                 "$group": {
                     "_id": "$root_sample_id",
-                    FIELD_ROOT_SAMPLE_ID: {"$first": "$root_sample_id"},
-                    "Value In Sequencing": {"$first": "$value_in_sequencing"},
-                    "Declared At": {
-                        "$first": {
-                            "$dateToString": {"date": "$declared_at", "format": "%Y-%m-%dT%H:%M:%S"}
-                        }
-                    },
+                    "root_sample_id": {"$first": "$root_sample_id"},
+                    "value_in_sequencing": {"$first": "$value_in_sequencing"},
+                    "declared_at": {"$first": "$declared_at"},
                 }
             },
-            {"$unset": "_id"},
         ]
     )
 
-    declarations_records = [record for record in declarations]
 
+def merge_samples_declarations(
+    positive_samples: DataFrame, declarations_records: List[Dict[str, Any]]
+) -> DataFrame:
+    """Add the value in sequencing and declaration date of the latest declaration of each positive
+    sample, with a value in sequencing of "Unknown" for samples which have not been declared.
+
+    Arguments:
+        positive_samples {DataFrame} -- the positive samples
+        declarations_records {List[Dict[str, Any]]} -- the root sample id, value in sequencing and
+        declaration date of the latest declarations of the samples
+
+    Returns:
+        DataFrame -- the positive samples with their declarations
+    """
     if len(declarations_records) > 0:
         logger.debug("Joining declarations")
         declarations_frame = pd.DataFrame.from_records(declarations_records)
@@ -416,6 +1007,267 @@ def join_samples_declarations(positive_samples):
     return positive_samples
 
 
+def encode_positives_cursor(sample: Dict[str, Any]) -> str:
+    """Encode the position of a sample in the positive samples query as a cursor, from which the
+    next page is found.
+
+    Arguments:
+        sample {Dict[str, Any]} -- the last sample examined
+
+    Returns:
+        str -- the cursor
+    """
+    return f"{sample[FIELD_PARSED_DATE_TESTED].isoformat()}_{sample['_id']}"
+
+
+def decode_positives_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Decode a cursor from encode_positives_cursor.
+
+    Arguments:
+        cursor {str} -- the cursor
+
+    Raises:
+        ValueError: if the cursor is not valid
+
+    Returns:
+        Tuple[datetime, ObjectId] -- the date tested and id of the last sample examined
+    """
+    try:
+        date_tested, sample_id = cursor.split("_", 1)
+
+        return datetime.fromisoformat(date_tested), ObjectId(sample_id)
+    except (InvalidId, TypeError, ValueError):
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+
+def get_positive_samples_page(
+    max_results: int,
+    after: Optional[str] = None,
+    source: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    has_location: Optional[bool] = None,
+    lims_submission: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Get a page of positive samples, as they appear in the positive samples report, in order of
+    date tested. The samples are found with indexed queries, a batch at a time, and only the
+    samples in each batch are located, joined with their declarations and checked for
+    cherrypicking, so that a page does not cost as much as the whole report.
+
+    Arguments:
+        max_results {int} -- the number of samples on the page
+
+    Keyword Arguments:
+        after {Optional[str]} -- the cursor returned with the previous page (default: {None})
+        source {Optional[str]} -- only get samples from this centre (default: {None})
+        date_from {Optional[datetime]} -- only get samples tested on or after this date; otherwise
+        those in the report window (default: {None})
+        date_to {Optional[datetime]} -- only get samples tested before this date (default: {None})
+        has_location {Optional[bool]} -- only get samples whose plate does, or does not, have a
+        location (default: {None})
+        lims_submission {Optional[str]} -- only get samples which have ("Yes"), or have not ("No"),
+        been cherrypicked (default: {None})
+
+    Raises:
+        ValueError: if the cursor is not valid
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str]] -- the samples on the page, and the cursor of the
+        next page; or None if there are no more samples
+    """
+    samples_collection = app.data.driver.db.samples
+
+    # Pages are only read; imported samples are given their parsed date to filter on when their
+    # changes are caught up after the import, or by the backfill-date-tested command
+    match_date_tested: Dict[str, Any] = {"$gte": date_from or report_query_window_start()}
+    if date_to is not None:
+        match_date_tested["$lt"] = date_to
+
+    query: Dict[str, Any] = {
+        "$and": [STAGE_MATCH_POSITIVE["$match"], {FIELD_PARSED_DATE_TESTED: match_date_tested}]
+    }
+    if source is not None:
+        query[FIELD_SOURCE] = source
+
+    projection = {
+        FIELD_SOURCE: True,
+        FIELD_PLATE_BARCODE: True,
+        FIELD_ROOT_SAMPLE_ID: True,
+        FIELD_RESULT: True,
+        FIELD_DATE_TESTED: True,
+        FIELD_PARSED_DATE_TESTED: True,
+        FIELD_COORDINATE: True,
+    }
+
+    cursor = after
+    items: List[Dict[str, Any]] = []
+    while len(items) < max_results:
+        keyset_query = query
+        if cursor is not None:
+            last_date_tested, last_id = decode_positives_cursor(cursor)
+            keyset_query = {
+                **query,
+                "$or": [
+                    {FIELD_PARSED_DATE_TESTED: {"$gt": last_date_tested}},
+                    {FIELD_PARSED_DATE_TESTED: last_date_tested, "_id": {"$gt": last_id}},
+                ],
+            }
+
+        samples = list(
+            samples_collection.find(keyset_query, projection)
+            .sort([(FIELD_PARSED_DATE_TESTED, 1), ("_id", 1)])
+            .limit(max_results)
+        )
+        if len(samples) == 0:
+            return items, None
+
+        page_df = build_positive_samples_dataframe(
+            [
+                {
+                    field: value
+                    for field, value in sample.items()
+                    if field not in ("_id", FIELD_PARSED_DATE_TESTED)
+                }
+                for sample in samples
+            ]
+        )
+        page_df = add_location_column(page_df)
+        page_df = join_samples_declarations(page_df)
+        page_df = add_cherrypicked_column(page_df)
+
+        matches = pd.Series(True, index=page_df.index)
+        if has_location is not None:
+            has_location_barcode = page_df[FIELD_LOCATION_BARCODE].fillna("") != ""
+            matches &= has_location_barcode if has_location else ~has_location_barcode
+        if lims_submission is not None:
+            matches &= page_df["LIMS submission"] == lims_submission
+
+        # empty values are returned as nulls, which JSON supports and NaN is not
+        page_records = page_df.astype(object).where(page_df.notna(), None).to_dict("records")
+        for sample, record, match in zip(samples, page_records, matches):
+            cursor = encode_positives_cursor(sample)
+            if match:
+                items.append(record)
+                if len(items) == max_results:
+                    break
+
+        if len(samples) < max_results and len(items) < max_results:
+            return items, None
+
+    return items, cursor
+
+
+def write_xlsx_report(report_df: DataFrame, report_path: pathlib.PurePath) -> None:
+    """Write the positive samples report to an Excel file, see write_xlsx_rows. The rows are read
+    from the frame one at a time, without copying it.
+
+    Arguments:
+        report_df {DataFrame} -- the positive samples to write
+        report_path {pathlib.PurePath} -- path of the report to create
+    """
+    write_xlsx_rows(
+        report_df.columns.to_list(), report_df.itertuples(index=False, name=None), report_path
+    )
+
+
+def write_xlsx_rows(
+    columns: List[str], rows: Iterable[Tuple[Any, ...]], report_path: pathlib.PurePath
+) -> None:
+    """Write rows of the positive samples report to an Excel file. The workbook is written in
+    xlsxwriter's constant memory mode, in a single pass over the rows, with each row being written
+    to the "ALL POSITIVE SAMPLES" sheet and, if it has a location barcode, to the "POSITIVE SAMPLES
+    WITH LOCATION" sheet. Only the row being written is held, so the rows can be streamed from any
+    iterator; they are written in the order it yields them.
+
+    Arguments:
+        columns {List[str]} -- the names of the columns
+        rows {Iterable[Tuple[Any, ...]]} -- the values of each row, in the order of the columns
+        report_path {pathlib.PurePath} -- path of the report to create
+    """
+    workbook = xlsxwriter.Workbook(str(report_path), {"constant_memory": True})
+    try:
+        # match the header format used by pandas' to_excel
+        header_format = workbook.add_format(
+            {"bold": True, "border": 1, "align": "center", "valign": "top"}
+        )
+
+        # Sheet1 contains all positive samples WITH location barcodes
+        with_location_sheet = workbook.add_worksheet("POSITIVE SAMPLES WITH LOCATION")
+        # Sheet2 contains all positive samples with AND without location barcodes
+        all_samples_sheet = workbook.add_worksheet("ALL POSITIVE SAMPLES")
+
+        with_location_sheet.write_row(0, 0, columns, header_format)
+        all_samples_sheet.write_row(0, 0, columns, header_format)
+
+        location_column = columns.index(FIELD_LOCATION_BARCODE)
+        with_location_row = 1
+        for all_samples_row, row in enumerate(rows, 1):
+            # empty cells are left blank, as Excel does not support NaN
+            values = [None if pd.isna(value) else value for value in row]
+
+            all_samples_sheet.write_row(all_samples_row, 0, values)
+            if values[location_column] is not None:
+                with_location_sheet.write_row(with_location_row, 0, values)
+                with_location_row += 1
+    finally:
+        workbook.close()
+
+
+def write_csv_gz_report(report_df: DataFrame, report_path: pathlib.PurePath) -> None:
+    """Write the positive samples report to a gzipped CSV file.
+
+    Arguments:
+        report_df {DataFrame} -- the positive samples to write
+        report_path {pathlib.PurePath} -- path of the report to create
+    """
+    report_df.to_csv(report_path, index=False, compression="gzip")
+
+
+def write_parquet_report(report_df: DataFrame, report_path: pathlib.PurePath) -> None:
+    """Write the positive samples report to a Parquet file. The columns with few distinct values are
+    stored as categoricals, which are restored when the file is read with pandas.
+
+    Arguments:
+        report_df {DataFrame} -- the positive samples to write
+        report_path {pathlib.PurePath} -- path of the report to create
+    """
+    categorical_columns = [
+        column for column in REPORT_CATEGORICAL_COLUMNS if column in report_df.columns
+    ]
+    report_df.astype({column: "category" for column in categorical_columns}).to_parquet(
+        report_path, engine="pyarrow", index=False
+    )
+
+
+REPORT_WRITERS = {
+    REPORT_FORMAT_XLSX: write_xlsx_report,
+    REPORT_FORMAT_CSV_GZ: write_csv_gz_report,
+    REPORT_FORMAT_PARQUET: write_parquet_report,
+}
+
+
+def validate_report_formats(report_formats: List[str]) -> List[str]:
+    """Check that the positive samples report can be written in each of the given formats.
+
+    Arguments:
+        report_formats {List[str]} -- the requested report formats
+
+    Returns:
+        List[str] -- the errors found, if any
+    """
+    errors = []
+    for report_format in report_formats:
+        if report_format not in REPORT_WRITERS:
+            errors.append(
+                f"Unknown report format '{report_format}', expected one of: "
+                f"{', '.join(REPORT_WRITERS)}"
+            )
+        elif report_format == REPORT_FORMAT_PARQUET and pyarrow is None:
+            errors.append("Parquet reports require pyarrow to be installed")
+
+    return errors
+
+
 def report_query_window_start() -> datetime:
     """Return the start date for the report window.
 
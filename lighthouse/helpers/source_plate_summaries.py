@@ -0,0 +1,191 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import current_app as app
+from lighthouse.constants import (
+    FIELD_LAB_ID,
+    FIELD_LH_SAMPLE_UUID,
+    FIELD_LH_SOURCE_PLATE_UUID,
+    FIELD_RESULT,
+    FIELD_RNA_ID,
+    FIELD_ROOT_SAMPLE_ID,
+    FIELD_SAMPLE_COUNT,
+    FIELD_SAMPLE_SUBJECTS,
+    FIELD_SAMPLES_UPDATED_AT,
+    FIELD_UPDATED_AT,
+)
+from lighthouse.helpers.mongo_db import get_samples
+
+logger = logging.getLogger(__name__)
+
+
+def construct_sample_message_subject(sample: Dict[str, Any]) -> Dict[str, str]:
+    """Generates sample subject for a plate event message.
+
+    Arguments:
+        samples {Dict[str, str]} -- The sample for which to generate a subject.
+
+    Returns:
+        {Dict[str, str]} -- The plate message sample subject.
+    """
+    friendly_name = "__".join(
+        [
+            sample[FIELD_ROOT_SAMPLE_ID],
+            sample[FIELD_RNA_ID],
+            sample[FIELD_LAB_ID],
+            sample[FIELD_RESULT],
+        ]
+    )
+    return {
+        "role_type": "sample",
+        "subject_type": "sample",
+        "friendly_name": friendly_name,
+        "uuid": sample[FIELD_LH_SAMPLE_UUID],
+    }
+
+
+def get_source_plate_samples_version(source_plate_uuid: str) -> Dict[str, Any]:
+    """Get the number of samples on a source plate and when the latest of them was updated, which
+    change whenever the crawler adds or re-imports samples on the plate.
+
+    Arguments:
+        source_plate_uuid {str} -- The source plate uuid for which to get the version.
+
+    Returns:
+        {Dict[str, Any]} -- The number of samples and the latest time one was updated.
+    """
+    # both queries are covered by the index on the source plate uuid and updated at, the first
+    # counting its keys and the second reading a single one
+    samples = app.data.driver.db.samples
+    sample_count = samples.count_documents({FIELD_LH_SOURCE_PLATE_UUID: source_plate_uuid})
+    latest_sample = samples.find_one(
+        {FIELD_LH_SOURCE_PLATE_UUID: source_plate_uuid},
+        {"_id": False, FIELD_UPDATED_AT: True},
+        sort=[(FIELD_UPDATED_AT, -1)],
+    )
+
+    return {
+        FIELD_SAMPLE_COUNT: sample_count,
+        FIELD_SAMPLES_UPDATED_AT: (
+            latest_sample.get(FIELD_UPDATED_AT) if latest_sample is not None else None
+        ),
+    }
+
+
+def get_source_plate_sample_subjects(source_plate_uuid: str) -> Optional[List[Dict[str, str]]]:
+    """Attempt to get the pre-built sample subjects of a source plate from its summary. The summary
+    is only trusted while the plate's samples are unchanged since it was built (the samples watcher
+    may not be running to refresh it); otherwise it is rebuilt from the samples.
+
+    Arguments:
+        source_plate_uuid {str} -- The source plate uuid for which to get sample subjects.
+
+    Returns:
+        {List[Dict[str, str]]} -- The sample subjects of all samples on the source plate;
+        otherwise None if they cannot be determined.
+    """
+    try:
+        source_plate_summaries = app.data.driver.db.source_plate_summaries
+        summary = source_plate_summaries.find_one({"_id": source_plate_uuid})
+        if summary is not None:
+            samples_version = get_source_plate_samples_version(source_plate_uuid)
+            if all(summary.get(field) == value for field, value in samples_version.items()):
+                return summary[FIELD_SAMPLE_SUBJECTS]
+    except Exception as e:
+        logger.error(
+            "An error occurred attempting to fetch the summary of source plate "
+            f"'{source_plate_uuid}'"
+        )
+        logger.exception(e)
+        return None
+
+    if summary is None:
+        logger.debug(f"No summary of source plate '{source_plate_uuid}', building one")
+    else:
+        logger.debug(f"The summary of source plate '{source_plate_uuid}' is stale, rebuilding it")
+    return refresh_source_plate_summary(source_plate_uuid)
+
+
+def refresh_source_plate_summary(source_plate_uuid: str) -> Optional[List[Dict[str, str]]]:
+    """Rebuild the summary of a source plate from its samples. Should be called whenever samples on
+    the plate change.
+
+    Arguments:
+        source_plate_uuid {str} -- The source plate uuid for which to rebuild the summary.
+
+    Returns:
+        {List[Dict[str, str]]} -- The sample subjects of all samples on the source plate;
+        otherwise None if they cannot be determined.
+    """
+    samples = get_samples(source_plate_uuid)
+    if samples is None:
+        return None
+
+    try:
+        sample_subjects = [construct_sample_message_subject(sample) for sample in samples]
+        updated_ats = [
+            sample[FIELD_UPDATED_AT]
+            for sample in samples
+            if sample.get(FIELD_UPDATED_AT) is not None
+        ]
+
+        source_plate_summaries = app.data.driver.db.source_plate_summaries
+        if len(sample_subjects) == 0:
+            source_plate_summaries.delete_one({"_id": source_plate_uuid})
+        else:
+            source_plate_summaries.replace_one(
+                {"_id": source_plate_uuid},
+                {
+                    FIELD_SAMPLE_SUBJECTS: sample_subjects,
+                    # the version of the samples the summary was built from, see
+                    # get_source_plate_samples_version
+                    FIELD_SAMPLE_COUNT: len(samples),
+                    FIELD_SAMPLES_UPDATED_AT: max(updated_ats) if updated_ats else None,
+                    FIELD_UPDATED_AT: datetime.utcnow(),
+                },
+                upsert=True,
+            )
+
+        return sample_subjects
+    except Exception as e:
+        logger.error(
+            "An error occurred attempting to refresh the summary of source plate "
+            f"'{source_plate_uuid}'"
+        )
+        logger.exception(e)
+        return None
+
+
+def refresh_source_plate_summaries_for_samples(samples: Iterable[Dict[str, Any]]) -> None:
+    """Rebuild the summaries of all source plates which the given samples are on.
+
+    Arguments:
+        samples {Iterable[Dict[str, Any]]} -- The samples which have changed.
+    """
+    source_plate_uuids = {
+        sample[FIELD_LH_SOURCE_PLATE_UUID]
+        for sample in samples
+        if sample.get(FIELD_LH_SOURCE_PLATE_UUID) is not None
+    }
+    logger.info(f"Refreshing the summaries of {len(source_plate_uuids)} source plates")
+
+    for source_plate_uuid in source_plate_uuids:
+        refresh_source_plate_summary(source_plate_uuid)
+
+
+def rebuild_source_plate_summaries() -> int:
+    """Rebuild the summaries of every source plate which has samples.
+
+    Returns:
+        {int} -- The number of source plates summarised.
+    """
+    source_plate_uuids = app.data.driver.db.samples.distinct(
+        FIELD_LH_SOURCE_PLATE_UUID, {FIELD_LH_SOURCE_PLATE_UUID: {"$nin": ["", None]}}
+    )
+    logger.info(f"Rebuilding the summaries of {len(source_plate_uuids)} source plates")
+
+    for source_plate_uuid in source_plate_uuids:
+        refresh_source_plate_summary(source_plate_uuid)
+
+    return len(source_plate_uuids)
@@ -1,81 +1,299 @@
 import logging
+import multiprocessing
+import pathlib
 import time
+from concurrent.futures import ProcessPoolExecutor
+from threading import Thread
+from typing import Any, Callable, ContextManager, Dict, List, Optional
 
-import pandas as pd  # type: ignore
+from bson.objectid import ObjectId  # type: ignore
+from eve import Eve  # type: ignore
 from flask import current_app as app
-from lighthouse import scheduler
-from lighthouse.constants import FIELD_PLATE_BARCODE
+from lighthouse import create_app, scheduler
+from lighthouse.constants import (
+    REPORT_JOB_STATUS_COMPLETED,
+    REPORT_JOB_STATUS_FAILED,
+    REPORT_RUN_STATUS_UNCHANGED,
+    REPORT_STAGE_CHERRYPICKED,
+    REPORT_STAGE_DECLARATIONS,
+    REPORT_STAGE_LOCATIONS,
+    REPORT_STAGE_POSITIVE_SAMPLES,
+    REPORT_STAGE_WRITING,
+)
+from lighthouse.helpers.cherrypicked_samples import refresh_cherrypicked_samples
+from lighthouse.helpers.report_jobs import (
+    complete_report_job,
+    enqueue_report_job,
+    fail_report_job,
+    mark_report_job_running,
+    report_job_heartbeat,
+    set_report_job_stage,
+)
+from lighthouse.helpers.report_runs import (
+    finish_report_run,
+    get_max_rss,
+    profile_report_stage,
+    start_report_run,
+)
 from lighthouse.helpers.reports import (
+    REPORT_WRITERS,
+    ReportPartition,
     add_cherrypicked_column,
+    add_location_column,
+    add_to_report_catalogue,
+    convert_size,
     get_all_positive_samples,
-    get_distinct_plate_barcodes,
     get_new_report_name_and_path,
+    get_report_partition_samples,
+    get_report_inputs_fingerprint,
+    get_report_partitions,
+    get_reports_with_fingerprint,
     join_samples_declarations,
-    map_labware_to_location,
+    merge_report_partitions,
 )
+from pandas import DataFrame  # type: ignore
+from pymongo.collection import Collection  # type: ignore
 
 logger = logging.getLogger(__name__)
 
+# the app used by each report worker process, see init_report_worker
+report_worker_app: Optional[Eve] = None
 
-def create_report() -> str:
+
+def create_report(
+    report_formats: Optional[List[str]] = None,
+    on_stage: Optional[Callable[[str], None]] = None,
+    reuse_unchanged: bool = True,
+) -> List[str]:
     """Creates a positve samples on site record using the samples collection and location
-    information from labwhere.
+    information from labwhere. The wall time, memory and rows of each stage are recorded as a report
+    run, see start_report_run.
+
+    Keyword Arguments:
+        report_formats {Optional[List[str]]} -- the formats to write the report in; the
+        REPORT_FORMATS config is used if not given (default: {None})
+        on_stage {Optional[Callable[[str], None]]} -- called with the name of each stage as it
+        starts (default: {None})
+        reuse_unchanged {bool} -- whether the latest reports are used if nothing the report is
+        created from has changed since they were created; the fingerprint of the inputs does not
+        cover the LabWhere locations, so reports asked for by a user are always created afresh
+        (default: {True})
 
     Returns:
-        str -- filename of report created
+        List[str] -- filenames of the reports created, one for each format; or of the latest
+        reports if they are reused
     """
     logger.info("Creating positive samples report")
     start = time.time()
+    run_id = start_report_run()
 
-    # get samples collection
-    logger.debug("Getting all positive samples")
-    samples_collection = app.data.driver.db.samples
-    positive_samples_df = get_all_positive_samples(samples_collection)
+    def notify_stage(name: str) -> None:
+        if on_stage is not None:
+            on_stage(name)
 
-    logger.debug("Getting location barcodes from labwhere")
-    labware_to_location_barcode_df = map_labware_to_location(
-        get_distinct_plate_barcodes(samples_collection)
-    )
+    def stage(name: str) -> ContextManager[Dict[str, Any]]:
+        notify_stage(name)
+        return profile_report_stage(run_id, name)
 
-    logger.debug("Joining location data from labwhere")
-    merged = positive_samples_df.merge(
-        labware_to_location_barcode_df, how="left", on=FIELD_PLATE_BARCODE
-    )
+    try:
+        # get samples collection
+        samples_collection = app.data.driver.db.samples
+
+        # catch up the index of cherrypicked samples once, before any partitions are processed
+        if app.config["CHERRYPICKED_SAMPLES_INDEX"]:
+            refresh_cherrypicked_samples()
+
+        report_formats = report_formats or app.config["REPORT_FORMATS"]
+        fingerprint = get_report_inputs_fingerprint()
+        if fingerprint is not None and reuse_unchanged:
+            existing_report_names = get_reports_with_fingerprint(fingerprint, report_formats)
+            if existing_report_names is not None:
+                logger.info(f"Report inputs are unchanged, using reports {existing_report_names}")
+                finish_report_run(run_id, REPORT_RUN_STATUS_UNCHANGED, existing_report_names)
+                return existing_report_names
+
+        parallelism = app.config["REPORT_PARALLELISM"]
+        if parallelism > 1:
+            # each partition of the window joins its own declarations and cherrypicked samples; only
+            # the memory allocated by this process is traced
+            with stage(REPORT_STAGE_POSITIVE_SAMPLES) as profile:
+                positive_samples_df = get_positive_samples_in_parallel(
+                    samples_collection, parallelism
+                )
+                profile["rows"] = len(positive_samples_df.index)
+        else:
+            with stage(REPORT_STAGE_POSITIVE_SAMPLES) as profile:
+                logger.debug("Getting all positive samples")
+                positive_samples_df = get_all_positive_samples(samples_collection)
+                profile["rows"] = len(positive_samples_df.index)
+
+            with stage(REPORT_STAGE_DECLARATIONS) as profile:
+                positive_samples_df = join_samples_declarations(positive_samples_df)
+                profile["rows"] = len(positive_samples_df.index)
 
-    merged = join_samples_declarations(merged)
+            with stage(REPORT_STAGE_CHERRYPICKED) as profile:
+                positive_samples_df = add_cherrypicked_column(positive_samples_df)
+                profile["rows"] = len(positive_samples_df.index)
 
-    merged = add_cherrypicked_column(merged)
+        memory_usage = int(positive_samples_df.memory_usage(deep=True).sum())
+        logger.info(
+            f"{len(positive_samples_df.index)} positive samples gathered in "
+            f"{round(time.time() - start, 2)}s, taking {convert_size(memory_usage)} "
+            f"({memory_usage // max(len(positive_samples_df.index), 1)} bytes per row)"
+        )
 
-    report_name, report_path = get_new_report_name_and_path()
+        with stage(REPORT_STAGE_LOCATIONS) as profile:
+            logger.debug("Getting location barcodes from labwhere")
+            merged = add_location_column(positive_samples_df)
+            profile["rows"] = len(merged.index)
 
-    logger.info(f"Writing results to {report_path}")
+        notify_stage(REPORT_STAGE_WRITING)
 
-    # Create a Pandas Excel writer using XlsxWriter as the engine
-    writer = pd.ExcelWriter(report_path, engine="xlsxwriter")
+        report_names = []
+        report_paths = []
+        for report_format in report_formats:
+            report_name, report_path = get_new_report_name_and_path(report_format)
 
-    # Sheet2 contains all positive samples WITH location barcodes
-    merged[merged.location_barcode.notnull()].to_excel(
-        writer, sheet_name="POSITIVE SAMPLES WITH LOCATION", index=False
+            # each format is profiled as its own writing stage
+            with profile_report_stage(run_id, f"{REPORT_STAGE_WRITING}_{report_format}") as profile:
+                logger.info(f"Writing results to {report_path}")
+
+                REPORT_WRITERS[report_format](merged, report_path)
+                profile["rows"] = len(merged.index)
+
+            report_names.append(report_name)
+            report_paths.append(pathlib.PurePath(report_path))
+
+        add_to_report_catalogue(report_paths, fingerprint)
+    except Exception:
+        finish_report_run(run_id, REPORT_JOB_STATUS_FAILED)
+        raise
+
+    finish_report_run(run_id, REPORT_JOB_STATUS_COMPLETED, report_names)
+    logger.info(
+        f"Report creation complete in {round(time.time() - start, 2)}s, peak memory "
+        f"{convert_size(get_max_rss())}"
     )
 
-    # Convert the dataframe to an XlsxWriter Excel object
-    #  Sheet1 contains all positive samples with AND without location barcodes
-    merged.to_excel(writer, sheet_name="ALL POSITIVE SAMPLES", index=False)
+    return report_names
+
 
-    # Close the Pandas Excel writer and output the Excel file
-    writer.save()
+def get_positive_samples_in_parallel(samples_collection: Collection, parallelism: int) -> DataFrame:
+    """Get the positive samples in the report window, joined with their declarations and whether
+    they have been cherrypicked, by partitioning the window by centre and day tested and
+    processing the partitions in a pool of worker processes.
 
-    logger.info(f"Report creation complete in {round(time.time() - start, 2)}s")
+    Arguments:
+        samples_collection {Collection} -- the samples collection
+        parallelism {int} -- the number of worker processes
 
-    return report_name
+    Returns:
+        DataFrame -- the positive samples in the report window, in the same order as
+        get_all_positive_samples returns them
+    """
+    partitions = get_report_partitions(samples_collection)
+    logger.info(f"Processing {len(partitions)} report partitions in {parallelism} processes")
 
+    # the workers are spawned rather than forked as neither the Mongo client nor the warehouse
+    # engine can be shared with a forked process
+    with ProcessPoolExecutor(
+        max_workers=parallelism,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_report_worker,
+    ) as executor:
+        partition_dfs = list(executor.map(get_report_partition_samples_in_worker, partitions))
 
-def create_report_job():
-    """Scheduler's job to create the report within the scheduler's app context.
+    return merge_report_partitions(partition_dfs)
+
+
+def init_report_worker() -> None:
+    """Create the app used by a report worker process, without starting the scheduler."""
+    global report_worker_app
+    report_worker_app = create_app(run_scheduler=False)
+
+
+def get_report_partition_samples_in_worker(partition: ReportPartition) -> DataFrame:
+    """Get the positive samples in a partition of the report window, in a report worker process.
+
+    Arguments:
+        partition {ReportPartition} -- the partition of the report window
 
     Returns:
-        str -- filename of report created
+        DataFrame -- the positive samples in the partition
+    """
+    with report_worker_app.app_context():  # type: ignore
+        start = time.time()
+        partition_df = get_report_partition_samples(
+            report_worker_app.data.driver.db.samples, partition  # type: ignore
+        )
+        logger.debug(
+            f"Report partition {partition[0]} from {partition[1]:%Y-%m-%d}: "
+            f"{len(partition_df.index)} positive samples in {round(time.time() - start, 2)}s"
+        )
+
+        return partition_df
+
+
+def run_report_job(
+    job_id: ObjectId, report_formats: List[str], reuse_unchanged: bool = True
+) -> None:
+    """Create the report for a report job, recording its progress.
+
+    Arguments:
+        job_id {ObjectId} -- the id of the job
+        report_formats {List[str]} -- the formats to create the report in
+
+    Keyword Arguments:
+        reuse_unchanged {bool} -- whether the latest reports are used if their inputs are
+        unchanged, see create_report (default: {True})
+    """
+    logger.info(f"Running report job {job_id}")
+    try:
+        mark_report_job_running(job_id)
+        with report_job_heartbeat(job_id):
+            report_names = create_report(
+                report_formats or None,
+                on_stage=lambda name: set_report_job_stage(job_id, name),
+                reuse_unchanged=reuse_unchanged,
+            )
+        complete_report_job(job_id, report_names)
+    except Exception as e:
+        logger.error(f"Report job {job_id} failed")
+        logger.exception(e)
+        fail_report_job(job_id, [type(e).__name__])
+
+
+def run_report_job_in_background(
+    job_id: ObjectId, report_formats: List[str], reuse_unchanged: bool = True
+) -> None:
+    """Run a report job in a background thread, within the current app's context.
+
+    Arguments:
+        job_id {ObjectId} -- the id of the job
+        report_formats {List[str]} -- the formats to create the report in
+
+    Keyword Arguments:
+        reuse_unchanged {bool} -- whether the latest reports are used if their inputs are
+        unchanged, see create_report (default: {True})
+    """
+    current_app = app._get_current_object()  # type: ignore
+
+    def run() -> None:
+        with current_app.app_context():
+            run_report_job(job_id, report_formats, reuse_unchanged=reuse_unchanged)
+
+    Thread(target=run, name=f"report-job-{job_id}", daemon=True).start()
+
+
+def create_report_job():
+    """Scheduler's job to create the report within the scheduler's app context. The report is not
+    created if another report job is already running.
     """
     logger.info("Starting create_report job")
     with scheduler.app.app_context():
-        create_report()
+        job_id, created = enqueue_report_job([])
+        if not created:
+            logger.info(f"Report job {job_id} is already running, skipping")
+            return
+
+        run_report_job(job_id, [])
@@ -0,0 +1,191 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, List
+
+from flask import current_app as app
+from lighthouse import scheduler
+from lighthouse.constants import FIELD_PARSED_DATE_TESTED, FIELD_UPDATED_AT
+from lighthouse.helpers.mongo_db import backfill_date_tested_for_samples
+from lighthouse.helpers.positive_rollups import refresh_positive_rollups_for_samples
+from lighthouse.helpers.source_plate_summaries import refresh_source_plate_summaries_for_samples
+
+logger = logging.getLogger(__name__)
+
+# Called with each batch of inserted or updated samples, to keep data derived from samples current
+SAMPLE_CHANGE_HANDLERS: List[Callable[[List[Dict[str, Any]]], None]] = [
+    backfill_date_tested_for_samples,
+    refresh_source_plate_summaries_for_samples,
+    # after the date tested is backfilled, which the rollups are by
+    refresh_positive_rollups_for_samples,
+]
+
+# The id of the document holding the resume token of the samples change stream
+SAMPLES_WATCHER_ID = "samples"
+
+# The id of the document recording the latest import and sample update which sample changes have
+# been caught up to, see catch_up_sample_changes
+SAMPLES_CATCH_UP_REBUILD_ID = "samples_changes"
+
+# Only one catch up runs at a time; others skip rather than wait for it
+samples_catch_up_lock = threading.Lock()
+
+# The names of the fields set by an update in the samples change stream
+EXPRESSION_UPDATED_FIELD_NAMES = {
+    "$map": {
+        "input": {"$objectToArray": "$updateDescription.updatedFields"},
+        "in": "$$this.k",
+    }
+}
+
+# Inserts, replaces and updates of samples, except the updates which only set the parsed date
+# tested. Those are made by backfill_date_tested_for_samples, after which the other handlers have
+# already seen the samples with their date tested
+SAMPLES_WATCHER_PIPELINE = [
+    {
+        "$match": {
+            "$or": [
+                {"operationType": {"$in": ["insert", "replace"]}},
+                {
+                    "operationType": "update",
+                    "$expr": {
+                        "$or": [
+                            {"$ne": [EXPRESSION_UPDATED_FIELD_NAMES, [FIELD_PARSED_DATE_TESTED]]},
+                            {"$ne": ["$updateDescription.removedFields", []]},
+                        ]
+                    },
+                },
+            ]
+        }
+    }
+]
+
+
+def handle_sample_changes(samples: List[Dict[str, Any]]) -> None:
+    """Calls each of the sample change handlers with a batch of changed samples. A failing handler
+    is logged rather than stopping the others.
+
+    Arguments:
+        samples {List[Dict[str, Any]]} -- The inserted or updated samples.
+    """
+    for handler in SAMPLE_CHANGE_HANDLERS:
+        try:
+            handler(samples)
+        except Exception as e:
+            logger.error(f"Sample change handler '{handler.__name__}' failed")
+            logger.exception(e)
+
+
+def watch_samples(batch_size: int = 1000, max_await_time_ms: int = 1000) -> None:
+    """Watches the samples collection and passes inserted and updated samples to the sample change
+    handlers in batches. Updates which only set the parsed date tested are skipped, see
+    SAMPLES_WATCHER_PIPELINE. Resumes from where the previous watcher stopped. Deleted samples
+    cannot be attributed to a plate, so derived data should be rebuilt after samples are deleted.
+
+    Change streams require MongoDB to run as a replica set.
+
+    Keyword Arguments:
+        batch_size {int} -- the maximum number of samples passed to the handlers at once
+        (default: {1000})
+        max_await_time_ms {int} -- how long to wait for more changes before handling a partial
+        batch (default: {1000})
+    """
+    db = app.data.driver.db
+    watcher = db.change_stream_tokens.find_one({"_id": SAMPLES_WATCHER_ID})
+    resume_token = watcher["resume_token"] if watcher is not None else None
+
+    logger.info("Watching samples for changes")
+    with db.samples.watch(
+        SAMPLES_WATCHER_PIPELINE,
+        full_document="updateLookup",
+        resume_after=resume_token,
+        max_await_time_ms=max_await_time_ms,
+    ) as stream:
+        changed_samples: List[Dict[str, Any]] = []
+        while stream.alive:
+            change = stream.try_next()
+            if change is not None:
+                # the sample may have been deleted before an update could be looked up
+                if change.get("fullDocument") is not None:
+                    changed_samples.append(change["fullDocument"])
+                if len(changed_samples) < batch_size:
+                    continue
+
+            if len(changed_samples) > 0:
+                logger.debug(f"Handling {len(changed_samples)} changed samples")
+                handle_sample_changes(changed_samples)
+                changed_samples = []
+
+            if stream.resume_token is not None:
+                db.change_stream_tokens.replace_one(
+                    {"_id": SAMPLES_WATCHER_ID},
+                    {"resume_token": stream.resume_token},
+                    upsert=True,
+                )
+
+
+def catch_up_sample_changes(batch_size: int = 1000) -> int:
+    """Passes the samples updated since the last catch up to the sample change handlers in batches,
+    once an import has been recorded since then, so that data derived from samples is kept current
+    without a change stream. The crawler records an import after adding its samples, and sets the
+    updated_at of each sample it writes. The first catch up passes every sample to the handlers.
+    Skipped while another catch up is running.
+
+    Keyword Arguments:
+        batch_size {int} -- the maximum number of samples passed to the handlers at once
+        (default: {1000})
+
+    Returns:
+        {int} -- The number of samples passed to the handlers.
+    """
+    if not samples_catch_up_lock.acquire(blocking=False):
+        logger.debug("Sample changes are already being caught up, skipping")
+        return 0
+
+    try:
+        db = app.data.driver.db
+        caught_up = db.rebuilds.find_one({"_id": SAMPLES_CATCH_UP_REBUILD_ID})
+        # the latest import is found before the samples are read, so that samples imported while
+        # catching up are caught up by the next import
+        latest_import = db.imports.find_one({}, {"_id": True}, sort=[("_id", -1)])
+        latest_import_id = latest_import["_id"] if latest_import is not None else None
+        if caught_up is not None and caught_up["import_id"] == latest_import_id:
+            return 0
+
+        # samples updated at the time caught up to are passed again, in case more were written with
+        # the same time after the last catch up
+        query: Dict[str, Any] = {}
+        samples_updated_at = caught_up[FIELD_UPDATED_AT] if caught_up is not None else None
+        if samples_updated_at is not None:
+            query = {FIELD_UPDATED_AT: {"$gte": samples_updated_at}}
+
+        number_of_samples = 0
+        changed_samples: List[Dict[str, Any]] = []
+        for sample in db.samples.find(query, sort=[(FIELD_UPDATED_AT, 1)]):
+            changed_samples.append(sample)
+            if sample.get(FIELD_UPDATED_AT) is not None:
+                samples_updated_at = sample[FIELD_UPDATED_AT]
+            if len(changed_samples) == batch_size:
+                handle_sample_changes(changed_samples)
+                number_of_samples += len(changed_samples)
+                changed_samples = []
+
+        if len(changed_samples) > 0:
+            handle_sample_changes(changed_samples)
+            number_of_samples += len(changed_samples)
+
+        db.rebuilds.replace_one(
+            {"_id": SAMPLES_CATCH_UP_REBUILD_ID},
+            {"import_id": latest_import_id, FIELD_UPDATED_AT: samples_updated_at},
+            upsert=True,
+        )
+        logger.info(f"Caught up the changes to {number_of_samples} samples")
+
+        return number_of_samples
+    finally:
+        samples_catch_up_lock.release()
+
+
+def catch_up_sample_changes_job() -> None:
+    """Scheduler's job to catch up sample changes within the scheduler's app context."""
+    with scheduler.app.app_context():
+        catch_up_sample_changes()
@@ -1,5 +1,6 @@
 import pika
 import logging
+from lighthouse.messages.in_memory import InMemoryBlockingConnection
 from lighthouse.messages.message import Message
 from flask import current_app as app
 
@@ -29,6 +30,11 @@ class Broker:
         self.connection.close()
 
     def __create_connection(self) -> None:
+        if app.config["RMQ_IN_MEMORY"]:
+            logger.debug("Creating in-memory messaging connection")
+            self.connection = InMemoryBlockingConnection()
+            return
+
         host = app.config["RMQ_HOST"]
         logger.debug(f"Creating messaging connection to '{host}'")
         credentials = pika.PlainCredentials(app.config["RMQ_USERNAME"], app.config["RMQ_PASSWORD"])
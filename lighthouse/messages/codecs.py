@@ -0,0 +1,123 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Set
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class PreSerialised(dict):
+    """A message fragment which holds its own JSON serialisation. Codecs which can embed raw JSON
+    (orjson) use the serialisation rather than encoding the fragment again for every message. As
+    the serialisation would no longer match, and fragments are shared between messages, fragments
+    cannot be modified once created.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.json = json.dumps(self, separators=(",", ":"))
+
+    def __immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} cannot be modified")
+
+    __setitem__ = __delitem__ = __immutable
+    clear = pop = popitem = setdefault = update = __immutable  # type: ignore
+
+
+class Codec(ABC):
+    """Encodes message content into the JSON payload published to the warehouse."""
+
+    name = ""
+
+    @abstractmethod
+    def encode(self, content: Any) -> str:
+        """Encodes the content of a message.
+
+        Arguments:
+            content {Any} -- The message content.
+
+        Returns:
+            {str} -- The encoded JSON.
+        """
+
+
+class JSONCodec(Codec):
+    """Encodes messages using the standard library json module."""
+
+    name = "json"
+
+    def encode(self, content: Any) -> str:
+        return json.dumps(content)
+
+
+class OrjsonCodec(Codec):
+    """Encodes messages using orjson, embedding pre-serialised fragments where the installed
+    version supports it.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        if hasattr(orjson, "Fragment"):
+            self.option = orjson.OPT_PASSTHROUGH_SUBCLASS
+            self.default = self.__passthrough_default
+        else:
+            self.option = 0
+            self.default = None
+
+    def encode(self, content: Any) -> str:
+        return orjson.dumps(content, default=self.default, option=self.option).decode()
+
+    @staticmethod
+    def __passthrough_default(obj: Any) -> Any:
+        # with subclass passthrough enabled, orjson hands every subclass of a builtin type to us
+        if isinstance(obj, PreSerialised):
+            return orjson.Fragment(obj.json)  # type: ignore
+        if isinstance(obj, dict):
+            return dict(obj)
+        if isinstance(obj, list):
+            return list(obj)
+        if isinstance(obj, str):
+            return str(obj)
+        if isinstance(obj, int):
+            return int(obj)
+        if isinstance(obj, float):
+            return float(obj)
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+DEFAULT_CODEC = JSONCodec()
+
+CODECS: Dict[str, Codec] = {DEFAULT_CODEC.name: DEFAULT_CODEC}
+if orjson is not None:
+    CODECS[OrjsonCodec.name] = OrjsonCodec()
+
+
+# The names of the unavailable codecs which have been warned about, so that the warning is not
+# repeated for every message
+unavailable_codecs: Set[str] = set()
+
+
+def get_codec(name: str) -> Codec:
+    """Gets the codec with the given name; otherwise falls back to the standard library codec when
+    it is not available.
+
+    Arguments:
+        name {str} -- The name of the codec, e.g. "json" or "orjson".
+
+    Returns:
+        {Codec} -- The codec.
+    """
+    codec = CODECS.get(name)
+    if codec is None:
+        if name not in unavailable_codecs:
+            unavailable_codecs.add(name)
+            logger.warning(f"Message codec '{name}' is not available, using '{DEFAULT_CODEC.name}'")
+        return DEFAULT_CODEC
+
+    return codec
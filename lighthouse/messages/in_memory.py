@@ -0,0 +1,80 @@
+from collections import deque
+from typing import Any, Deque, Dict, NamedTuple
+
+from pika.exceptions import ChannelWrongStateError, ConnectionWrongStateError  # type: ignore
+
+# The maximum number of published messages kept in memory; older messages are discarded first
+MAX_PUBLISHED_MESSAGES = 10000
+
+
+class PublishedMessage(NamedTuple):
+    exchange: str
+    routing_key: str
+    body: Any
+
+
+# appending to a deque is thread safe, so connections from any thread can publish into it
+published_messages: Deque[PublishedMessage] = deque(maxlen=MAX_PUBLISHED_MESSAGES)
+declared_exchanges: Dict[str, str] = {}
+
+
+def clear_published_messages() -> None:
+    """Discards all messages published to the in-memory broker."""
+    published_messages.clear()
+
+
+class InMemoryChannel:
+    """Stands in for the subset of the pika BlockingChannel API used by Broker."""
+
+    def __init__(self, connection: "InMemoryBlockingConnection"):
+        self.connection = connection
+        self._open = True
+
+    @property
+    def is_open(self) -> bool:
+        return self._open and self.connection.is_open
+
+    def exchange_declare(self, exchange: str, exchange_type: str = "direct", **kwargs) -> None:
+        self.__check_open()
+        declared_exchanges[exchange] = exchange_type
+
+    def basic_publish(self, exchange: str, routing_key: str, body: Any, **kwargs) -> None:
+        self.__check_open()
+        published_messages.append(PublishedMessage(exchange, routing_key, body))
+
+    def close(self) -> None:
+        self.__check_open()
+        self._open = False
+
+    def __check_open(self) -> None:
+        if not self.is_open:
+            raise ChannelWrongStateError("Channel is closed.")
+
+
+class InMemoryBlockingConnection:
+    """Stands in for the subset of the pika BlockingConnection API used by Broker, so that the
+    plate event path can be exercised without a RabbitMQ server. Published messages are kept in
+    the module's published_messages.
+    """
+
+    def __init__(self, parameters: Any = None):
+        self.parameters = parameters
+        self._open = True
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    @property
+    def is_closed(self) -> bool:
+        return not self._open
+
+    def channel(self) -> InMemoryChannel:
+        if not self._open:
+            raise ConnectionWrongStateError("Connection is closed.")
+        return InMemoryChannel(self)
+
+    def close(self) -> None:
+        if not self._open:
+            raise ConnectionWrongStateError("Connection is closed.")
+        self._open = False
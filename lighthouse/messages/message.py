@@ -1,11 +1,14 @@
-import json
+from typing import Optional
+
+from lighthouse.messages.codecs import Codec, DEFAULT_CODEC
 
 
 class Message:
     """Creates a message with the correct payload structure to send to the warehouse."""
 
-    def __init__(self, message=None):
+    def __init__(self, message=None, codec: Optional[Codec] = None):
         self.message = message
+        self.codec = codec or DEFAULT_CODEC
 
     def payload(self) -> str:
         """Generates the JSON payload of the message.
@@ -13,4 +16,4 @@ class Message:
         Returns:
             {str} -- The message JSON payload.
         """
-        return json.dumps(self.message)
+        return self.codec.encode(self.message)
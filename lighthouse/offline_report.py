@@ -0,0 +1,91 @@
+"""Creates the positive samples report from snapshots of the collections it is created from, rather
+than from Mongo, LabWhere and the warehouses, so that heavy reports can be created away from the
+primary database. Neither Mongo nor the warehouses need to be available.
+
+The samples snapshot is required, and snapshots of samples_declarations, labware_locations (the
+cache of LabWhere locations) and cherrypicked_samples (the index of cherrypicked samples) can be
+given. Snapshots ending in .bson are read as mongodump output and any others as mongoexport output
+(one document on each line); either can be gzipped. The settings are loaded as the app loads them,
+from EVE_SETTINGS (development.py if unset).
+
+Run from the project root with:
+
+    python -m lighthouse.offline_report samples.bson.gz \\
+        --declarations samples_declarations.bson.gz \\
+        --locations labware_locations.json \\
+        --cherrypicked cherrypicked_samples.json \\
+        --format xlsx --output-dir /tmp
+"""
+
+import argparse
+import logging.config
+import os
+import pathlib
+from typing import List, Optional
+
+from flask import Flask
+from lighthouse.helpers.offline_reports import create_offline_report
+from lighthouse.helpers.reports import validate_report_formats
+
+CONFIG_DIR = pathlib.Path(__file__).parent.joinpath("config")
+
+
+def create_offline_app() -> Flask:
+    """Create an app with the lighthouse settings, to create reports within the context of, without
+    Eve connecting to Mongo as the lighthouse app does.
+
+    Returns:
+        Flask -- the app
+    """
+    app = Flask(__name__)
+
+    settings = os.environ.get("EVE_SETTINGS") or "development.py"
+    app.config.from_pyfile(settings if os.path.isabs(settings) else CONFIG_DIR.joinpath(settings))
+    logging.config.dictConfig(app.config["LOGGING"])
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("samples", type=pathlib.Path, help="snapshot of samples")
+    parser.add_argument(
+        "--declarations", type=pathlib.Path, help="snapshot of samples_declarations"
+    )
+    parser.add_argument("--locations", type=pathlib.Path, help="snapshot of labware_locations")
+    parser.add_argument(
+        "--cherrypicked", type=pathlib.Path, help="snapshot of cherrypicked_samples"
+    )
+    parser.add_argument(
+        "--format",
+        dest="report_formats",
+        action="append",
+        help="format to write the report in, may be repeated (default: REPORT_FORMATS)",
+    )
+    parser.add_argument(
+        "--output-dir", type=pathlib.Path, help="folder to write to (default: REPORTS_DIR)"
+    )
+    args = parser.parse_args(argv)
+
+    app = create_offline_app()
+    with app.app_context():
+        report_formats = args.report_formats or app.config["REPORT_FORMATS"]
+        errors = validate_report_formats(report_formats)
+        if errors:
+            parser.error("; ".join(errors))
+
+        report_paths = create_offline_report(
+            args.samples,
+            report_formats,
+            declarations_path=args.declarations,
+            locations_path=args.locations,
+            cherrypicked_path=args.cherrypicked,
+            output_dir=args.output_dir,
+        )
+
+    for report_path in report_paths:
+        print(f"Created {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,26 @@
+import logging
+
 from flask import current_app as app
 from eve.io.mongo import Validator  # type: ignore
-from eve.methods.post import post_internal  # type: ignore
-from lighthouse.constants import DUPLICATE_SAMPLES, NON_EXISTING_SAMPLE, FIELD_ROOT_SAMPLE_ID
+from eve.methods.common import (  # type: ignore
+    build_response_document,
+    marshal_write_response,
+    parse,
+    resolve_document_etag,
+    utcnow,
+)
+from eve.render import JSONRenderer  # type: ignore
+from eve.utils import config  # type: ignore
+from lighthouse.constants import DUPLICATE_SAMPLES, NON_EXISTING_SAMPLE
+from lighthouse.helpers.mongo_db import (
+    find_existing_root_sample_ids,
+    get_known_root_sample_ids,
+    update_latest_samples_declarations,
+)
 from collections import Counter
+from pymongo.errors import BulkWriteError  # type: ignore
 
+logger = logging.getLogger(__name__)
 
 # fail in validator -> returns correct response
 
@@ -46,14 +63,21 @@ def find_duplicates(sample_ids):
     return [k for k in c if c[k] > 1]
 
 
-# https://stackoverflow.com/questions/3462143/get-difference-between-two-lists
+# Root sample ids which are not in the filter of known root sample ids definitely do not exist, so
+# only the rest are looked up, in chunks
 def find_non_exist_samples(sample_ids):
-    cursor = app.data.driver.db.samples.find(
-        {FIELD_ROOT_SAMPLE_ID: {"$in": sample_ids}}, {FIELD_ROOT_SAMPLE_ID: 1}
-    )
+    sample_ids = list(dict.fromkeys(sample_ids))
+
+    known_sample_ids = get_known_root_sample_ids()
+    if known_sample_ids is not None:
+        possible_sample_ids = [
+            sample_id for sample_id in sample_ids if sample_id in known_sample_ids
+        ]
+    else:
+        possible_sample_ids = sample_ids
 
-    existing_sample_ids = [val[FIELD_ROOT_SAMPLE_ID] for val in cursor]
-    return list(set(sample_ids) - set(existing_sample_ids))
+    existing_sample_ids = find_existing_root_sample_ids(possible_sample_ids)
+    return [sample_id for sample_id in sample_ids if sample_id not in existing_sample_ids]
 
 
 def add_flags(sample, sample_ids, flag):
@@ -80,8 +104,9 @@ def pre_samples_declarations_post_callback(request):
     if len(sample_ids) == 0:
         return request
 
-    duplicate_sample_ids = find_duplicates(sample_ids)
-    non_exist_samples = find_non_exist_samples(sample_ids)
+    # sets, so that flagging each sample is a single lookup
+    duplicate_sample_ids = set(find_duplicates(sample_ids))
+    non_exist_samples = set(find_non_exist_samples(sample_ids))
 
     if (len(duplicate_sample_ids) == 0) and (len(non_exist_samples) == 0):
         return request
@@ -114,46 +139,103 @@ def build_clean_elems_object(items, request):
 
 # From the new response, we merge the answer from the elements into the original
 # response
-def merge_response_into_payload(payload, response, clean_elems):
+def merge_response_into_payload(payload_json, response, clean_elems):
     keys = list(clean_elems.keys())
 
     if len(keys) == 1:
-        # When the new clean payload request thaw we have just performed earlier
-        # in post_samples_declarations_pos_callback) only modifies one element,
-        # the response will not have an items attribute, but it will contain the
-        # attributes of the element in root.
-        payload.json["_items"][keys[0]] = response
+        # When only one element has been inserted (by insert_clean_samples_declarations) the
+        # response will not have an items attribute, but it will contain the attributes of the
+        # element in root.
+        payload_json["_items"][keys[0]] = response
     else:
         for pos in range(len(keys)):
             key = keys[pos]
-            payload.json["_items"][key] = response["_items"][pos]
+            payload_json["_items"][key] = response["_items"][pos]
+
+    return payload_json
+
+
+# Inserts the OK items, which Eve has already validated, with a single unordered insert rather
+# than posting them again. Eve's insert hooks are raised as they would be for a post, and the
+# response has the same shape as Eve's: the element itself when there is only one, otherwise its
+# items
+def insert_clean_samples_declarations(clean_payload):
+    resource = "samples_declarations"
+    date_utc = utcnow()
+
+    documents = []
+    for value in clean_payload:
+        document = parse(value, resource)
+        document[config.LAST_UPDATED] = document[config.DATE_CREATED] = date_utc
+        documents.append(document)
+
+    getattr(app, "on_insert")(resource, documents)
+    getattr(app, "on_insert_%s" % resource)(documents)
+    resolve_document_etag(documents, resource)
+
+    # an unordered insert carries on past any document which fails, so only those are lost
+    failed_indexes = {}
+    try:
+        app.data.driver.db.samples_declarations.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        logger.exception(e)
+        failed_indexes = {error["index"]: error["errmsg"] for error in e.details["writeErrors"]}
+
+    results = []
+    inserted_documents = []
+    for index, document in enumerate(documents):
+        if index in failed_indexes:
+            results.append(
+                {
+                    config.STATUS: config.STATUS_ERR,
+                    config.ISSUES: {"exception": failed_indexes[index]},
+                }
+            )
+        else:
+            build_response_document(document, resource, [], document)
+            document[config.STATUS] = config.STATUS_OK
+            results.append(marshal_write_response(document, resource))
+            inserted_documents.append(document)
+
+    if inserted_documents:
+        getattr(app, "on_inserted")(resource, inserted_documents)
+        getattr(app, "on_inserted_%s" % resource)(inserted_documents)
 
-    return payload
+    if len(results) == 1:
+        return results[0]
+
+    return {config.STATUS: config.STATUS_OK, config.ITEMS: results}
 
 
 # Performs a partial update of OK items when they are in a payload when there are
 # some ERR items so the OK items won't be rejected
 def post_samples_declarations_post_callback(request, payload):
-    if payload.json["_status"] == "OK":
+    payload_json = payload.get_json()
+    if payload_json["_status"] == "OK":
         return payload
 
-    if "_items" in payload.json:
-        items = payload.json["_items"]
+    if "_items" in payload_json:
+        items = payload_json["_items"]
 
         # Extract only the OK items that have been rejected just because the group
         # contained ERR items too
         clean_elems = build_clean_elems_object(items, request)
         if clean_elems:
-            clean_payload = clean_elems.values()
-
-            # We re-perform the request again with the OK items without performing
-            # the validation again, so they will go to the database
-            new_response = post_internal(
-                "samples_declarations", payl=clean_payload, skip_validation=True
-            )
+            # The OK items have already been validated, so they are inserted straight into the
+            # database
+            new_response = insert_clean_samples_declarations(clean_elems.values())
 
             # We re-generate the response by merging new response with the original response
-            merged_payload = merge_response_into_payload(payload, new_response[0], clean_elems)
+            merged_payload_json = merge_response_into_payload(
+                payload_json, new_response, clean_elems
+            )
+            payload.set_data(JSONRenderer().render(merged_payload_json))
 
-            return merged_payload
+            return payload
     return None
+
+
+# Keeps the latest declaration of each sample up to date. Eve calls this for the declarations
+# inserted by the original request and for those inserted by insert_clean_samples_declarations
+def inserted_samples_declarations_callback(items):
+    update_latest_samples_declarations(items)
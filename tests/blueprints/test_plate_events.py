@@ -66,7 +66,7 @@ def test_get_create_plate_event_endpoint_internal_error_failed_broker_publish(cl
             assert len(response.json["errors"]) == 1
 
 
-def test_get_create_plate_event_endpoint_success(client):
+def test_get_create_plate_event_endpoint_success(client, published_plate_events):
     with patch("lighthouse.blueprints.plate_events.construct_event_message") as mock_construct:
         with patch("lighthouse.blueprints.plate_events.Broker") as mock_broker:
             test_message = Message("test message content")
@@ -77,3 +77,35 @@ def test_get_create_plate_event_endpoint_success(client):
             mock_broker().close_connection.assert_called()
             assert response.status_code == HTTPStatus.OK
             assert len(response.json["errors"]) == 0
+
+
+def test_get_create_plate_event_endpoint_duplicate_not_published(client, published_plate_events):
+    with patch("lighthouse.blueprints.plate_events.construct_event_message") as mock_construct:
+        with patch("lighthouse.blueprints.plate_events.Broker") as mock_broker:
+            mock_construct.return_value = [], Message("test message content")
+
+            url = "/plate-events/create?event_type=test_event_type&event_id=robot-retry"
+            first_response = client.get(url)
+            second_response = client.get(url)
+
+            mock_broker().publish.assert_called_once()
+            assert first_response.status_code == HTTPStatus.OK
+            assert second_response.status_code == HTTPStatus.OK
+            assert len(second_response.json["errors"]) == 0
+
+
+def test_get_create_plate_event_endpoint_failed_publish_can_be_retried(
+    client, published_plate_events
+):
+    with patch("lighthouse.blueprints.plate_events.construct_event_message") as mock_construct:
+        with patch("lighthouse.blueprints.plate_events.Broker") as mock_broker:
+            mock_broker().publish.side_effect = [Exception("Boom!"), None]
+            mock_construct.return_value = [], Message("test message content")
+
+            url = "/plate-events/create?event_type=test_event_type&event_id=failed-publish"
+            first_response = client.get(url)
+            second_response = client.get(url)
+
+            assert mock_broker().publish.call_count == 2
+            assert first_response.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+            assert second_response.status_code == HTTPStatus.OK
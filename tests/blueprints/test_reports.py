@@ -1,8 +1,16 @@
+from datetime import datetime
 from http import HTTPStatus
 from unittest.mock import patch
 
 import pandas as pd
-from lighthouse.constants import FIELD_COORDINATE, FIELD_PLATE_BARCODE, FIELD_ROOT_SAMPLE_ID
+from lighthouse.constants import (
+    FIELD_COORDINATE,
+    FIELD_PLATE_BARCODE,
+    FIELD_ROOT_SAMPLE_ID,
+    REPORT_JOB_STATUS_COMPLETED,
+    REPORT_JOB_STATUS_QUEUED,
+)
+from lighthouse.jobs.reports import run_report_job
 
 
 def test_get_reports_endpoint(client):
@@ -23,8 +31,93 @@ def test_get_reports_list(client):
         assert response.json == {"reports": []}
 
 
+def test_get_reports_paginated(client, app, report_catalogue):
+    with app.app_context():
+        app.data.driver.db.report_catalogue.insert_many(
+            [
+                {
+                    "_id": f"20080{day}_0923_positives_with_locations.xlsx",
+                    "size": 1024,
+                    "created_at": datetime(2020, 8, day),
+                }
+                for day in range(1, 4)
+            ]
+        )
+
+    response = client.get("/reports?page=1&max_results=2")
+
+    assert response.status_code == HTTPStatus.OK
+    assert [report["filename"] for report in response.json["reports"]] == [
+        "200803_0923_positives_with_locations.xlsx",
+        "200802_0923_positives_with_locations.xlsx",
+    ]
+    assert response.json["_meta"] == {"page": 1, "max_results": 2, "total": 3}
+
+
+def test_get_reports_invalid_page(client, report_catalogue):
+    response = client.get("/reports?page=0")
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_get_positive_samples(client):
+    with patch(
+        "lighthouse.blueprints.reports.get_positive_samples_page",
+        return_value=([{"Root Sample ID": "MCM001"}], "next_cursor"),
+    ) as mock_get_page:
+        response = client.get(
+            "/reports/positives?centre=centre1&date_from=2020-05-01&date_to=2020-05-02"
+            "&has_location=false&lims_submission=Yes&max_results=1&after=cursor"
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json == {
+        "positives": [{"Root Sample ID": "MCM001"}],
+        "_meta": {"max_results": 1, "next": "next_cursor"},
+    }
+    mock_get_page.assert_called_once_with(
+        1,
+        after="cursor",
+        source="centre1",
+        date_from=datetime(2020, 5, 1),
+        date_to=datetime(2020, 5, 2),
+        has_location=False,
+        lims_submission="Yes",
+    )
+
+
+def test_get_positive_samples_invalid_parameters(client):
+    with patch("lighthouse.blueprints.reports.get_positive_samples_page") as mock_get_page:
+        response = client.get(
+            "/reports/positives?date_from=01/05/2020&has_location=maybe&lims_submission=yes"
+        )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert len(response.json["errors"]) == 3
+    mock_get_page.assert_not_called()
+
+
+def test_get_positive_samples_invalid_cursor(client):
+    with patch(
+        "lighthouse.blueprints.reports.get_positive_samples_page",
+        side_effect=ValueError("Invalid cursor"),
+    ):
+        response = client.get("/reports/positives?after=not_a_cursor")
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json == {"errors": ["Invalid cursor"]}
+
+
 def test_create_report(
-    client, app, tmp_path, samples, labwhere_samples_simple, samples_declarations
+    client,
+    app,
+    tmp_path,
+    samples,
+    labwhere_samples_simple,
+    samples_declarations,
+    report_jobs,
+    report_catalogue,
+    report_runs,
 ):
     with app.app_context():
         with patch(
@@ -47,8 +140,127 @@ def test_create_report(
                         ],
                     ),
                 ):
-                    response = client.post("/reports/new")
-                    assert response.json == {"reports": "Some details of a report"}
+                    # run the job in the foreground so that it has finished by the time the
+                    # response is created
+                    with patch(
+                        "lighthouse.blueprints.reports.run_report_job_in_background",
+                        side_effect=run_report_job,
+                    ):
+                        response = client.post("/reports/new")
+                        assert response.status_code == HTTPStatus.ACCEPTED
+                        assert response.json["job"]["status"] == REPORT_JOB_STATUS_COMPLETED
+                        assert response.json["job"]["report_names"] == ["test.xlsx"]
+
+                    job_response = client.get(response.headers["Location"])
+                    assert job_response.json["reports"] == "Some details of a report"
+
+
+def test_create_report_with_formats(client, report_jobs):
+    with patch("lighthouse.blueprints.reports.run_report_job_in_background") as mock_run_report_job:
+        response = client.post("/reports/new?format=xlsx,csv.gz")
+
+        mock_run_report_job.assert_called_once()
+        assert mock_run_report_job.call_args[0][1] == ["xlsx", "csv.gz"]
+        assert mock_run_report_job.call_args.kwargs == {"reuse_unchanged": False}
+        assert response.status_code == HTTPStatus.ACCEPTED
+        assert response.json["job"]["status"] == REPORT_JOB_STATUS_QUEUED
+        assert response.json["job"]["report_formats"] == ["xlsx", "csv.gz"]
+
+
+def test_create_report_unknown_format(client, report_jobs):
+    with patch("lighthouse.blueprints.reports.run_report_job_in_background") as mock_run_report_job:
+        response = client.post("/reports/new?format=docx")
+
+        mock_run_report_job.assert_not_called()
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert len(response.json["errors"]) == 1
+
+
+def test_create_report_already_running(client, report_jobs):
+    with patch("lighthouse.blueprints.reports.run_report_job_in_background") as mock_run_report_job:
+        first_response = client.post("/reports/new")
+        second_response = client.post("/reports/new")
+
+        mock_run_report_job.assert_called_once()
+        assert second_response.status_code == HTTPStatus.ACCEPTED
+        assert second_response.json["job"]["id"] == first_response.json["job"]["id"]
+
+
+def test_get_report_job_not_found(client, report_jobs):
+    response = client.get("/reports/jobs/5f9a8f6a1b2c3d4e5f6a7b8c")
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert len(response.json["errors"]) == 1
+
+
+REPORT_FILENAME = "200805_0923_positives_with_locations.xlsx"
+
+
+def test_get_report_runs(client):
+    with patch(
+        "lighthouse.blueprints.reports.get_report_runs", return_value=[{"id": "abc"}]
+    ) as mock_get_runs:
+        response = client.get("/reports/runs?max_results=5")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json == {"runs": [{"id": "abc"}]}
+    mock_get_runs.assert_called_once_with(5)
+
+
+def test_get_report_runs_invalid_max_results(client):
+    response = client.get("/reports/runs?max_results=0")
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_download_report(client, app):
+    with open(f"{app.config['REPORTS_DIR']}/{REPORT_FILENAME}", "rb") as report:
+        expected = report.read()
+
+    response = client.get(f"/reports/{REPORT_FILENAME}")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.data == expected
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["Content-Disposition"] == f"attachment; filename={REPORT_FILENAME}"
+    etag, weak = response.get_etag()
+    assert etag is not None
+    assert weak is False
+
+
+def test_download_report_not_modified(client):
+    etag, _ = client.get(f"/reports/{REPORT_FILENAME}").get_etag()
+
+    response = client.get(f"/reports/{REPORT_FILENAME}", headers={"If-None-Match": f'"{etag}"'})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.data == b""
+
+
+def test_download_report_range(client, app):
+    with open(f"{app.config['REPORTS_DIR']}/{REPORT_FILENAME}", "rb") as report:
+        expected = report.read()[10:20]
+
+    response = client.get(f"/reports/{REPORT_FILENAME}", headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT
+    assert response.data == expected
+
+
+def test_download_report_x_accel_redirect(client, app):
+    app.config["REPORTS_X_ACCEL_REDIRECT_LOCATION"] = "/protected-reports"
+
+    response = client.get(f"/reports/{REPORT_FILENAME}")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["X-Accel-Redirect"] == f"/protected-reports/{REPORT_FILENAME}"
+    assert response.data == b""
+
+
+def test_download_report_not_found(client):
+    response = client.get("/reports/200805_0923_not_a_report.xlsx")
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
 
 
 def test_delete_reports_endpoint(client):
@@ -0,0 +1,36 @@
+from datetime import datetime
+from http import HTTPStatus
+from unittest.mock import patch
+
+
+def test_get_positive_counts_endpoint(client):
+    positive_counts = [
+        {
+            "source": "centre1",
+            "test_date": "2020-05-01",
+            "plates": 1,
+            "samples": 3,
+            "positives": 2,
+            "filtered_positives": 1,
+        }
+    ]
+    with patch("lighthouse.blueprints.stats.catch_up_sample_changes") as mock_catch_up:
+        with patch(
+            "lighthouse.blueprints.stats.get_positive_counts", return_value=positive_counts
+        ) as mock_get_counts:
+            response = client.get("/stats/positives?centre=centre1&date_from=2020-05-01")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json == {"positives": positive_counts}
+    # the rollups are caught up with any imports before they are read
+    mock_catch_up.assert_called_once_with()
+    mock_get_counts.assert_called_once_with(
+        source="centre1", date_from=datetime(2020, 5, 1), date_to=None
+    )
+
+
+def test_get_positive_counts_endpoint_invalid_date(client):
+    response = client.get("/stats/positives?date_to=01/05/2020")
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json == {"errors": ["date_to must be a date in the format YYYY-MM-DD"]}
@@ -28,7 +28,10 @@ from .data.fixture_data import (
     EVENT_WH_DATA,
     MLWH_SAMPLE_STOCK_RESOURCE,
     SOURCE_PLATES,
+    CHERRYPICKED_SAMPLES,
 )
+from lighthouse.helpers.mongo_db import rebuild_latest_samples_declarations
+from lighthouse.helpers.reports import REPORT_CATALOGUE_REBUILD_ID
 from lighthouse.helpers.mysql_db import create_mysql_connection_engine, get_table
 from lighthouse.helpers.dart_db import create_dart_connection, load_sql_server_script
 
@@ -71,7 +74,9 @@ def empty_data_when_finish(app):
         mydb = app.data.driver.db
         mydb.samples.delete_many({})
         mydb.samples_declarations.delete_many({})
+        mydb.samples_declarations_latest.delete_many({})
         mydb.centres.delete_many({})
+        mydb.imports.delete_many({})
 
 
 @pytest.fixture
@@ -79,12 +84,15 @@ def samples_declarations(app):
     with app.app_context():
         samples_declarations_collections = app.data.driver.db.samples_declarations
         _ = samples_declarations_collections.insert_many(SAMPLES_DECLARATIONS)
+        rebuild_latest_samples_declarations()
 
     yield copy.deepcopy(SAMPLES_DECLARATIONS)
 
     # clear up after the fixture is used
     with app.app_context():
         samples_declarations_collections.delete_many({})
+        app.data.driver.db.samples_declarations_latest.delete_many({})
+        app.data.driver.db.rebuilds.delete_many({})
 
 
 @pytest.fixture
@@ -173,7 +181,7 @@ def mocked_responses():
 
 
 @pytest.fixture
-def labwhere_samples_simple(app, mocked_responses):
+def labwhere_samples_simple(app, mocked_responses, labware_locations):
     labwhere_url = f"http://{app.config['LABWHERE_URL']}/api/labwares_by_barcode"
 
     body = json.dumps([{"barcode": "123", "location_barcode": "4567"}])
@@ -186,7 +194,7 @@ def labwhere_samples_simple(app, mocked_responses):
 
 
 @pytest.fixture
-def labwhere_samples_multiple(app, mocked_responses):
+def labwhere_samples_multiple(app, mocked_responses, labware_locations):
     labwhere_url = f"http://{app.config['LABWHERE_URL']}/api/labwares_by_barcode"
 
     body = json.dumps(
@@ -205,7 +213,7 @@ def labwhere_samples_multiple(app, mocked_responses):
 
 
 @pytest.fixture
-def labwhere_samples_error(app, mocked_responses):
+def labwhere_samples_error(app, mocked_responses, labware_locations):
     labwhere_url = f"http://{app.config['LABWHERE_URL']}/api/labwares_by_barcode"
 
     body = json.dumps([])
@@ -405,3 +413,84 @@ def samples_with_uuids(app):
     # clear up after the fixture is used
     with app.app_context():
         samples_collection.delete_many({})
+
+
+@pytest.fixture
+def published_plate_events(app):
+    yield
+
+    # clear up after the fixture is used
+    with app.app_context():
+        app.data.driver.db.published_plate_events.delete_many({})
+
+
+@pytest.fixture
+def labware_locations(app):
+    yield
+
+    # clear up after the fixture is used
+    with app.app_context():
+        app.data.driver.db.labware_locations.delete_many({})
+
+
+@pytest.fixture
+def cherrypicked_samples(app):
+    with app.app_context():
+        cherrypicked_samples_collection = app.data.driver.db.cherrypicked_samples
+        _ = cherrypicked_samples_collection.insert_many(copy.deepcopy(CHERRYPICKED_SAMPLES))
+
+    yield copy.deepcopy(CHERRYPICKED_SAMPLES)
+
+    # clear up after the fixture is used
+    with app.app_context():
+        cherrypicked_samples_collection.delete_many({})
+
+
+@pytest.fixture
+def report_jobs(app):
+    yield
+
+    # clear up after the fixture is used
+    with app.app_context():
+        app.data.driver.db.report_jobs.delete_many({})
+
+
+@pytest.fixture
+def report_runs(app):
+    yield
+
+    # clear up after the fixture is used
+    with app.app_context():
+        app.data.driver.db.report_runs.delete_many({})
+
+
+@pytest.fixture
+def report_catalogue(app):
+    # the catalogue is only reconciled with the reports folder when a test does so
+    with app.app_context():
+        app.data.driver.db.rebuilds.insert_one({"_id": REPORT_CATALOGUE_REBUILD_ID})
+
+    yield
+
+    # clear up after the fixture is used
+    with app.app_context():
+        app.data.driver.db.report_catalogue.delete_many({})
+        app.data.driver.db.rebuilds.delete_many({})
+
+
+@pytest.fixture
+def source_plate_summaries(app):
+    yield
+
+    # clear up after the fixture is used
+    with app.app_context():
+        app.data.driver.db.source_plate_summaries.delete_many({})
+
+
+@pytest.fixture
+def positive_rollups(app):
+    yield
+
+    # clear up after the fixture is used
+    with app.app_context():
+        app.data.driver.db.positive_rollups.delete_many({})
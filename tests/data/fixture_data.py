@@ -18,6 +18,7 @@ from lighthouse.constants import (
     FIELD_DART_SOURCE_BARCODE,
     FIELD_DART_SOURCE_COORDINATE,
     FIELD_DATE_TESTED,
+    FIELD_EVENT_ID,
     FIELD_LAB_ID,
     FIELD_PLATE_BARCODE,
     FIELD_RESULT,
@@ -579,3 +580,27 @@ def inject_uuids(sample):
 
 
 SAMPLES_WITH_UUIDS = [inject_uuids(sample) for sample in SAMPLES_WITH_LAB_ID]
+
+CHERRYPICKED_SAMPLES: List[Dict[str, Any]] = [
+    {
+        FIELD_ROOT_SAMPLE_ID: "MCM001",
+        FIELD_PLATE_BARCODE: "123",
+        FIELD_RESULT: "positive",
+        FIELD_COORDINATE: "A1",
+        FIELD_EVENT_ID: 1,
+    },
+    {
+        FIELD_ROOT_SAMPLE_ID: "MCM005",
+        FIELD_PLATE_BARCODE: "123",
+        FIELD_RESULT: "positive",
+        FIELD_COORDINATE: "E1",
+        FIELD_EVENT_ID: 2,
+    },
+    {  # cherrypicked from a different plate
+        FIELD_ROOT_SAMPLE_ID: "MCM007",
+        FIELD_PLATE_BARCODE: "456",
+        FIELD_RESULT: "positive",
+        FIELD_COORDINATE: "G1",
+        FIELD_EVENT_ID: 3,
+    },
+]
@@ -0,0 +1,26 @@
+from lighthouse.helpers.bloom_filter import BloomFilter
+
+
+def test_bloom_filter_contains_added_values():
+    bloom_filter = BloomFilter(1000)
+    bloom_filter.add("MCM001")
+    bloom_filter.update(f"MCM{index:06}" for index in range(999))
+
+    assert "MCM001" in bloom_filter
+    assert all(f"MCM{index:06}" in bloom_filter for index in range(999))
+    assert None not in bloom_filter
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom_filter = BloomFilter(10000, error_rate=0.01)
+    bloom_filter.update(f"MCM{index:06}" for index in range(10000))
+
+    false_positives = sum(f"ABC{index:06}" in bloom_filter for index in range(10000))
+
+    assert false_positives < 200
+
+
+def test_bloom_filter_empty():
+    bloom_filter = BloomFilter(0)
+
+    assert "MCM001" not in bloom_filter
@@ -0,0 +1,158 @@
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+from lighthouse.constants import (
+    FIELD_COORDINATE,
+    FIELD_EVENT_ID,
+    FIELD_PLATE_BARCODE,
+    FIELD_RESULT,
+    FIELD_ROOT_SAMPLE_ID,
+)
+from lighthouse.helpers.cherrypicked_samples import (
+    get_indexed_cherrypicked_samples,
+    get_last_cherrypicked_event_id,
+    get_refresh_start_event_id,
+    refresh_cherrypicked_samples,
+)
+from lighthouse.helpers.reports import add_cherrypicked_column
+
+
+def test_get_last_cherrypicked_event_id_none_indexed(app, cherrypicked_samples):
+    with app.app_context():
+        app.data.driver.db.cherrypicked_samples.delete_many({})
+
+        assert get_last_cherrypicked_event_id() == 0
+
+
+def test_get_last_cherrypicked_event_id(app, cherrypicked_samples):
+    with app.app_context():
+        assert get_last_cherrypicked_event_id() == 3
+
+
+def test_refresh_cherrypicked_samples(app, cherrypicked_samples):
+    events_batches = [pd.DataFrame({"id": [4, 5]}), pd.DataFrame({"id": [6]})]
+    samples_batches = [
+        pd.DataFrame(
+            [
+                # cherrypicked again, since it was last indexed
+                ["MCM001", "123", "positive", "A1", 5],
+                ["MCM010", "789", "positive", "B1", 4],
+            ],
+            columns=[
+                FIELD_ROOT_SAMPLE_ID,
+                FIELD_PLATE_BARCODE,
+                FIELD_RESULT,
+                FIELD_COORDINATE,
+                FIELD_EVENT_ID,
+            ],
+        ),
+        pd.DataFrame(
+            [], columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, FIELD_RESULT, FIELD_COORDINATE]
+        ),
+    ]
+
+    def read_sql(sql, engine, params):
+        if "overlap" in params:
+            return pd.DataFrame({"id": [3]})
+        if "event_ids" in params:
+            return samples_batches.pop(0)
+        return events_batches.pop(0)
+
+    with app.app_context():
+        app.config["CHERRYPICKED_SAMPLES_REFRESH_BATCH_SIZE"] = 2
+        app.config["CHERRYPICKED_SAMPLES_REFRESH_OVERLAP"] = 1
+        with patch("lighthouse.helpers.cherrypicked_samples.get_warehouses_ro_engine"):
+            with patch(
+                "lighthouse.helpers.cherrypicked_samples.pd.read_sql", side_effect=read_sql
+            ) as mock_read_sql:
+                assert refresh_cherrypicked_samples() == 2
+
+        # the events after the last one indexed, less the overlap, are read batch by batch
+        event_params = [
+            call.kwargs["params"]
+            for call in mock_read_sql.call_args_list
+            if "last_event_id" in call.kwargs["params"]
+        ]
+        assert event_params == [
+            {"last_event_id": 2, "batch_size": 2},
+            {"last_event_id": 5, "batch_size": 2},
+        ]
+
+        cherrypicked = app.data.driver.db.cherrypicked_samples
+        assert cherrypicked.count_documents({}) == 4
+        assert cherrypicked.find_one({FIELD_ROOT_SAMPLE_ID: "MCM001"})[FIELD_EVENT_ID] == 5
+        assert cherrypicked.find_one({FIELD_ROOT_SAMPLE_ID: "MCM010"})[FIELD_EVENT_ID] == 4
+
+
+@pytest.mark.parametrize(
+    "overlap_events, overlap, expected",
+    [
+        # the latest 2 cherrypick events up to the last one indexed, whatever the ids in between
+        (pd.DataFrame({"id": [50]}), 2, 49),
+        # fewer cherrypick events than the overlap
+        (pd.DataFrame({"id": [None]}), 2, 0),
+        (None, 0, 100),
+    ],
+)
+def test_get_refresh_start_event_id(app, overlap_events, overlap, expected):
+    with app.app_context():
+        app.config["CHERRYPICKED_SAMPLES_REFRESH_OVERLAP"] = overlap
+        with patch(
+            "lighthouse.helpers.cherrypicked_samples.pd.read_sql", return_value=overlap_events
+        ) as mock_read_sql:
+            assert get_refresh_start_event_id(None, 100) == expected
+
+    if overlap > 0:
+        sql = mock_read_sql.call_args.args[0]
+        assert "mlwh_events_event_types.key = 'cherrypick_layout_set'" in sql
+        assert mock_read_sql.call_args.kwargs["params"] == {
+            "last_indexed_event_id": 100,
+            "overlap": overlap,
+        }
+    else:
+        mock_read_sql.assert_not_called()
+
+
+def test_refresh_cherrypicked_samples_error(app, cherrypicked_samples):
+    with app.app_context():
+        with patch(
+            "lighthouse.helpers.cherrypicked_samples.get_warehouses_ro_engine",
+            side_effect=Exception("Boom!"),
+        ):
+            with pytest.raises(Exception):
+                refresh_cherrypicked_samples()
+
+
+def test_get_indexed_cherrypicked_samples(app, cherrypicked_samples):
+    with app.app_context():
+        cherrypicked_samples_df = get_indexed_cherrypicked_samples(
+            ["MCM001", "MCM005", "MCM007"], ["123", "123", "123"], chunk_size=2
+        )
+
+    assert cherrypicked_samples_df.columns.to_list() == [
+        FIELD_ROOT_SAMPLE_ID,
+        FIELD_PLATE_BARCODE,
+        "Result_lower",
+        FIELD_COORDINATE,
+    ]
+    # MCM007 was cherrypicked from a different plate
+    assert cherrypicked_samples_df.to_numpy().tolist() == [
+        ["MCM001", "123", "positive", "A1"],
+        ["MCM005", "123", "positive", "E1"],
+    ]
+
+
+def test_add_cherrypicked_column_uses_index(app, cherrypicked_samples):
+    existing_dataframe = pd.DataFrame(
+        [["MCM001", "123", "Positive", "A1"], ["MCM002", "123", "Positive", "B1"]],
+        columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, FIELD_RESULT, FIELD_COORDINATE],
+    )
+
+    with app.app_context():
+        app.config["CHERRYPICKED_SAMPLES_INDEX"] = True
+        with patch("lighthouse.helpers.reports.get_cherrypicked_samples") as mock_get:
+            new_dataframe = add_cherrypicked_column(existing_dataframe)
+
+    mock_get.assert_not_called()
+    assert new_dataframe["LIMS submission"].to_list() == ["Yes", "No"]
@@ -1,11 +1,30 @@
 from unittest.mock import patch
+import pytest
+import lighthouse.helpers.mongo_db as mongo_db
+from datetime import datetime, timedelta
+from pymongo.errors import BulkWriteError
 from lighthouse.helpers.mongo_db import (
+    DUPLICATE_KEY_ERROR_CODE,
+    backfill_date_tested,
+    backfill_date_tested_for_samples,
+    cache_labware_locations,
+    claim_plate_event,
+    find_existing_root_sample_ids,
+    get_known_root_sample_ids,
+    get_cached_labware_locations,
+    rebuild_latest_samples_declarations,
+    update_latest_samples_declarations,
     get_source_plate_uuid,
     get_samples,
+    release_plate_event,
 )
 from lighthouse.constants import (
     FIELD_BARCODE,
+    FIELD_DATE_TESTED,
     FIELD_LH_SOURCE_PLATE_UUID,
+    FIELD_PARSED_DATE_TESTED,
+    FIELD_PUBLISHED_AT,
+    FIELD_ROOT_SAMPLE_ID,
 )
 
 
@@ -48,3 +67,320 @@ def test_get_samples_returns_none_failure_fetching_samples(app, samples_with_uui
             samples_collection.find.side_effect = Exception("Boom!")
             result = get_samples(samples_with_uuids[0][FIELD_LH_SOURCE_PLATE_UUID])
             assert result is None
+
+
+def test_claim_plate_event_only_claims_once(app, published_plate_events):
+    with app.app_context():
+        assert claim_plate_event("test event key") is True
+        assert claim_plate_event("test event key") is False
+
+
+def test_claim_plate_event_claims_expired_event(app, published_plate_events):
+    with app.app_context():
+        window = app.config["PLATE_EVENTS_DEDUPLICATION_WINDOW"]
+        app.data.driver.db.published_plate_events.insert_one(
+            {
+                "_id": "test event key",
+                FIELD_PUBLISHED_AT: datetime.utcnow() - timedelta(seconds=window + 1),
+            }
+        )
+
+        assert claim_plate_event("test event key") is True
+
+
+def test_claim_plate_event_claims_on_failure(app, published_plate_events):
+    with app.app_context():
+        with patch(
+            "flask.current_app.data.driver.db.published_plate_events"
+        ) as published_plate_events_collection:
+            published_plate_events_collection.insert_one.side_effect = Exception("Boom!")
+            assert claim_plate_event("test event key") is True
+
+
+def test_release_plate_event_allows_event_to_be_claimed_again(app, published_plate_events):
+    with app.app_context():
+        claim_plate_event("test event key")
+        release_plate_event("test event key")
+
+        assert claim_plate_event("test event key") is True
+
+
+def test_backfill_date_tested_sets_parsed_date(app, samples):
+    with app.app_context():
+        samples_collection = app.data.driver.db.samples
+        number_of_samples = backfill_date_tested(samples_collection)
+
+        assert number_of_samples == len(samples)
+        for sample in samples_collection.find():
+            assert isinstance(sample[FIELD_PARSED_DATE_TESTED], datetime)
+
+
+def test_backfill_date_tested_only_updates_samples_without_parsed_date(app, samples):
+    with app.app_context():
+        samples_collection = app.data.driver.db.samples
+        backfill_date_tested(samples_collection, {FIELD_ROOT_SAMPLE_ID: "MCM001"})
+
+        parsed_query = {FIELD_PARSED_DATE_TESTED: {"$exists": True}}
+        assert samples_collection.count_documents(parsed_query) == 1
+        assert backfill_date_tested(samples_collection) == len(samples) - 1
+        assert backfill_date_tested(samples_collection) == 0
+
+
+def test_backfill_date_tested_for_samples_parses_changed_date_tested_again(app, samples):
+    with app.app_context():
+        samples_collection = app.data.driver.db.samples
+        backfill_date_tested(samples_collection)
+
+        samples_collection.update_one(
+            {FIELD_ROOT_SAMPLE_ID: "MCM001"},
+            {"$set": {FIELD_DATE_TESTED: "2020-01-02 03:04:05 UTC"}},
+        )
+        changed_sample = samples_collection.find_one({FIELD_ROOT_SAMPLE_ID: "MCM001"})
+        backfill_date_tested_for_samples([changed_sample])
+
+        changed_sample = samples_collection.find_one({FIELD_ROOT_SAMPLE_ID: "MCM001"})
+        assert changed_sample[FIELD_PARSED_DATE_TESTED].replace(tzinfo=None) == datetime(
+            2020, 1, 2, 3, 4, 5
+        )
+
+
+def test_cache_labware_locations_caches_locations(app, labware_locations):
+    with app.app_context():
+        cache_labware_locations({"123": "4567", "456": ""})
+        cache_labware_locations({"123": "7890"})
+
+        assert get_cached_labware_locations(["123", "456", "789"]) == {"123": "7890", "456": ""}
+
+
+def test_get_cached_labware_locations_reads_in_chunks(app, labware_locations):
+    with app.app_context():
+        app.config["LABWHERE_CHUNK_SIZE"] = 2
+
+        with patch(
+            "flask.current_app.data.driver.db.labware_locations"
+        ) as labware_locations_collection:
+            labware_locations_collection.find.side_effect = [
+                [{"_id": "123", "location_barcode": "4567"}],
+                [{"_id": "789", "location_barcode": ""}],
+            ]
+
+            assert get_cached_labware_locations(["123", "456", "789"]) == {
+                "123": "4567",
+                "789": "",
+            }
+            assert [
+                call.args[0]["_id"]["$in"]
+                for call in labware_locations_collection.find.call_args_list
+            ] == [["123", "456"], ["789"]]
+
+
+def test_get_cached_labware_locations_returns_empty_dict_on_failure(app, labware_locations):
+    with app.app_context():
+        with patch(
+            "flask.current_app.data.driver.db.labware_locations"
+        ) as labware_locations_collection:
+            labware_locations_collection.find.side_effect = Exception("Boom!")
+
+            assert get_cached_labware_locations(["123"]) == {}
+
+
+def test_rebuild_latest_samples_declarations(app, samples_declarations):
+    with app.app_context():
+        assert rebuild_latest_samples_declarations() == 2
+
+        latest = app.data.driver.db.samples_declarations_latest.find_one(
+            {"root_sample_id": "MCM003"}
+        )
+        assert latest["value_in_sequencing"] == "Yes"
+        assert latest["declared_at"].replace(tzinfo=None) == samples_declarations[3]["declared_at"]
+
+
+def test_update_latest_samples_declarations_keeps_latest(app, samples_declarations):
+    now = datetime.utcnow().replace(microsecond=0)
+
+    with app.app_context():
+        update_latest_samples_declarations(
+            [
+                {"root_sample_id": "MCM001", "value_in_sequencing": "No", "declared_at": now},
+                {
+                    "root_sample_id": "MCM003",
+                    "value_in_sequencing": "No",
+                    "declared_at": samples_declarations[1]["declared_at"],
+                },
+                {"root_sample_id": "MCM004", "value_in_sequencing": "Yes", "declared_at": now},
+            ]
+        )
+
+        latest = {
+            declaration["root_sample_id"]: declaration["value_in_sequencing"]
+            for declaration in app.data.driver.db.samples_declarations_latest.find()
+        }
+        assert latest == {"MCM001": "No", "MCM003": "Yes", "MCM004": "Yes"}
+
+
+def test_update_latest_samples_declarations_in_a_single_bulk_write(app, samples_declarations):
+    now = datetime.utcnow().replace(microsecond=0)
+
+    with app.app_context():
+        with patch.object(
+            type(app.data.driver.db.samples_declarations_latest), "bulk_write", autospec=True
+        ) as mock_bulk_write:
+            update_latest_samples_declarations(
+                [
+                    {"root_sample_id": "MCM001", "value_in_sequencing": "No", "declared_at": now},
+                    {"root_sample_id": "MCM004", "value_in_sequencing": "Yes", "declared_at": now},
+                ]
+            )
+
+    mock_bulk_write.assert_called_once()
+    assert len(mock_bulk_write.call_args.args[1]) == 2
+    assert mock_bulk_write.call_args.kwargs == {"ordered": False}
+
+
+def test_update_latest_samples_declarations_retries_concurrent_upserts(app, samples_declarations):
+    now = datetime.utcnow().replace(microsecond=0)
+    declarations = [
+        {"root_sample_id": "MCM001", "value_in_sequencing": "No", "declared_at": now},
+        {"root_sample_id": "MCM004", "value_in_sequencing": "Yes", "declared_at": now},
+    ]
+
+    with app.app_context():
+        collection_class = type(app.data.driver.db.samples_declarations_latest)
+        bulk_write = collection_class.bulk_write
+
+        def concurrent_bulk_write(collection, requests, ordered):
+            if mock_bulk_write.call_count == 1:
+                # another upsert inserted an earlier first declaration of MCM004 at the same time
+                collection.insert_one(
+                    {
+                        "root_sample_id": "MCM004",
+                        "value_in_sequencing": "No",
+                        "declared_at": now - timedelta(minutes=1),
+                    }
+                )
+                raise BulkWriteError(
+                    {
+                        "writeErrors": [
+                            {"index": 1, "code": DUPLICATE_KEY_ERROR_CODE, "errmsg": "E11000"}
+                        ]
+                    }
+                )
+            return bulk_write(collection, requests, ordered=ordered)
+
+        with patch.object(
+            collection_class, "bulk_write", autospec=True, side_effect=concurrent_bulk_write
+        ) as mock_bulk_write:
+            update_latest_samples_declarations(declarations)
+
+        # only the upsert which failed is retried
+        assert mock_bulk_write.call_count == 2
+        assert len(mock_bulk_write.call_args.args[1]) == 1
+
+        latest = app.data.driver.db.samples_declarations_latest.find_one(
+            {"root_sample_id": "MCM004"}
+        )
+        assert latest["value_in_sequencing"] == "Yes"
+
+
+def test_update_latest_samples_declarations_raises_other_write_errors(app, samples_declarations):
+    now = datetime.utcnow().replace(microsecond=0)
+
+    with app.app_context():
+        with patch.object(
+            type(app.data.driver.db.samples_declarations_latest),
+            "bulk_write",
+            autospec=True,
+            side_effect=BulkWriteError(
+                {"writeErrors": [{"index": 0, "code": 2, "errmsg": "Bad value"}]}
+            ),
+        ):
+            with pytest.raises(BulkWriteError):
+                update_latest_samples_declarations(
+                    [{"root_sample_id": "MCM001", "value_in_sequencing": "No", "declared_at": now}]
+                )
+
+
+@pytest.fixture
+def reset_known_root_sample_ids():
+    mongo_db.known_root_sample_ids = None
+    mongo_db.known_root_sample_ids_import_id = None
+    mongo_db.known_root_sample_ids_rebuild = None
+
+    yield
+
+    if mongo_db.known_root_sample_ids_rebuild is not None:
+        mongo_db.known_root_sample_ids_rebuild.join()
+    mongo_db.known_root_sample_ids = None
+    mongo_db.known_root_sample_ids_import_id = None
+    mongo_db.known_root_sample_ids_rebuild = None
+
+
+def test_find_existing_root_sample_ids_in_chunks(app, samples):
+    with app.app_context():
+        app.config["SAMPLES_EXISTENCE_CHUNK_SIZE"] = 1
+        try:
+            assert find_existing_root_sample_ids(["MCM001", "MCM100", "MCM003", "MCM001"]) == {
+                "MCM001",
+                "MCM003",
+            }
+            assert find_existing_root_sample_ids([]) == set()
+        finally:
+            app.config["SAMPLES_EXISTENCE_CHUNK_SIZE"] = 5000
+
+
+def test_get_known_root_sample_ids_returns_none_when_not_used(app, samples):
+    with app.app_context():
+        assert get_known_root_sample_ids() is None
+
+
+def get_rebuilt_known_root_sample_ids():
+    # the filter is rebuilt in the background, until which there is no filter
+    assert get_known_root_sample_ids() is None
+    mongo_db.known_root_sample_ids_rebuild.join()
+
+    return get_known_root_sample_ids()
+
+
+def test_get_known_root_sample_ids_is_rebuilt_after_an_import(
+    app, samples, reset_known_root_sample_ids
+):
+    with app.app_context():
+        app.config["ROOT_SAMPLE_IDS_BLOOM_FILTER"] = True
+        try:
+            known_root_sample_ids = get_rebuilt_known_root_sample_ids()
+            assert known_root_sample_ids is not None
+            assert "MCM001" in known_root_sample_ids
+            assert "MCM100" not in known_root_sample_ids
+
+            # the filter is kept until an import is recorded
+            app.data.driver.db.samples.insert_one({FIELD_ROOT_SAMPLE_ID: "MCM100"})
+            assert get_known_root_sample_ids() is known_root_sample_ids
+
+            app.data.driver.db.imports.insert_one({"date": datetime.now()})
+            assert "MCM100" in get_rebuilt_known_root_sample_ids()
+        finally:
+            app.config["ROOT_SAMPLE_IDS_BLOOM_FILTER"] = False
+            app.data.driver.db.imports.delete_many({})
+
+
+def test_get_known_root_sample_ids_is_not_built_in_the_request(
+    app, samples, reset_known_root_sample_ids
+):
+    with app.app_context():
+        app.config["ROOT_SAMPLE_IDS_BLOOM_FILTER"] = True
+        try:
+            with patch("lighthouse.helpers.mongo_db.threading.Thread") as mock_thread:
+                assert get_known_root_sample_ids() is None
+                mock_thread.return_value.is_alive.return_value = True
+                assert get_known_root_sample_ids() is None
+
+            # only one rebuild is started while it is running
+            mock_thread.return_value.start.assert_called_once()
+            mock_thread.assert_called_once_with(
+                target=mongo_db.rebuild_known_root_sample_ids,
+                args=(app.data.driver.db.samples, None, 0.01),
+                daemon=True,
+            )
+        finally:
+            app.config["ROOT_SAMPLE_IDS_BLOOM_FILTER"] = False
+            mongo_db.known_root_sample_ids_rebuild = None
@@ -0,0 +1,249 @@
+import gzip
+import re
+import zipfile
+from datetime import datetime, timedelta
+
+import bson
+import pandas as pd
+import pytest
+from bson import json_util
+from bson.decimal128 import Decimal128
+from lighthouse.constants import (
+    FIELD_CH1_CQ,
+    FIELD_COORDINATE,
+    FIELD_DATE_TESTED,
+    FIELD_LOCATION_BARCODE,
+    FIELD_PARSED_DATE_TESTED,
+    FIELD_PLATE_BARCODE,
+    FIELD_RESULT,
+    FIELD_ROOT_SAMPLE_ID,
+    FIELD_SOURCE,
+)
+from lighthouse.exceptions import ReportCreationError
+from lighthouse.helpers.offline_reports import (
+    create_offline_report,
+    is_positive_sample,
+    iter_snapshot,
+    parse_date_tested,
+)
+from lighthouse.offline_report import main
+
+
+def write_json_snapshot(path, documents):
+    with open(path, "w") as snapshot:
+        for document in documents:
+            snapshot.write(json_util.dumps(document) + "\n")
+
+    return path
+
+
+def write_bson_snapshot(path, documents):
+    with gzip.open(path, "wb") as snapshot:
+        for document in documents:
+            snapshot.write(bson.encode(document))
+
+    return path
+
+
+def count_xlsx_rows(report_path, sheet_number):
+    with zipfile.ZipFile(report_path) as workbook:
+        sheet = workbook.read(f"xl/worksheets/sheet{sheet_number}.xml").decode()
+
+    # excluding the header row
+    return len(re.findall("<row ", sheet)) - 1
+
+
+def build_sample(root_sample_id, coordinate, result="Positive", days_ago=0, **fields):
+    date_tested = datetime.now() - timedelta(days=days_ago)
+    return {
+        FIELD_SOURCE: "centre1",
+        FIELD_PLATE_BARCODE: "123",
+        FIELD_ROOT_SAMPLE_ID: root_sample_id,
+        FIELD_RESULT: result,
+        FIELD_DATE_TESTED: date_tested.strftime("%Y-%m-%d %H:%M:%S UTC"),
+        FIELD_COORDINATE: coordinate,
+        **fields,
+    }
+
+
+def test_iter_snapshot(tmp_path):
+    documents = [{"_id": 1, "name": "one"}, {"_id": 2, "name": "two"}]
+
+    json_path = write_json_snapshot(tmp_path.joinpath("documents.json"), documents)
+    bson_path = write_bson_snapshot(tmp_path.joinpath("documents.bson.gz"), documents)
+
+    assert list(iter_snapshot(json_path)) == documents
+    assert list(iter_snapshot(bson_path)) == documents
+
+
+def test_parse_date_tested():
+    assert parse_date_tested({FIELD_DATE_TESTED: "2020-05-10 07:30:00 UTC"}) == datetime(
+        2020, 5, 10, 7, 30
+    )
+    assert parse_date_tested({FIELD_DATE_TESTED: "10/05/2020 07:30"}) == datetime(
+        2020, 5, 10, 7, 30
+    )
+    assert parse_date_tested({FIELD_DATE_TESTED: "not a date"}) is None
+    assert parse_date_tested(
+        {FIELD_DATE_TESTED: "not a date", FIELD_PARSED_DATE_TESTED: datetime(2020, 5, 10)}
+    ) == datetime(2020, 5, 10)
+
+
+@pytest.mark.parametrize(
+    "sample, expected",
+    [
+        [{FIELD_RESULT: "Positive"}, True],
+        [{FIELD_RESULT: "positive"}, True],
+        [{FIELD_RESULT: "Negative"}, False],
+        [{FIELD_RESULT: "Positive", FIELD_ROOT_SAMPLE_ID: "CBIQA_MCM001"}, False],
+        [{FIELD_RESULT: "Positive", FIELD_CH1_CQ: 30}, True],
+        [{FIELD_RESULT: "Positive", FIELD_CH1_CQ: 31}, False],
+        [{FIELD_RESULT: "Positive", FIELD_CH1_CQ: None}, False],
+        [{FIELD_RESULT: "Positive", FIELD_CH1_CQ: 31, "CH2-Cq": 20.5}, True],
+        [{FIELD_RESULT: "Positive", FIELD_CH1_CQ: Decimal128("29.5")}, True],
+        [{FIELD_RESULT: "Positive", FIELD_CH1_CQ: Decimal128("30.5")}, False],
+        [{FIELD_RESULT: "Positive", FIELD_CH1_CQ: "20"}, False],
+        [{FIELD_RESULT: "Positive", FIELD_DATE_TESTED: ""}, False],
+    ],
+)
+def test_is_positive_sample(sample, expected):
+    assert is_positive_sample({FIELD_DATE_TESTED: "2020-05-10 07:30:00 UTC", **sample}) == expected
+
+
+def test_create_offline_report(app, tmp_path):
+    samples_path = write_bson_snapshot(
+        tmp_path.joinpath("samples.bson.gz"),
+        [
+            build_sample("MCM001", "A01"),
+            build_sample("MCM002", "B01"),
+            build_sample("MCM003", "C01", result="Negative"),
+            # outside of the report window
+            build_sample("MCM004", "D01", days_ago=30),
+        ],
+    )
+    declarations_path = write_json_snapshot(
+        tmp_path.joinpath("samples_declarations.json"),
+        [
+            {
+                "root_sample_id": "MCM001",
+                "value_in_sequencing": "No",
+                "declared_at": datetime(2020, 5, 10, 9),
+            },
+            {
+                "root_sample_id": "MCM001",
+                "value_in_sequencing": "Yes",
+                "declared_at": datetime(2020, 5, 10, 10),
+            },
+            {
+                "root_sample_id": "MCM003",
+                "value_in_sequencing": "Yes",
+                "declared_at": datetime(2020, 5, 10, 10),
+            },
+        ],
+    )
+    locations_path = write_json_snapshot(
+        tmp_path.joinpath("labware_locations.json"),
+        [{"_id": "123", FIELD_LOCATION_BARCODE: "4567"}, {"_id": "456", "location_barcode": ""}],
+    )
+    cherrypicked_path = write_json_snapshot(
+        tmp_path.joinpath("cherrypicked_samples.json"),
+        [
+            {
+                FIELD_ROOT_SAMPLE_ID: "MCM002",
+                FIELD_PLATE_BARCODE: "123",
+                FIELD_RESULT: "positive",
+                FIELD_COORDINATE: "B1",
+            }
+        ],
+    )
+
+    with app.app_context():
+        (report_path,) = create_offline_report(
+            samples_path,
+            ["csv.gz"],
+            declarations_path=declarations_path,
+            locations_path=locations_path,
+            cherrypicked_path=cherrypicked_path,
+            output_dir=tmp_path,
+        )
+
+    assert report_path.parent == tmp_path
+    report_df = pd.read_csv(report_path, dtype=str, keep_default_na=False)
+    assert report_df[FIELD_ROOT_SAMPLE_ID].to_list() == ["MCM001", "MCM002"]
+    assert report_df[FIELD_COORDINATE].to_list() == ["A1", "B1"]
+    assert report_df["plate and well"].to_list() == ["123:A1", "123:B1"]
+    assert report_df[FIELD_LOCATION_BARCODE].to_list() == ["4567", "4567"]
+    assert report_df["Value In Sequencing"].to_list() == ["Yes", "Unknown"]
+    assert report_df["Declared At"].to_list() == ["2020-05-10T10:00:00", ""]
+    assert report_df["LIMS submission"].to_list() == ["No", "Yes"]
+
+
+def test_create_offline_report_without_optional_snapshots(app, tmp_path):
+    samples_path = write_json_snapshot(
+        tmp_path.joinpath("samples.json"), [build_sample("MCM001", "A01")]
+    )
+
+    with app.app_context():
+        (report_path,) = create_offline_report(samples_path, ["csv.gz"], output_dir=tmp_path)
+
+    report_df = pd.read_csv(report_path, dtype=str, keep_default_na=False)
+    assert report_df[FIELD_LOCATION_BARCODE].to_list() == [""]
+    assert report_df["LIMS submission"].to_list() == ["No"]
+
+
+def test_create_offline_report_xlsx_only_lists_located_plates_with_location(app, tmp_path):
+    samples_path = write_json_snapshot(
+        tmp_path.joinpath("samples.json"),
+        [
+            build_sample("MCM001", "A01"),
+            build_sample("MCM002", "A01", **{FIELD_PLATE_BARCODE: "456"}),
+            # not in the locations snapshot
+            build_sample("MCM003", "A01", **{FIELD_PLATE_BARCODE: "789"}),
+        ],
+    )
+    locations_path = write_json_snapshot(
+        tmp_path.joinpath("labware_locations.json"),
+        [{"_id": "123", FIELD_LOCATION_BARCODE: "4567"}, {"_id": "456", "location_barcode": None}],
+    )
+
+    with app.app_context():
+        (report_path,) = create_offline_report(
+            samples_path, ["xlsx"], locations_path=locations_path, output_dir=tmp_path
+        )
+
+    # as with LabWhere, plates found without a location are listed with an empty location, and
+    # plates which are not found are not listed
+    assert count_xlsx_rows(report_path, 1) == 2
+    assert count_xlsx_rows(report_path, 2) == 3
+
+
+def test_create_offline_report_without_positive_samples(app, tmp_path):
+    samples_path = write_json_snapshot(
+        tmp_path.joinpath("samples.json"), [build_sample("MCM001", "A01", result="Negative")]
+    )
+
+    with app.app_context():
+        with pytest.raises(ReportCreationError):
+            create_offline_report(samples_path, ["csv.gz"], output_dir=tmp_path)
+
+
+def test_offline_report_main(tmp_path, capsys, monkeypatch):
+    monkeypatch.setenv("EVE_SETTINGS", "test.py")
+    samples_path = write_json_snapshot(
+        tmp_path.joinpath("samples.json"), [build_sample("MCM001", "A01")]
+    )
+
+    # no app is created, so Mongo is not connected to
+    main([str(samples_path), "--format", "csv.gz", "--output-dir", str(tmp_path)])
+
+    (report_path,) = tmp_path.glob("*_positives_with_locations.csv.gz")
+    assert capsys.readouterr().out == f"Created {report_path}\n"
+
+
+def test_offline_report_main_unknown_format(tmp_path):
+    samples_path = write_json_snapshot(
+        tmp_path.joinpath("samples.json"), [build_sample("MCM001", "A01")]
+    )
+
+    with pytest.raises(SystemExit):
+        main([str(samples_path), "--format", "pdf"])
@@ -7,6 +7,7 @@ from lighthouse.helpers.plate_events import (
     construct_source_plate_no_map_data_message,
     construct_source_plate_all_negatives_message,
     construct_source_plate_completed_message,
+    get_event_key,
 )
 from lighthouse.constants import (
     PLATE_EVENT_SOURCE_COMPLETED,
@@ -107,6 +108,35 @@ def test_get_routing_key(app):
         assert result == f"test.event.{test_event_type}"
 
 
+# ---------- get_event_key tests ----------
+
+
+def test_get_event_key_uses_event_id():
+    test_params = {"event_id": "test event id", "barcode": "ABC123"}
+
+    assert get_event_key(PLATE_EVENT_SOURCE_COMPLETED, test_params) == "event_id:test event id"
+
+
+def test_get_event_key_fingerprint_is_deterministic(freezer):
+    test_params = {"barcode": "ABC123", "user_id": "test_user", "robot": "BKRB0001"}
+
+    assert get_event_key(PLATE_EVENT_SOURCE_COMPLETED, test_params) == get_event_key(
+        PLATE_EVENT_SOURCE_COMPLETED, dict(test_params)
+    )
+
+
+def test_get_event_key_fingerprint_differs_by_params(freezer):
+    test_params = {"barcode": "ABC123", "user_id": "test_user", "robot": "BKRB0001"}
+    other_params = {**test_params, "barcode": "ABC124"}
+
+    assert get_event_key(PLATE_EVENT_SOURCE_COMPLETED, test_params) != get_event_key(
+        PLATE_EVENT_SOURCE_COMPLETED, other_params
+    )
+    assert get_event_key(PLATE_EVENT_SOURCE_COMPLETED, test_params) != get_event_key(
+        PLATE_EVENT_SOURCE_ALL_NEGATIVES, test_params
+    )
+
+
 # ---------- construct_source_plate_not_recognised_message tests ----------
 
 
@@ -578,7 +608,8 @@ def test_construct_source_plate_completed_message_errors_with_failure_getting_sa
             return_value=test_source_plate_uuid,
         ):
             with patch(
-                "lighthouse.helpers.plate_events.get_samples", side_effect=Exception("Boom!")
+                "lighthouse.helpers.plate_events.get_source_plate_sample_subjects",
+                side_effect=Exception("Boom!"),
             ):
                 test_params = {
                     "barcode": "ABC123",
@@ -599,7 +630,10 @@ def test_construct_source_plate_completed_message_errors_without_samples(app):
             "lighthouse.helpers.plate_events.get_source_plate_uuid",
             return_value=test_source_plate_uuid,
         ):
-            with patch("lighthouse.helpers.plate_events.get_samples", return_value=None):
+            with patch(
+                "lighthouse.helpers.plate_events.get_source_plate_sample_subjects",
+                return_value=None,
+            ):
                 test_params = {
                     "barcode": "ABC123",
                     "user_id": "test_user",
@@ -637,7 +671,19 @@ def test_construct_source_plate_completed_message_creates_expected_message(app):
                     "friendly_name": "MCM002__rna_2__Lab 1__Negative",
                 },
             ]
-            with patch("lighthouse.helpers.plate_events.get_samples", return_value=test_samples):
+            test_sample_subjects = [
+                {
+                    "role_type": "sample",
+                    "subject_type": "sample",
+                    "friendly_name": sample["friendly_name"],
+                    "uuid": sample[FIELD_LH_SAMPLE_UUID],
+                }
+                for sample in test_samples
+            ]
+            with patch(
+                "lighthouse.helpers.plate_events.get_source_plate_sample_subjects",
+                return_value=test_sample_subjects,
+            ):
                 with patch("lighthouse.helpers.plate_events.Message") as mock_message:
                     test_barcode = "ABC123"
                     test_user_id = "test_user"
@@ -0,0 +1,149 @@
+from datetime import datetime
+
+from lighthouse.constants import (
+    FIELD_CH1_CQ,
+    FIELD_DATE_TESTED,
+    FIELD_PARSED_DATE_TESTED,
+    FIELD_PLATE_BARCODE,
+    FIELD_RESULT,
+    FIELD_ROOT_SAMPLE_ID,
+    FIELD_SOURCE,
+)
+from lighthouse.helpers.positive_rollups import (
+    get_positive_counts,
+    rebuild_positive_rollups,
+    refresh_positive_rollups_for_plate,
+    refresh_positive_rollups_for_samples,
+)
+
+
+def build_sample(root_sample_id, plate_barcode, result, date_tested, source="centre1", **fields):
+    return {
+        FIELD_SOURCE: source,
+        FIELD_PLATE_BARCODE: plate_barcode,
+        FIELD_ROOT_SAMPLE_ID: root_sample_id,
+        FIELD_RESULT: result,
+        FIELD_DATE_TESTED: date_tested.strftime("%Y-%m-%d %H:%M:%S UTC"),
+        FIELD_PARSED_DATE_TESTED: date_tested,
+        **fields,
+    }
+
+
+ROLLUP_SAMPLES = [
+    build_sample("MCM001", "123", "Positive", datetime(2020, 5, 1, 10)),
+    # filtered out by its CT value
+    build_sample("MCM002", "123", "Positive", datetime(2020, 5, 1, 11), **{FIELD_CH1_CQ: 40}),
+    build_sample("MCM003", "123", "Negative", datetime(2020, 5, 1, 12)),
+    build_sample("MCM004", "123", "positive", datetime(2020, 5, 2, 9)),
+    build_sample("MCM005", "456", "Positive", datetime(2020, 5, 1, 10), source="centre2"),
+    # controls are not filtered positives
+    build_sample("CBIQA_MCM006", "456", "Positive", datetime(2020, 5, 2, 10), source="centre2"),
+]
+
+
+def test_refresh_positive_rollups_for_plate(app, empty_data_when_finish, positive_rollups):
+    with app.app_context():
+        app.data.driver.db.samples.insert_many([dict(sample) for sample in ROLLUP_SAMPLES])
+        refresh_positive_rollups_for_plate("123")
+
+        rollups = app.data.driver.db.positive_rollups.find(
+            {}, {"_id": False, "updated_at": False}, sort=[("test_date", 1)]
+        )
+
+        assert list(rollups) == [
+            {
+                "source": "centre1",
+                "test_date": "2020-05-01",
+                "plate_barcode": "123",
+                "samples": 3,
+                "positives": 2,
+                "filtered_positives": 1,
+            },
+            {
+                "source": "centre1",
+                "test_date": "2020-05-02",
+                "plate_barcode": "123",
+                "samples": 1,
+                "positives": 1,
+                "filtered_positives": 1,
+            },
+        ]
+
+
+def test_refresh_positive_rollups_for_plate_removes_stale_rollups(
+    app, empty_data_when_finish, positive_rollups
+):
+    with app.app_context():
+        samples = app.data.driver.db.samples
+        samples.insert_many([dict(sample) for sample in ROLLUP_SAMPLES])
+        refresh_positive_rollups_for_plate("123")
+
+        # the sample tested on the second day is re-imported as tested on the first day
+        samples.update_one(
+            {FIELD_ROOT_SAMPLE_ID: "MCM004"},
+            {"$set": {FIELD_PARSED_DATE_TESTED: datetime(2020, 5, 1, 9)}},
+        )
+        refresh_positive_rollups_for_plate("123")
+
+        rollups = list(app.data.driver.db.positive_rollups.find({}))
+        assert len(rollups) == 1
+        assert rollups[0]["test_date"] == "2020-05-01"
+        assert rollups[0]["filtered_positives"] == 2
+
+
+def test_refresh_positive_rollups_for_samples(app, empty_data_when_finish, positive_rollups):
+    with app.app_context():
+        app.data.driver.db.samples.insert_many([dict(sample) for sample in ROLLUP_SAMPLES])
+        refresh_positive_rollups_for_samples([{FIELD_PLATE_BARCODE: "456"}, {}])
+
+        rollups = app.data.driver.db.positive_rollups
+        assert rollups.count_documents({FIELD_PLATE_BARCODE: "456"}) == 2
+        assert rollups.count_documents({FIELD_PLATE_BARCODE: "123"}) == 0
+
+
+def test_get_positive_counts(app, empty_data_when_finish, positive_rollups):
+    with app.app_context():
+        app.data.driver.db.samples.insert_many([dict(sample) for sample in ROLLUP_SAMPLES])
+        assert rebuild_positive_rollups() == 2
+
+        assert get_positive_counts() == [
+            {
+                "source": "centre1",
+                "test_date": "2020-05-01",
+                "plates": 1,
+                "samples": 3,
+                "positives": 2,
+                "filtered_positives": 1,
+            },
+            {
+                "source": "centre2",
+                "test_date": "2020-05-01",
+                "plates": 1,
+                "samples": 1,
+                "positives": 1,
+                "filtered_positives": 1,
+            },
+            {
+                "source": "centre1",
+                "test_date": "2020-05-02",
+                "plates": 1,
+                "samples": 1,
+                "positives": 1,
+                "filtered_positives": 1,
+            },
+            {
+                "source": "centre2",
+                "test_date": "2020-05-02",
+                "plates": 1,
+                "samples": 1,
+                "positives": 1,
+                "filtered_positives": 0,
+            },
+        ]
+
+        counts = get_positive_counts(
+            source="centre2", date_from=datetime(2020, 5, 2), date_to=datetime(2020, 5, 3)
+        )
+        assert [(count["source"], count["test_date"]) for count in counts] == [
+            ("centre2", "2020-05-02")
+        ]
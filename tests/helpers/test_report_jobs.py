@@ -0,0 +1,130 @@
+import time
+from datetime import datetime, timedelta
+
+from lighthouse.constants import (
+    REPORT_JOB_STATUS_COMPLETED,
+    REPORT_JOB_STATUS_FAILED,
+    REPORT_JOB_STATUS_QUEUED,
+    REPORT_JOB_STATUS_RUNNING,
+)
+from lighthouse.helpers.report_jobs import (
+    complete_report_job,
+    enqueue_report_job,
+    fail_report_job,
+    get_report_job,
+    mark_report_job_running,
+    report_job_heartbeat,
+    set_report_job_stage,
+)
+
+
+def test_enqueue_report_job_creates_job(app, report_jobs):
+    with app.app_context():
+        job_id, created = enqueue_report_job(["xlsx"])
+
+        assert created is True
+        job = get_report_job(str(job_id))
+        assert job["status"] == REPORT_JOB_STATUS_QUEUED
+        assert job["report_formats"] == ["xlsx"]
+
+
+def test_enqueue_report_job_returns_active_job(app, report_jobs):
+    with app.app_context():
+        job_id, _ = enqueue_report_job(["xlsx"])
+        mark_report_job_running(job_id)
+
+        assert enqueue_report_job(["csv.gz"]) == (job_id, False)
+
+
+def test_enqueue_report_job_after_job_finished(app, report_jobs):
+    with app.app_context():
+        completed_job_id, _ = enqueue_report_job(["xlsx"])
+        complete_report_job(completed_job_id, ["test.xlsx"])
+        failed_job_id, created = enqueue_report_job(["xlsx"])
+        fail_report_job(failed_job_id, ["Boom!"])
+        job_id, created = enqueue_report_job(["xlsx"])
+
+        assert created is True
+        assert len({completed_job_id, failed_job_id, job_id}) == 3
+        assert get_report_job(str(completed_job_id))["report_names"] == ["test.xlsx"]
+        assert get_report_job(str(failed_job_id))["status"] == REPORT_JOB_STATUS_FAILED
+
+
+def test_enqueue_report_job_fails_stale_job(app, report_jobs):
+    with app.app_context():
+        stale_job_id, _ = enqueue_report_job(["xlsx"])
+        app.data.driver.db.report_jobs.update_one(
+            {"_id": stale_job_id},
+            {
+                "$set": {
+                    "heartbeat_at": datetime.utcnow()
+                    - timedelta(seconds=app.config["REPORT_JOB_STALE_AFTER"] + 1)
+                }
+            },
+        )
+
+        job_id, created = enqueue_report_job(["xlsx"])
+
+        assert created is True
+        assert job_id != stale_job_id
+        assert get_report_job(str(stale_job_id))["status"] == REPORT_JOB_STATUS_FAILED
+
+
+def test_enqueue_report_job_keeps_job_with_recent_heartbeat(app, report_jobs):
+    with app.app_context():
+        running_job_id, _ = enqueue_report_job(["xlsx"])
+        # a stage which has been running for longer than the stale period
+        app.data.driver.db.report_jobs.update_one(
+            {"_id": running_job_id},
+            {
+                "$set": {
+                    "updated_at": datetime.utcnow()
+                    - timedelta(seconds=app.config["REPORT_JOB_STALE_AFTER"] + 1)
+                }
+            },
+        )
+
+        job_id, created = enqueue_report_job(["xlsx"])
+
+        assert created is False
+        assert job_id == running_job_id
+
+
+def test_report_job_heartbeat(app, report_jobs):
+    with app.app_context():
+        job_id, _ = enqueue_report_job(["xlsx"])
+        last_heartbeat_at = datetime.utcnow() - timedelta(days=1)
+        app.data.driver.db.report_jobs.update_one(
+            {"_id": job_id}, {"$set": {"heartbeat_at": last_heartbeat_at}}
+        )
+
+        app.config["REPORT_JOB_HEARTBEAT_INTERVAL"] = 0.01
+        try:
+            with report_job_heartbeat(job_id):
+                time.sleep(0.1)
+        finally:
+            app.config["REPORT_JOB_HEARTBEAT_INTERVAL"] = 60
+
+        job = app.data.driver.db.report_jobs.find_one({"_id": job_id})
+        assert job["heartbeat_at"].replace(tzinfo=None) > last_heartbeat_at
+
+
+def test_set_report_job_stage(app, report_jobs):
+    with app.app_context():
+        job_id, _ = enqueue_report_job(["xlsx"])
+        mark_report_job_running(job_id)
+        set_report_job_stage(job_id, "locations")
+
+        job = get_report_job(str(job_id))
+        assert job["status"] == REPORT_JOB_STATUS_RUNNING
+        assert job["stage"] == "locations"
+
+        complete_report_job(job_id, ["test.xlsx"])
+        job = get_report_job(str(job_id))
+        assert job["status"] == REPORT_JOB_STATUS_COMPLETED
+        assert job["stage"] is None
+
+
+def test_get_report_job_returns_none_invalid_id(app, report_jobs):
+    with app.app_context():
+        assert get_report_job("not an id") is None
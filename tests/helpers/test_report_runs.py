@@ -0,0 +1,73 @@
+from lighthouse.constants import REPORT_JOB_STATUS_COMPLETED, REPORT_JOB_STATUS_RUNNING
+from lighthouse.helpers.report_runs import (
+    finish_report_run,
+    get_report_runs,
+    profile_report_stage,
+    start_report_run,
+)
+
+
+def test_start_report_run(app, report_runs):
+    with app.app_context():
+        run_id = start_report_run()
+
+        (run,) = get_report_runs(10)
+        assert run["id"] == str(run_id)
+        assert run["status"] == REPORT_JOB_STATUS_RUNNING
+        assert run["stages"] == []
+        assert run["finished_at"] is None
+
+
+def test_profile_report_stage(app, report_runs):
+    with app.app_context():
+        app.config["REPORT_PROFILE_MEMORY"] = True
+        run_id = start_report_run()
+
+        with profile_report_stage(run_id, "test_stage") as profile:
+            rows = [str(index) * 100 for index in range(1000)]
+            profile["rows"] = len(rows)
+
+        app.config["REPORT_PROFILE_MEMORY"] = False
+
+        (run,) = get_report_runs(10)
+        (stage,) = run["stages"]
+        assert stage["name"] == "test_stage"
+        assert stage["rows"] == 1000
+        assert stage["elapsed"] >= 0
+        assert stage["peak_memory"] > 100 * 1000
+        assert stage["max_rss"] > 0
+
+
+def test_profile_report_stage_without_memory_tracing(app, report_runs):
+    with app.app_context():
+        run_id = start_report_run()
+
+        with profile_report_stage(run_id, "test_stage"):
+            pass
+
+        (run,) = get_report_runs(10)
+        assert run["stages"][0]["peak_memory"] is None
+        assert run["stages"][0]["rows"] is None
+
+
+def test_profile_report_stage_without_run(app, report_runs):
+    with app.app_context():
+        with profile_report_stage(None, "test_stage") as profile:
+            profile["rows"] = 1
+
+        assert get_report_runs(10) == []
+
+
+def test_finish_report_run(app, report_runs):
+    with app.app_context():
+        first_run_id = start_report_run()
+        finish_report_run(first_run_id, REPORT_JOB_STATUS_COMPLETED, ["test.xlsx"])
+        second_run_id = start_report_run()
+
+        runs = get_report_runs(10)
+        assert [run["id"] for run in runs] == [str(second_run_id), str(first_run_id)]
+        assert runs[1]["status"] == REPORT_JOB_STATUS_COMPLETED
+        assert runs[1]["report_names"] == ["test.xlsx"]
+        assert runs[1]["max_rss"] > 0
+
+        assert len(get_report_runs(1)) == 1
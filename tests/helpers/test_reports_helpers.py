@@ -1,31 +1,60 @@
+import json
 import os
+import pathlib
 from datetime import datetime, timedelta
+from http import HTTPStatus
 from shutil import copy
+from zipfile import ZipFile
 from unittest.mock import Mock, patch
 
 import numpy as np
 import pandas as pd
+import pytest
+import responses
 from lighthouse.constants import (
     CT_VALUE_LIMIT,
+    FIELD_CACHED_AT,
     FIELD_CH1_CQ,
     FIELD_COORDINATE,
+    FIELD_DATE_TESTED,
+    FIELD_LOCATION_BARCODE,
+    FIELD_PARSED_DATE_TESTED,
     FIELD_PLATE_BARCODE,
     FIELD_RESULT,
     FIELD_ROOT_SAMPLE_ID,
     FIELD_SOURCE,
+    REPORT_FORMAT_CSV_GZ,
+    REPORT_FORMAT_PARQUET,
+    REPORT_FORMAT_XLSX,
 )
 from lighthouse.exceptions import ReportCreationError
+from lighthouse.helpers.mongo_db import backfill_date_tested_for_samples
 from lighthouse.helpers.reports import (
     add_cherrypicked_column,
+    add_location_column,
+    add_to_report_catalogue,
     delete_reports,
+    get_catalogued_reports_details,
     get_all_positive_samples,
     get_cherrypicked_samples,
     get_distinct_plate_barcodes,
     get_new_report_name_and_path,
+    get_positive_samples_page,
+    get_report_inputs_fingerprint,
+    get_report_partitions,
+    get_reports_details,
+    get_reports_with_fingerprint,
     join_samples_declarations,
     map_labware_to_location,
+    merge_report_partitions,
+    reconcile_report_catalogue,
     report_query_window_start,
     unpad_coordinate,
+    validate_report_formats,
+    write_csv_gz_report,
+    write_parquet_report,
+    write_xlsx_report,
+    write_xlsx_rows,
 )
 
 
@@ -38,6 +67,15 @@ def test_get_new_report_name_and_path(app, freezer):
         assert report_name == f"{report_date}_positives_with_locations.xlsx"
 
 
+def test_get_new_report_name_and_path_with_format(app, freezer):
+    report_date = datetime.now().strftime("%y%m%d_%H%M")
+
+    with app.app_context():
+        report_name, report_path = get_new_report_name_and_path(REPORT_FORMAT_CSV_GZ)
+
+        assert report_name == f"{report_date}_positives_with_locations.csv.gz"
+
+
 def test_unpad_coordinate_A01(app, freezer):
     assert unpad_coordinate("A01") == "A1"
 
@@ -54,7 +92,7 @@ def test_unpad_coordinate_B01010(app, freezer):
     assert unpad_coordinate("B01010") == "B1010"
 
 
-def test_delete_reports(app, freezer):
+def test_delete_reports(app, freezer, report_catalogue):
 
     copies_of_reports_folder = "tests/data/reports_copies"
 
@@ -70,19 +108,184 @@ def test_delete_reports(app, freezer):
         copy(f"{copies_of_reports_folder}/{filename}", f"{app.config['REPORTS_DIR']}/{filename}")
 
     with app.app_context():
+        add_to_report_catalogue(
+            [pathlib.Path(app.config["REPORTS_DIR"], filename) for filename in filenames]
+        )
         delete_reports(filenames)
 
+        assert app.data.driver.db.report_catalogue.count_documents({}) == 0
+
     for filename in filenames:
         assert os.path.isfile(f"{app.config['REPORTS_DIR']}/{filename}") is False
 
 
+def test_get_catalogued_reports_details(app, freezer, report_catalogue):
+    with app.app_context():
+        app.data.driver.db.report_catalogue.insert_many(
+            [
+                {
+                    "_id": f"20080{day}_0923_positives_with_locations.xlsx",
+                    "size": 1024 * day,
+                    "created_at": datetime(2020, 8, day),
+                }
+                for day in range(1, 6)
+            ]
+        )
+
+        reports_details, total = get_catalogued_reports_details(page=2, max_results=2)
+
+        assert total == 5
+        assert [report["filename"] for report in reports_details] == [
+            "200803_0923_positives_with_locations.xlsx",
+            "200802_0923_positives_with_locations.xlsx",
+        ]
+        assert reports_details[0]["size"] == "3.0 KB"
+        assert reports_details[0]["download_url"] == (
+            f"{app.config['DOWNLOAD_REPORTS_URL']}/200803_0923_positives_with_locations.xlsx"
+        )
+
+
+def test_reconcile_report_catalogue(app, freezer, report_catalogue):
+    reports = [
+        filename
+        for filename in os.listdir(app.config["REPORTS_DIR"])
+        if filename.endswith("_positives_with_locations.xlsx")
+    ]
+
+    with app.app_context():
+        app.data.driver.db.report_catalogue.insert_one(
+            {
+                "_id": "200101_0000_positives_with_locations.xlsx",
+                "size": 1,
+                "created_at": datetime(2020, 1, 1),
+            }
+        )
+
+        assert reconcile_report_catalogue() == (len(reports), 1)
+
+        reports_details = get_reports_details()
+        assert sorted(report["filename"] for report in reports_details) == sorted(reports)
+
+
+def test_get_catalogued_reports_details_reconciles_catalogue_first(app, freezer, report_catalogue):
+    reports = [
+        filename
+        for filename in os.listdir(app.config["REPORTS_DIR"])
+        if filename.endswith("_positives_with_locations.xlsx")
+    ]
+
+    with app.app_context():
+        # as just after deploying, when the reports in the folder have not been catalogued
+        app.data.driver.db.rebuilds.delete_many({})
+
+        reports_details, total = get_catalogued_reports_details()
+
+        assert total == len(reports)
+        assert sorted(report["filename"] for report in reports_details) == sorted(reports)
+
+
+def test_reconcile_report_catalogue_keeps_fingerprints(app, freezer, report_catalogue):
+    report = next(
+        filename
+        for filename in os.listdir(app.config["REPORTS_DIR"])
+        if filename.endswith("_positives_with_locations.xlsx")
+    )
+
+    with app.app_context():
+        add_to_report_catalogue([pathlib.Path(app.config["REPORTS_DIR"], report)], "abc")
+        reconcile_report_catalogue()
+
+        assert app.data.driver.db.report_catalogue.find_one({"_id": report})["fingerprint"] == "abc"
+
+
+def test_get_report_inputs_fingerprint(app, freezer, empty_data_when_finish):
+    with app.app_context():
+        db = app.data.driver.db
+        with patch(
+            "lighthouse.helpers.reports.get_latest_cherrypick_event_id", return_value=10
+        ) as mock_get_event_id:
+            fingerprint = get_report_inputs_fingerprint()
+            assert get_report_inputs_fingerprint() == fingerprint
+
+            db.imports.insert_one({"date": datetime(2020, 5, 10)})
+            after_import = get_report_inputs_fingerprint()
+            assert after_import != fingerprint
+
+            db.samples_declarations.insert_one(
+                {"root_sample_id": "MCM001", "_updated": datetime(2020, 5, 10)}
+            )
+            after_declaration = get_report_inputs_fingerprint()
+            assert after_declaration not in (fingerprint, after_import)
+
+            mock_get_event_id.return_value = 11
+            assert get_report_inputs_fingerprint() not in (
+                fingerprint,
+                after_import,
+                after_declaration,
+            )
+
+
+def test_get_report_inputs_fingerprint_moves_with_window(app, freezer):
+    with app.app_context():
+        with patch("lighthouse.helpers.reports.get_latest_cherrypick_event_id", return_value=10):
+            fingerprint = get_report_inputs_fingerprint()
+            freezer.move_to(datetime.now() + timedelta(days=1))
+
+            assert get_report_inputs_fingerprint() != fingerprint
+
+
+def test_get_report_inputs_fingerprint_error(app, freezer):
+    with app.app_context():
+        with patch(
+            "lighthouse.helpers.reports.get_latest_cherrypick_event_id",
+            side_effect=Exception("Boom!"),
+        ):
+            assert get_report_inputs_fingerprint() is None
+
+
+def test_get_reports_with_fingerprint(app, freezer, report_catalogue):
+    reports = sorted(
+        filename
+        for filename in os.listdir(app.config["REPORTS_DIR"])
+        if filename.endswith("_positives_with_locations.xlsx")
+    )
+
+    with app.app_context():
+        add_to_report_catalogue(
+            [pathlib.Path(app.config["REPORTS_DIR"], report) for report in reports[:2]], "abc"
+        )
+        # the entry for a report which no longer exists is not used
+        app.data.driver.db.report_catalogue.insert_one(
+            {
+                "_id": "991231_2359_positives_with_locations.xlsx",
+                "size": 1,
+                "created_at": datetime(2099, 12, 31),
+                "fingerprint": "abc",
+            }
+        )
+
+        assert get_reports_with_fingerprint("abc", [REPORT_FORMAT_XLSX]) is None
+
+        app.data.driver.db.report_catalogue.delete_one(
+            {"_id": "991231_2359_positives_with_locations.xlsx"}
+        )
+        assert get_reports_with_fingerprint("abc", [REPORT_FORMAT_XLSX]) in (
+            [reports[0]],
+            [reports[1]],
+        )
+        assert get_reports_with_fingerprint("def", [REPORT_FORMAT_XLSX]) is None
+        assert (
+            get_reports_with_fingerprint("abc", [REPORT_FORMAT_XLSX, REPORT_FORMAT_CSV_GZ]) is None
+        )
+
+
 def test_get_cherrypicked_samples(app, freezer):
 
     expected = pd.DataFrame(
         ["MCM001", "MCM003", "MCM005"], columns=[FIELD_ROOT_SAMPLE_ID], index=[0, 1, 2]
     )
     samples = ["MCM001", "MCM002", "MCM003", "MCM004", "MCM005"]
-    plate_barcodes = ["123", "456"]
+    plate_barcodes = ["123", "123", "123", "456", "456"]
 
     with app.app_context():
         with patch("sqlalchemy.create_engine", return_value=Mock()):
@@ -111,7 +314,7 @@ def test_get_cherrypicked_samples_chunking(app, freezer):
     )
 
     samples = ["MCM001", "MCM002", "MCM003", "MCM004", "MCM005"]
-    plate_barcodes = ["123", "456"]
+    plate_barcodes = ["123", "123", "123", "456", "456"]
 
     with app.app_context():
         with patch("sqlalchemy.create_engine", return_value=Mock()):
@@ -123,6 +326,45 @@ def test_get_cherrypicked_samples_chunking(app, freezer):
                 pd.testing.assert_frame_equal(expected, returned_samples)
 
 
+def test_get_cherrypicked_samples_chunks_plate_barcodes_with_samples(app, freezer):
+    samples = ["MCM001", "MCM002", "MCM003", "MCM004", "MCM005"]
+    plate_barcodes = ["123", "123", "456", "789", "789"]
+
+    with app.app_context():
+        with patch("sqlalchemy.create_engine", return_value=Mock()):
+            with patch(
+                "pandas.read_sql",
+                return_value=pd.DataFrame([], columns=[FIELD_ROOT_SAMPLE_ID]),
+            ) as mock_read_sql:
+                get_cherrypicked_samples(samples, plate_barcodes, 2)
+
+                queried_chunks = sorted(
+                    (
+                        sorted(call.kwargs["params"]["root_sample_ids"]),
+                        sorted(call.kwargs["params"]["plate_barcodes"]),
+                    )
+                    for call in mock_read_sql.call_args_list
+                )
+                assert queried_chunks == [
+                    (["MCM001", "MCM002"], ["123"]),
+                    (["MCM003", "MCM004"], ["456", "789"]),
+                    (["MCM005"], ["789"]),
+                ]
+
+
+def test_get_cherrypicked_samples_reuses_engine(app, freezer):
+    with app.app_context():
+        with patch("sqlalchemy.create_engine", return_value=Mock()) as mock_create_engine:
+            with patch(
+                "pandas.read_sql",
+                return_value=pd.DataFrame([], columns=[FIELD_ROOT_SAMPLE_ID]),
+            ):
+                get_cherrypicked_samples(["MCM001"], ["123"])
+                get_cherrypicked_samples(["MCM002"], ["456"])
+
+                mock_create_engine.assert_called_once()
+
+
 # test scenario where there have been multiple lighthouse tests for a sample with the same Root
 # Sample ID uses actual databases rather than mocking to make sure the query is correct
 def test_get_cherrypicked_samples_repeat_tests(
@@ -164,6 +406,271 @@ def test_get_all_positive_samples(app, freezer, samples):
         assert positive_samples.at[2, FIELD_ROOT_SAMPLE_ID] == "MCM007"
 
 
+def test_get_report_partitions(app, freezer, samples):
+    with app.app_context():
+        partitions = get_report_partitions(app.data.driver.db.samples)
+        window_start = report_query_window_start()
+
+    # one partition for each day of the window, of which the last is open ended
+    assert partitions == [
+        ("test1", window_start, window_start + timedelta(days=1)),
+        ("test1", window_start + timedelta(days=1), window_start + timedelta(days=2)),
+        ("test1", window_start + timedelta(days=2), None),
+    ]
+
+
+def test_get_report_partitions_includes_samples_without_a_source(app, freezer, samples):
+    with app.app_context():
+        samples_collection = app.data.driver.db.samples
+        samples_collection.update_one(
+            {FIELD_ROOT_SAMPLE_ID: "MCM001"}, {"$unset": {FIELD_SOURCE: ""}}
+        )
+        samples_collection.update_one(
+            {FIELD_ROOT_SAMPLE_ID: "MCM005"}, {"$set": {FIELD_SOURCE: None}}
+        )
+
+        partitions = get_report_partitions(samples_collection)
+        partition_dfs = [
+            get_all_positive_samples(samples_collection, partition) for partition in partitions
+        ]
+
+    assert [partition[0] for partition in partitions] == [None] * 3 + ["test1"] * 3
+    assert [len(partition_df.index) for partition_df in partition_dfs] == [0, 0, 2, 0, 0, 1]
+    assert partition_dfs[2][FIELD_ROOT_SAMPLE_ID].to_list() == ["MCM001", "MCM005"]
+
+
+def test_get_all_positive_samples_by_partition(app, freezer, samples):
+    with app.app_context():
+        samples = app.data.driver.db.samples
+        partition_dfs = [
+            get_all_positive_samples(samples, partition)
+            for partition in get_report_partitions(samples)
+        ]
+
+    assert [len(partition_df.index) for partition_df in partition_dfs] == [0, 0, 3]
+    assert partition_dfs[2][FIELD_ROOT_SAMPLE_ID].to_list() == ["MCM001", "MCM005", "MCM007"]
+    assert partition_dfs[2].at[0, "plate and well"] == "123:A1"
+
+
+def test_get_all_positive_samples_in_the_same_order_by_partition(app, freezer, samples):
+    with app.app_context():
+        samples_collection = app.data.driver.db.samples
+        samples_collection.update_one(
+            {FIELD_ROOT_SAMPLE_ID: "MCM001"}, {"$set": {FIELD_SOURCE: "test2"}}
+        )
+        samples_collection.update_one(
+            {FIELD_ROOT_SAMPLE_ID: "MCM007"},
+            {"$set": {FIELD_PARSED_DATE_TESTED: report_query_window_start() + timedelta(days=1)}},
+        )
+
+        positive_samples = get_all_positive_samples(samples_collection)
+        partition_dfs = [
+            get_all_positive_samples(samples_collection, partition)
+            for partition in get_report_partitions(samples_collection)
+        ]
+
+    # by centre, then by date tested, whether or not the window is partitioned
+    root_sample_ids = ["MCM007", "MCM005", "MCM001"]
+    assert positive_samples[FIELD_ROOT_SAMPLE_ID].to_list() == root_sample_ids
+    assert merge_report_partitions(partition_dfs)[FIELD_ROOT_SAMPLE_ID].to_list() == root_sample_ids
+
+
+def test_merge_report_partitions():
+    without_declarations = pd.DataFrame(
+        [["MCM001", "123:A1", "No"]],
+        columns=[FIELD_ROOT_SAMPLE_ID, "plate and well", "LIMS submission"],
+    )
+    with_declarations = pd.DataFrame(
+        [["MCM002", "456:A1", "Yes", "2013-04-04T10:29:13", "Yes"]],
+        columns=[
+            FIELD_ROOT_SAMPLE_ID,
+            "plate and well",
+            "Value In Sequencing",
+            "Declared At",
+            "LIMS submission",
+        ],
+    )
+
+    merged = merge_report_partitions([without_declarations, pd.DataFrame(), with_declarations])
+
+    assert merged.columns.to_list() == [
+        FIELD_ROOT_SAMPLE_ID,
+        "plate and well",
+        "Value In Sequencing",
+        "Declared At",
+        "LIMS submission",
+    ]
+    assert merged[FIELD_ROOT_SAMPLE_ID].to_list() == ["MCM001", "MCM002"]
+    assert merged["Value In Sequencing"].to_list() == ["Unknown", "Yes"]
+
+
+def test_merge_report_partitions_all_empty():
+    assert merge_report_partitions([pd.DataFrame(), pd.DataFrame()]).empty
+
+
+def test_add_location_column(app):
+    positive_samples = pd.DataFrame(
+        [["MCM001", "123", "123:A1", "No"], ["MCM002", "456", "456:A1", "Yes"]],
+        columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, "plate and well", "LIMS submission"],
+    )
+    locations = pd.DataFrame(
+        [["123", "4567"], ["456", ""]], columns=[FIELD_PLATE_BARCODE, FIELD_LOCATION_BARCODE]
+    )
+
+    with app.app_context():
+        with patch(
+            "lighthouse.helpers.reports.map_labware_to_location", return_value=locations
+        ) as mock_map:
+            with_locations = add_location_column(positive_samples)
+
+    mock_map.assert_called_once_with(["123", "456"])
+    assert with_locations.columns.to_list() == [
+        FIELD_ROOT_SAMPLE_ID,
+        FIELD_PLATE_BARCODE,
+        "plate and well",
+        FIELD_LOCATION_BARCODE,
+        "LIMS submission",
+    ]
+    assert with_locations[FIELD_LOCATION_BARCODE].to_list() == ["4567", ""]
+
+
+@pytest.fixture
+def positive_samples_to_page(app, empty_data_when_finish):
+    date_tested = datetime.now() - timedelta(hours=1)
+    samples = [
+        {
+            FIELD_SOURCE: source,
+            FIELD_PLATE_BARCODE: plate_barcode,
+            FIELD_ROOT_SAMPLE_ID: root_sample_id,
+            FIELD_RESULT: "Positive",
+            FIELD_COORDINATE: "A01",
+            FIELD_DATE_TESTED: date_tested.strftime("%Y-%m-%d %H:%M:%S UTC"),
+            FIELD_PARSED_DATE_TESTED: date_tested,
+        }
+        for source, plate_barcode, root_sample_id in [
+            ("centre1", "123", "MCM001"),
+            ("centre2", "456", "MCM002"),
+            ("centre1", "123", "MCM003"),
+            ("centre2", "456", "MCM004"),
+            ("centre1", "789", "MCM005"),
+        ]
+    ]
+    with app.app_context():
+        app.data.driver.db.samples.insert_many(samples)
+
+    yield samples
+
+
+def get_positive_samples_pages(**filters):
+    locations = pd.DataFrame(
+        [["123", "4567"], ["456", ""], ["789", "8910"]],
+        columns=[FIELD_PLATE_BARCODE, FIELD_LOCATION_BARCODE],
+    )
+    cherrypicked_samples = pd.DataFrame(
+        [["MCM003", "123", "positive", "A1"]],
+        columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, "Result_lower", FIELD_COORDINATE],
+    )
+
+    pages = []
+    after = None
+    with patch("lighthouse.helpers.reports.map_labware_to_location", return_value=locations):
+        with patch(
+            "lighthouse.helpers.reports.get_cherrypicked_samples",
+            side_effect=lambda *_: cherrypicked_samples.copy(),
+        ):
+            while True:
+                page, after = get_positive_samples_page(2, after=after, **filters)
+                pages.append([sample[FIELD_ROOT_SAMPLE_ID] for sample in page])
+                if after is None:
+                    return pages
+
+
+def test_get_positive_samples_page(app, freezer, positive_samples_to_page):
+    with app.app_context():
+        assert get_positive_samples_pages() == [
+            ["MCM001", "MCM002"],
+            ["MCM003", "MCM004"],
+            ["MCM005"],
+        ]
+        assert get_positive_samples_pages(source="centre1") == [["MCM001", "MCM003"], ["MCM005"]]
+
+
+def test_get_positive_samples_page_includes_newly_imported_samples(
+    app, freezer, positive_samples_to_page
+):
+    with app.app_context():
+        new_sample = {**positive_samples_to_page[-1], FIELD_ROOT_SAMPLE_ID: "MCM006"}
+        new_sample.pop("_id", None)
+        del new_sample[FIELD_PARSED_DATE_TESTED]
+        app.data.driver.db.samples.insert_one(new_sample)
+
+        # paging does not write to the samples, so the sample is not found until its changes have
+        # been caught up and it has a parsed date
+        pages = get_positive_samples_pages(source="centre1")
+        assert sorted(sum(pages, [])) == ["MCM001", "MCM003", "MCM005"]
+        assert FIELD_PARSED_DATE_TESTED not in app.data.driver.db.samples.find_one(
+            {FIELD_ROOT_SAMPLE_ID: "MCM006"}
+        )
+
+        backfill_date_tested_for_samples([new_sample])
+
+        pages = get_positive_samples_pages(source="centre1")
+        assert sorted(sum(pages, [])) == ["MCM001", "MCM003", "MCM005", "MCM006"]
+
+
+def test_get_positive_samples_page_filters(app, freezer, positive_samples_to_page):
+    with app.app_context():
+        # the samples are filtered after their plates are located and they are checked for
+        # cherrypicking, a batch at a time
+        assert get_positive_samples_pages(has_location=True) == [["MCM001", "MCM003"], ["MCM005"]]
+        assert get_positive_samples_pages(has_location=False) == [["MCM002", "MCM004"], []]
+        assert get_positive_samples_pages(lims_submission="Yes") == [["MCM003"]]
+        assert get_positive_samples_pages(date_from=datetime.now()) == [[]]
+
+
+def test_get_positive_samples_page_content(app, freezer, positive_samples_to_page):
+    with app.app_context():
+        with patch(
+            "lighthouse.helpers.reports.map_labware_to_location",
+            return_value=pd.DataFrame(
+                [["123", "4567"]], columns=[FIELD_PLATE_BARCODE, FIELD_LOCATION_BARCODE]
+            ),
+        ):
+            with patch(
+                "lighthouse.helpers.reports.get_cherrypicked_samples",
+                return_value=pd.DataFrame(
+                    [],
+                    columns=[
+                        FIELD_ROOT_SAMPLE_ID,
+                        FIELD_PLATE_BARCODE,
+                        "Result_lower",
+                        FIELD_COORDINATE,
+                    ],
+                ),
+            ):
+                page, _ = get_positive_samples_page(2)
+
+    assert page[0] == {
+        FIELD_SOURCE: "centre1",
+        FIELD_PLATE_BARCODE: "123",
+        FIELD_ROOT_SAMPLE_ID: "MCM001",
+        FIELD_RESULT: "Positive",
+        FIELD_DATE_TESTED: positive_samples_to_page[0][FIELD_DATE_TESTED],
+        FIELD_COORDINATE: "A1",
+        "plate and well": "123:A1",
+        FIELD_LOCATION_BARCODE: "4567",
+        "LIMS submission": "No",
+    }
+    # plates which are not in LabWhere have no location
+    assert page[1][FIELD_LOCATION_BARCODE] is None
+
+
+def test_get_positive_samples_page_invalid_cursor(app, freezer):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            get_positive_samples_page(2, after="not a cursor")
+
+
 def test_query_by_ct_limit(app, freezer, samples_ct_values):
     # Just testing how mongo queries work with 'less than' comparisons and nulls
     with app.app_context():
@@ -200,6 +707,71 @@ def test_map_labware_to_location_dataframe_content(app, freezer, labwhere_sample
     assert np.array_equal(result.to_numpy(), expected_data)
 
 
+def test_map_labware_to_location_chunks_requests(app, freezer, mocked_responses, labware_locations):
+    labwhere_url = f"http://{app.config['LABWHERE_URL']}/api/labwares_by_barcode"
+
+    def locate_barcodes(request):
+        barcodes = json.loads(request.body)["barcodes"]
+        return (
+            HTTPStatus.OK,
+            {},
+            json.dumps([{"barcode": b, "location_barcode": f"lw-{b}"} for b in barcodes]),
+        )
+
+    mocked_responses.add_callback(responses.POST, labwhere_url, callback=locate_barcodes)
+
+    with app.app_context():
+        app.config["LABWHERE_CHUNK_SIZE"] = 2
+        result = map_labware_to_location(["123", "456", "789", "123"])
+
+    assert len(mocked_responses.calls) == 2
+    assert sorted(result.to_numpy().tolist()) == [
+        ["123", "lw-123"],
+        ["456", "lw-456"],
+        ["789", "lw-789"],
+    ]
+
+
+def test_map_labware_to_location_no_labware(app, freezer, labware_locations):
+    with app.app_context():
+        result = map_labware_to_location([])
+
+    assert result.columns.to_list() == [FIELD_PLATE_BARCODE, "location_barcode"]
+    assert result.empty
+
+
+def test_map_labware_to_location_uses_cached_locations(
+    app, freezer, mocked_responses, labwhere_samples_simple
+):
+    with app.app_context():
+        first_result = map_labware_to_location(["123"])
+        second_result = map_labware_to_location(["123"])
+
+    assert len(mocked_responses.calls) == 1
+    assert first_result.to_numpy().tolist() == [["123", "4567"]]
+    assert second_result.to_numpy().tolist() == [["123", "4567"]]
+
+
+def test_map_labware_to_location_refreshes_expired_locations(
+    app, freezer, mocked_responses, labwhere_samples_simple
+):
+    with app.app_context():
+        app.data.driver.db.labware_locations.insert_one(
+            {
+                "_id": "123",
+                FIELD_LOCATION_BARCODE: "old location",
+                FIELD_CACHED_AT: datetime.utcnow()
+                - timedelta(seconds=app.config["LABWHERE_LOCATIONS_CACHE_TTL"] + 1),
+            }
+        )
+        result = map_labware_to_location(["123"])
+
+        assert len(mocked_responses.calls) == 1
+        assert result.to_numpy().tolist() == [["123", "4567"]]
+        cached_location = app.data.driver.db.labware_locations.find_one({"_id": "123"})
+        assert cached_location[FIELD_LOCATION_BARCODE] == "4567"
+
+
 def test_add_cherrypicked_column(app, freezer):
     # existing dataframe before 'add_cherrypicked_column' is run (essentially queried from MongoDB)
     existing_dataframe = pd.DataFrame(
@@ -394,6 +966,69 @@ def test_add_cherrypicked_column_no_rows(app, freezer):
     assert np.array_equal(new_dataframe.to_numpy(), expected_data)
 
 
+def test_add_cherrypicked_column_no_samples(app, freezer):
+    existing_dataframe = pd.DataFrame(
+        [], columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, FIELD_RESULT, FIELD_COORDINATE]
+    )
+
+    with app.app_context():
+        with patch("pandas.read_sql") as mock_read_sql:
+            new_dataframe = add_cherrypicked_column(existing_dataframe)
+
+            mock_read_sql.assert_not_called()
+
+    assert new_dataframe.columns.to_list() == [
+        FIELD_ROOT_SAMPLE_ID,
+        FIELD_PLATE_BARCODE,
+        FIELD_RESULT,
+        FIELD_COORDINATE,
+        "LIMS submission",
+    ]
+    assert new_dataframe.empty
+
+
+def test_add_cherrypicked_column_raises_when_cherrypicked_samples_not_found(app, freezer):
+    existing_dataframe = pd.DataFrame(
+        [["MCM001", "123", "Positive", "A1"]],
+        columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, FIELD_RESULT, FIELD_COORDINATE],
+    )
+
+    with app.app_context():
+        with patch("lighthouse.helpers.reports.get_cherrypicked_samples", return_value=None):
+            with pytest.raises(ReportCreationError):
+                add_cherrypicked_column(existing_dataframe)
+
+
+def test_add_cherrypicked_column_categorical_results(app, freezer):
+    existing_dataframe = pd.DataFrame(
+        [["MCM001", "123", "Positive", "A1"], ["MCM002", "123", "Positive", "A2"]],
+        columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, FIELD_RESULT, FIELD_COORDINATE],
+    ).astype({FIELD_PLATE_BARCODE: "category", FIELD_RESULT: "category"})
+
+    mock_get_cherrypicked_samples = pd.DataFrame(
+        [["MCM002", "123", "positive", "A2"]],
+        columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, "Result_lower", FIELD_COORDINATE],
+    )
+
+    with app.app_context():
+        with patch(
+            "lighthouse.helpers.reports.get_cherrypicked_samples",
+            return_value=mock_get_cherrypicked_samples,
+        ):
+            new_dataframe = add_cherrypicked_column(existing_dataframe)
+
+    # the existing dataframe is left as it was
+    assert existing_dataframe.columns.to_list() == [
+        FIELD_ROOT_SAMPLE_ID,
+        FIELD_PLATE_BARCODE,
+        FIELD_RESULT,
+        FIELD_COORDINATE,
+    ]
+    assert new_dataframe["LIMS submission"].to_list() == ["No", "Yes"]
+    assert new_dataframe["LIMS submission"].dtype == "category"
+    assert new_dataframe[FIELD_RESULT].dtype == "category"
+
+
 def test_get_distinct_plate_barcodes(app, freezer, samples):
 
     with app.app_context():
@@ -413,6 +1048,37 @@ def test_join_samples_declarations(app, freezer, samples_declarations, samples_n
         assert joined.at[1, "Value In Sequencing"] == "Unknown"
 
 
+def test_join_samples_declarations_only_joins_report_samples_in_chunks(
+    app, freezer, samples_declarations
+):
+    positive_samples = pd.DataFrame(
+        [["MCM001"], ["MCM003"], ["MCM010"]], columns=[FIELD_ROOT_SAMPLE_ID]
+    )
+
+    with app.app_context():
+        app.config["SAMPLES_DECLARATIONS_CHUNK_SIZE"] = 1
+        joined = join_samples_declarations(positive_samples)
+
+    assert joined[FIELD_ROOT_SAMPLE_ID].to_list() == ["MCM001", "MCM003", "MCM010"]
+    # MCM003 has several declarations, of which the latest is used
+    assert joined["Value In Sequencing"].to_list() == ["Yes", "Yes", "Unknown"]
+
+
+def test_join_samples_declarations_before_latest_declarations_are_built(
+    app, freezer, samples_declarations
+):
+    positive_samples = pd.DataFrame({FIELD_ROOT_SAMPLE_ID: ["MCM001", "MCM003", "MCM010"]})
+
+    with app.app_context():
+        # as just after deploying, when only new declarations are in the latest declarations
+        app.data.driver.db.rebuilds.delete_many({})
+        app.data.driver.db.samples_declarations_latest.delete_many({})
+
+        joined = join_samples_declarations(positive_samples)
+
+    assert joined["Value In Sequencing"].to_list() == ["Yes", "Yes", "Unknown"]
+
+
 def test_join_samples_declarations_empty_collection(app, freezer, samples_no_declaration):
     # samples_declaration collection is empty because we are not passing in the fixture
 
@@ -424,6 +1090,86 @@ def test_join_samples_declarations_empty_collection(app, freezer, samples_no_dec
         assert np.array_equal(positive_samples.to_numpy(), joined.to_numpy())
 
 
+def test_write_xlsx_report(app, tmp_path):
+    report_df = pd.DataFrame(
+        [["MCM001", "123", "4567"], ["MCM002", "456", np.nan], ["MCM003", "789", ""]],
+        columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, FIELD_LOCATION_BARCODE],
+    )
+    report_path = tmp_path.joinpath("report.xlsx")
+
+    write_xlsx_report(report_df, report_path)
+
+    with ZipFile(report_path) as report:
+        with_location_sheet = report.read("xl/worksheets/sheet1.xml").decode()
+        all_samples_sheet = report.read("xl/worksheets/sheet2.xml").decode()
+        workbook = report.read("xl/workbook.xml").decode()
+
+    assert workbook.index("POSITIVE SAMPLES WITH LOCATION") < workbook.index("ALL POSITIVE SAMPLES")
+    # the header and a row for each sample with a location barcode
+    assert with_location_sheet.count("<row ") == 3
+    assert "MCM002" not in with_location_sheet
+    # the header and a row for every sample
+    assert all_samples_sheet.count("<row ") == 4
+    assert "MCM002" in all_samples_sheet
+
+
+def test_write_xlsx_rows_from_iterator(app, tmp_path):
+    columns = [FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, FIELD_LOCATION_BARCODE]
+    rows = ((f"MCM{index:03}", "123", "4567" if index % 2 == 0 else None) for index in range(10))
+    report_path = tmp_path.joinpath("report.xlsx")
+
+    write_xlsx_rows(columns, rows, report_path)
+
+    with ZipFile(report_path) as report:
+        with_location_sheet = report.read("xl/worksheets/sheet1.xml").decode()
+        all_samples_sheet = report.read("xl/worksheets/sheet2.xml").decode()
+
+    assert with_location_sheet.count("<row ") == 6
+    assert all_samples_sheet.count("<row ") == 11
+
+
+def test_write_csv_gz_report(app, tmp_path):
+    report_df = pd.DataFrame(
+        [["MCM001", "123", "4567"], ["MCM002", "456", np.nan]],
+        columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, FIELD_LOCATION_BARCODE],
+    )
+    report_path = tmp_path.joinpath("report.csv.gz")
+
+    write_csv_gz_report(report_df, report_path)
+
+    pd.testing.assert_frame_equal(
+        pd.read_csv(report_path, dtype=str, compression="gzip"), report_df
+    )
+
+
+def test_write_parquet_report(app, tmp_path):
+    pytest.importorskip("pyarrow")
+
+    report_df = pd.DataFrame(
+        [["MCM001", "123", "4567"], ["MCM002", "456", np.nan]],
+        columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, FIELD_LOCATION_BARCODE],
+    )
+    report_path = tmp_path.joinpath("report.parquet")
+
+    write_parquet_report(report_df, report_path)
+
+    written_df = pd.read_parquet(report_path)
+    assert written_df[FIELD_ROOT_SAMPLE_ID].dtype == object
+    assert written_df[FIELD_PLATE_BARCODE].dtype == "category"
+    assert written_df[FIELD_LOCATION_BARCODE].dtype == "category"
+    pd.testing.assert_frame_equal(written_df.astype(object), report_df.astype(object))
+
+
+def test_validate_report_formats(app):
+    assert validate_report_formats([REPORT_FORMAT_XLSX, REPORT_FORMAT_CSV_GZ]) == []
+    assert len(validate_report_formats(["docx"])) == 1
+
+
+def test_validate_report_formats_parquet_requires_pyarrow(app):
+    with patch("lighthouse.helpers.reports.pyarrow", None):
+        assert len(validate_report_formats([REPORT_FORMAT_PARQUET])) == 1
+
+
 def test_report_query_window_start(app):
     with app.app_context():
         window_size = app.config["REPORT_WINDOW_SIZE"]
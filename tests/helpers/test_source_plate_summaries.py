@@ -0,0 +1,171 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from lighthouse.constants import (
+    FIELD_LH_SAMPLE_UUID,
+    FIELD_LH_SOURCE_PLATE_UUID,
+    FIELD_ROOT_SAMPLE_ID,
+    FIELD_SAMPLE_COUNT,
+    FIELD_SAMPLE_SUBJECTS,
+    FIELD_SAMPLES_UPDATED_AT,
+    FIELD_UPDATED_AT,
+)
+from lighthouse.helpers.source_plate_summaries import (
+    construct_sample_message_subject,
+    get_source_plate_sample_subjects,
+    get_source_plate_samples_version,
+    rebuild_source_plate_summaries,
+    refresh_source_plate_summaries_for_samples,
+    refresh_source_plate_summary,
+)
+
+
+def test_construct_sample_message_subject():
+    sample = {
+        FIELD_ROOT_SAMPLE_ID: "MCM001",
+        "RNA ID": "rna_1",
+        "Lab ID": "Lab 1",
+        "Result": "Positive",
+        FIELD_LH_SAMPLE_UUID: "17be6834-06e7-4ce1-8413-9d8667cb9022",
+    }
+
+    assert construct_sample_message_subject(sample) == {
+        "role_type": "sample",
+        "subject_type": "sample",
+        "friendly_name": "MCM001__rna_1__Lab 1__Positive",
+        "uuid": "17be6834-06e7-4ce1-8413-9d8667cb9022",
+    }
+
+
+def test_get_source_plate_samples_version(app, samples_with_uuids):
+    with app.app_context():
+        source_plate_uuid = samples_with_uuids[0][FIELD_LH_SOURCE_PLATE_UUID]
+        plate_samples = [
+            sample
+            for sample in samples_with_uuids
+            if sample[FIELD_LH_SOURCE_PLATE_UUID] == source_plate_uuid
+        ]
+        app.data.driver.db.samples.update_one(
+            {FIELD_LH_SAMPLE_UUID: plate_samples[0][FIELD_LH_SAMPLE_UUID]},
+            {"$set": {FIELD_UPDATED_AT: datetime(2021, 1, 2)}},
+        )
+        app.data.driver.db.samples.update_one(
+            {FIELD_LH_SAMPLE_UUID: plate_samples[1][FIELD_LH_SAMPLE_UUID]},
+            {"$set": {FIELD_UPDATED_AT: datetime(2021, 1, 1)}},
+        )
+
+        version = get_source_plate_samples_version(source_plate_uuid)
+        assert version[FIELD_SAMPLE_COUNT] == len(plate_samples)
+        assert version[FIELD_SAMPLES_UPDATED_AT].replace(tzinfo=None) == datetime(2021, 1, 2)
+
+        assert get_source_plate_samples_version("unknown uuid") == {
+            FIELD_SAMPLE_COUNT: 0,
+            FIELD_SAMPLES_UPDATED_AT: None,
+        }
+
+
+def test_get_source_plate_sample_subjects_builds_missing_summary(
+    app, samples_with_uuids, source_plate_summaries
+):
+    with app.app_context():
+        source_plate_uuid = samples_with_uuids[0][FIELD_LH_SOURCE_PLATE_UUID]
+        expected_subjects = [
+            construct_sample_message_subject(sample)
+            for sample in samples_with_uuids
+            if sample[FIELD_LH_SOURCE_PLATE_UUID] == source_plate_uuid
+        ]
+
+        assert get_source_plate_sample_subjects(source_plate_uuid) == expected_subjects
+
+        summary = app.data.driver.db.source_plate_summaries.find_one({"_id": source_plate_uuid})
+        assert summary[FIELD_SAMPLE_SUBJECTS] == expected_subjects
+
+
+def test_get_source_plate_sample_subjects_reads_existing_summary(
+    app, samples_with_uuids, source_plate_summaries
+):
+    with app.app_context():
+        source_plate_uuid = samples_with_uuids[0][FIELD_LH_SOURCE_PLATE_UUID]
+        sample_subjects = refresh_source_plate_summary(source_plate_uuid)
+
+        with patch("lighthouse.helpers.source_plate_summaries.get_samples") as mock_get_samples:
+            assert get_source_plate_sample_subjects(source_plate_uuid) == sample_subjects
+            mock_get_samples.assert_not_called()
+
+
+def test_get_source_plate_sample_subjects_rebuilds_summary_when_samples_added(
+    app, samples_with_uuids, source_plate_summaries
+):
+    with app.app_context():
+        source_plate_uuid = samples_with_uuids[0][FIELD_LH_SOURCE_PLATE_UUID]
+        refresh_source_plate_summary(source_plate_uuid)
+
+        new_sample = {
+            **samples_with_uuids[0],
+            FIELD_ROOT_SAMPLE_ID: "MCM100",
+            FIELD_LH_SAMPLE_UUID: "new sample uuid",
+        }
+        new_sample.pop("_id", None)
+        app.data.driver.db.samples.insert_one(new_sample)
+
+        sample_subjects = get_source_plate_sample_subjects(source_plate_uuid)
+        assert construct_sample_message_subject(new_sample) in sample_subjects
+
+
+def test_get_source_plate_sample_subjects_rebuilds_summary_when_samples_updated(
+    app, samples_with_uuids, source_plate_summaries
+):
+    with app.app_context():
+        source_plate_uuid = samples_with_uuids[0][FIELD_LH_SOURCE_PLATE_UUID]
+        refresh_source_plate_summary(source_plate_uuid)
+
+        app.data.driver.db.samples.update_one(
+            {FIELD_LH_SAMPLE_UUID: samples_with_uuids[0][FIELD_LH_SAMPLE_UUID]},
+            {"$set": {"Result": "Negative", FIELD_UPDATED_AT: datetime(2021, 1, 1)}},
+        )
+
+        sample_subjects = get_source_plate_sample_subjects(source_plate_uuid)
+        assert sample_subjects[0]["friendly_name"].endswith("__Negative")
+
+
+def test_get_source_plate_sample_subjects_returns_none_failure_fetching_summary(app):
+    with app.app_context():
+        with patch(
+            "flask.current_app.data.driver.db.source_plate_summaries"
+        ) as source_plate_summaries_collection:
+            source_plate_summaries_collection.find_one.side_effect = Exception("Boom!")
+            assert get_source_plate_sample_subjects("test source plate uuid") is None
+
+
+def test_refresh_source_plate_summary_removes_summary_without_samples(app, source_plate_summaries):
+    with app.app_context():
+        app.data.driver.db.source_plate_summaries.insert_one(
+            {"_id": "test source plate uuid", FIELD_SAMPLE_SUBJECTS: [{"friendly_name": "old"}]}
+        )
+
+        assert refresh_source_plate_summary("test source plate uuid") == []
+        assert (
+            app.data.driver.db.source_plate_summaries.find_one({"_id": "test source plate uuid"})
+            is None
+        )
+
+
+def test_refresh_source_plate_summaries_for_samples(
+    app, samples_with_uuids, source_plate_summaries
+):
+    with app.app_context():
+        refresh_source_plate_summaries_for_samples(samples_with_uuids[:1])
+
+        summaries = list(app.data.driver.db.source_plate_summaries.find())
+        assert len(summaries) == 1
+        assert summaries[0]["_id"] == samples_with_uuids[0][FIELD_LH_SOURCE_PLATE_UUID]
+
+
+def test_rebuild_source_plate_summaries(app, samples_with_uuids, source_plate_summaries):
+    with app.app_context():
+        source_plate_uuids = {sample[FIELD_LH_SOURCE_PLATE_UUID] for sample in samples_with_uuids}
+
+        assert rebuild_source_plate_summaries() == len(source_plate_uuids)
+        assert app.data.driver.db.source_plate_summaries.count_documents({}) == len(
+            source_plate_uuids
+        )
@@ -0,0 +1,131 @@
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from lighthouse.constants import (
+    FIELD_ROOT_SAMPLE_ID,
+    REPORT_JOB_STATUS_COMPLETED,
+    REPORT_JOB_STATUS_FAILED,
+    REPORT_RUN_STATUS_UNCHANGED,
+    REPORT_STAGE_LOCATIONS,
+    REPORT_STAGE_POSITIVE_SAMPLES,
+)
+from lighthouse.helpers.report_jobs import enqueue_report_job, get_report_job
+from lighthouse.helpers.report_runs import get_report_runs
+from lighthouse.jobs.reports import create_report, run_report_job
+
+
+def test_run_report_job_completes_job(app, report_jobs):
+    with app.app_context():
+        job_id, _ = enqueue_report_job(["xlsx"])
+
+        def create_report(report_formats, on_stage, reuse_unchanged):
+            assert reuse_unchanged is False
+            on_stage(REPORT_STAGE_LOCATIONS)
+            assert get_report_job(str(job_id))["stage"] == REPORT_STAGE_LOCATIONS
+            return ["test.xlsx"]
+
+        with patch("lighthouse.jobs.reports.create_report", side_effect=create_report):
+            run_report_job(job_id, ["xlsx"], reuse_unchanged=False)
+
+        job = get_report_job(str(job_id))
+        assert job["status"] == REPORT_JOB_STATUS_COMPLETED
+        assert job["report_names"] == ["test.xlsx"]
+
+
+def test_run_report_job_fails_job(app, report_jobs):
+    with app.app_context():
+        job_id, _ = enqueue_report_job(["xlsx"])
+
+        with patch("lighthouse.jobs.reports.create_report", side_effect=KeyError("Boom!")):
+            run_report_job(job_id, ["xlsx"])
+
+        job = get_report_job(str(job_id))
+        assert job["status"] == REPORT_JOB_STATUS_FAILED
+        assert job["errors"] == ["KeyError"]
+
+
+def test_create_report_uses_existing_reports_when_inputs_unchanged(app, report_runs):
+    with app.app_context():
+        with patch("lighthouse.jobs.reports.get_report_inputs_fingerprint", return_value="abc"):
+            with patch(
+                "lighthouse.jobs.reports.get_reports_with_fingerprint", return_value=["test.xlsx"]
+            ) as mock_get_reports:
+                with patch("lighthouse.jobs.reports.get_all_positive_samples") as mock_get_samples:
+                    assert create_report(["xlsx"]) == ["test.xlsx"]
+
+        mock_get_reports.assert_called_once_with("abc", ["xlsx"])
+        mock_get_samples.assert_not_called()
+
+        (run,) = get_report_runs(10)
+        assert run["status"] == REPORT_RUN_STATUS_UNCHANGED
+        assert run["report_names"] == ["test.xlsx"]
+
+
+def test_create_report_does_not_reuse_reports_when_asked_not_to(app, report_runs):
+    with app.app_context():
+        with patch("lighthouse.jobs.reports.get_report_inputs_fingerprint", return_value="abc"):
+            with patch(
+                "lighthouse.jobs.reports.get_reports_with_fingerprint", return_value=["test.xlsx"]
+            ) as mock_get_reports:
+                with patch(
+                    "lighthouse.jobs.reports.get_all_positive_samples",
+                    side_effect=MemoryError("Boom!"),
+                ) as mock_get_samples:
+                    with pytest.raises(MemoryError):
+                        create_report(["xlsx"], reuse_unchanged=False)
+
+        mock_get_reports.assert_not_called()
+        mock_get_samples.assert_called_once()
+
+
+def test_create_report_records_failed_stage(app, report_runs):
+    with app.app_context():
+        with patch("lighthouse.jobs.reports.get_report_inputs_fingerprint", return_value=None):
+            with patch(
+                "lighthouse.jobs.reports.get_all_positive_samples",
+                side_effect=MemoryError("Boom!"),
+            ):
+                with pytest.raises(MemoryError):
+                    create_report(["xlsx"])
+
+        (run,) = get_report_runs(10)
+        assert run["status"] == REPORT_JOB_STATUS_FAILED
+        assert [stage["name"] for stage in run["stages"]] == [REPORT_STAGE_POSITIVE_SAMPLES]
+        assert run["finished_at"] is not None
+
+
+def test_create_report_with_cherrypicked_samples_index(
+    app,
+    tmp_path,
+    samples,
+    samples_declarations,
+    labwhere_samples_simple,
+    cherrypicked_samples,
+    report_catalogue,
+    report_runs,
+):
+    report_path = tmp_path / "test.csv.gz"
+    with app.app_context():
+        app.config["CHERRYPICKED_SAMPLES_INDEX"] = True
+        with patch(
+            "lighthouse.jobs.reports.get_new_report_name_and_path",
+            return_value=("test.csv.gz", str(report_path)),
+        ):
+            with patch("lighthouse.jobs.reports.refresh_cherrypicked_samples") as mock_refresh:
+                with patch("lighthouse.helpers.reports.get_cherrypicked_samples") as mock_get:
+                    with patch(
+                        "lighthouse.helpers.reports.get_latest_cherrypick_event_id"
+                    ) as mock_get_latest_event_id:
+                        assert create_report(["csv.gz"]) == ["test.csv.gz"]
+
+    # the index is refreshed once and the warehouses are not otherwise queried
+    mock_refresh.assert_called_once_with()
+    mock_get.assert_not_called()
+    mock_get_latest_event_id.assert_not_called()
+
+    report = pd.read_csv(report_path)
+    lims_submissions = dict(zip(report[FIELD_ROOT_SAMPLE_ID], report["LIMS submission"]))
+    # MCM007 was cherrypicked from a different plate
+    assert lims_submissions == {"MCM001": "Yes", "MCM005": "Yes", "MCM007": "No"}
@@ -0,0 +1,133 @@
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from lighthouse.constants import FIELD_ROOT_SAMPLE_ID, FIELD_UPDATED_AT
+from lighthouse.jobs.samples_watcher import (
+    SAMPLES_WATCHER_PIPELINE,
+    catch_up_sample_changes,
+    handle_sample_changes,
+    samples_catch_up_lock,
+)
+
+
+def test_handle_sample_changes_calls_every_handler():
+    failing_handler = MagicMock(__name__="failing_handler", side_effect=Exception("Boom!"))
+    handler = MagicMock(__name__="handler")
+    test_samples = [{"Root Sample ID": "MCM001"}]
+
+    with patch(
+        "lighthouse.jobs.samples_watcher.SAMPLE_CHANGE_HANDLERS", [failing_handler, handler]
+    ):
+        handle_sample_changes(test_samples)
+
+    failing_handler.assert_called_with(test_samples)
+    handler.assert_called_with(test_samples)
+
+
+def test_samples_watcher_pipeline_skips_date_tested_backfills(app):
+    changes = [
+        {"_id": 1, "operationType": "insert"},
+        {"_id": 2, "operationType": "replace"},
+        {
+            "_id": 3,
+            "operationType": "update",
+            "updateDescription": {"updatedFields": {"date_tested": "x"}, "removedFields": []},
+        },
+        {
+            "_id": 4,
+            "operationType": "update",
+            "updateDescription": {
+                "updatedFields": {"date_tested": "x", "Result": "Positive"},
+                "removedFields": [],
+            },
+        },
+        {
+            "_id": 5,
+            "operationType": "update",
+            "updateDescription": {"updatedFields": {}, "removedFields": ["Lab ID"]},
+        },
+        {"_id": 6, "operationType": "delete"},
+    ]
+
+    with app.app_context():
+        collection = app.data.driver.db.samples_watcher_changes
+        collection.insert_many(changes)
+
+        try:
+            matched = collection.aggregate(SAMPLES_WATCHER_PIPELINE)
+
+            assert [change["_id"] for change in matched] == [1, 2, 4, 5]
+        finally:
+            collection.drop()
+
+
+@pytest.fixture
+def sample_changes(app, samples):
+    with app.app_context():
+        for index, sample in enumerate(samples):
+            app.data.driver.db.samples.update_one(
+                {FIELD_ROOT_SAMPLE_ID: sample[FIELD_ROOT_SAMPLE_ID]},
+                {"$set": {FIELD_UPDATED_AT: datetime(2021, 1, 1 + index % 2)}},
+            )
+
+    handler = MagicMock(__name__="handler")
+    with patch("lighthouse.jobs.samples_watcher.SAMPLE_CHANGE_HANDLERS", [handler]):
+        yield handler
+
+    with app.app_context():
+        app.data.driver.db.imports.delete_many({})
+        app.data.driver.db.rebuilds.delete_many({})
+
+
+def handled_root_sample_ids(handler):
+    return sorted(
+        sample[FIELD_ROOT_SAMPLE_ID] for call in handler.call_args_list for sample in call.args[0]
+    )
+
+
+def test_catch_up_sample_changes_after_each_import(app, samples, sample_changes):
+    with app.app_context():
+        db = app.data.driver.db
+        db.imports.insert_one({"date": datetime(2021, 1, 2)})
+
+        # the first catch up passes every sample to the handlers, in batches
+        assert catch_up_sample_changes(batch_size=2) == len(samples)
+        assert handled_root_sample_ids(sample_changes) == sorted(
+            sample[FIELD_ROOT_SAMPLE_ID] for sample in samples
+        )
+        assert all(len(call.args[0]) <= 2 for call in sample_changes.call_args_list)
+
+        # nothing is caught up until another import is recorded
+        sample_changes.reset_mock()
+        db.samples.update_one(
+            {FIELD_ROOT_SAMPLE_ID: "MCM001"}, {"$set": {FIELD_UPDATED_AT: datetime(2021, 1, 3)}}
+        )
+        assert catch_up_sample_changes() == 0
+        sample_changes.assert_not_called()
+
+        # then only the samples updated since the last catch up are, with those updated at the
+        # time caught up to
+        db.imports.insert_one({"date": datetime(2021, 1, 3)})
+        updated_since = sorted(
+            [
+                "MCM001",
+                *(
+                    sample[FIELD_ROOT_SAMPLE_ID]
+                    for index, sample in enumerate(samples)
+                    if index % 2 == 1
+                ),
+            ]
+        )
+        assert catch_up_sample_changes() == len(updated_since)
+        assert handled_root_sample_ids(sample_changes) == updated_since
+
+
+def test_catch_up_sample_changes_skips_while_running(app, samples, sample_changes):
+    with app.app_context():
+        app.data.driver.db.imports.insert_one({"date": datetime(2021, 1, 2)})
+
+        with samples_catch_up_lock:
+            assert catch_up_sample_changes() == 0
+
+        sample_changes.assert_not_called()
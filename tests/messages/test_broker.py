@@ -1,4 +1,9 @@
 from lighthouse.messages.broker import Broker
+from lighthouse.messages.in_memory import (
+    PublishedMessage,
+    clear_published_messages,
+    published_messages,
+)
 import pytest  # type: ignore
 from unittest.mock import patch, MagicMock
 
@@ -92,6 +97,25 @@ def test_broker_close_connection(app, mock_pika):
         mock_connection.close.assert_called()
 
 
+def test_broker_publish_in_memory(app, mock_pika, mock_message):
+    with app.app_context():
+        app.config["RMQ_IN_MEMORY"] = True
+        _, _, _, _, pika = mock_pika
+        test_payload, test_message = mock_message
+        clear_published_messages()
+
+        broker = Broker()
+        broker.connect()
+        broker.publish(test_message, "test routing key")
+        broker.close_connection()
+
+        pika.BlockingConnection.assert_not_called()
+        assert list(published_messages) == [
+            PublishedMessage(app.config["RMQ_EXCHANGE"], "test routing key", test_payload)
+        ]
+        clear_published_messages()
+
+
 def test_broker_close_connection_no_connection():
     broker = Broker()
 
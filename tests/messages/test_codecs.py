@@ -0,0 +1,60 @@
+import json
+
+import pytest  # type: ignore
+from lighthouse.messages.codecs import Codec, DEFAULT_CODEC, JSONCodec, PreSerialised, get_codec
+
+TEST_CONTENT = {
+    "event": {
+        "subjects": [
+            PreSerialised({"role_type": "robot", "friendly_name": "BKRB0001"}),
+            {"role_type": "sample", "friendly_name": "MCM001"},
+        ],
+        "metadata": {},
+    },
+    "lims": "LH_TEST",
+}
+
+
+def test_pre_serialised_equals_dict():
+    fragment = PreSerialised({"test key": "test value"})
+
+    assert fragment == {"test key": "test value"}
+    assert json.loads(fragment.json) == {"test key": "test value"}
+
+
+def test_pre_serialised_cannot_be_modified():
+    fragment = PreSerialised({"test key": "test value"})
+
+    with pytest.raises(TypeError):
+        fragment["test key"] = "another value"
+    with pytest.raises(TypeError):
+        fragment.update({"another key": "another value"})
+    with pytest.raises(TypeError):
+        del fragment["test key"]
+
+    assert fragment == {"test key": "test value"}
+
+
+def test_codec_is_abstract():
+    with pytest.raises(TypeError):
+        Codec()  # type: ignore
+
+
+def test_json_codec_encodes_content():
+    assert json.loads(JSONCodec().encode(TEST_CONTENT)) == TEST_CONTENT
+
+
+def test_get_codec_returns_json_codec():
+    assert get_codec("json") is DEFAULT_CODEC
+
+
+def test_get_codec_falls_back_to_json_codec():
+    assert get_codec("not a real codec") is DEFAULT_CODEC
+
+
+def test_orjson_codec_encodes_content():
+    pytest.importorskip("orjson")
+    codec = get_codec("orjson")
+
+    assert codec.name == "orjson"
+    assert json.loads(codec.encode(TEST_CONTENT)) == TEST_CONTENT
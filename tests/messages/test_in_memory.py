@@ -0,0 +1,54 @@
+import pytest  # type: ignore
+from pika.exceptions import ChannelWrongStateError, ConnectionWrongStateError  # type: ignore
+
+from lighthouse.messages.in_memory import (
+    InMemoryBlockingConnection,
+    PublishedMessage,
+    clear_published_messages,
+    declared_exchanges,
+    published_messages,
+)
+
+
+@pytest.fixture
+def in_memory_messages():
+    clear_published_messages()
+
+    yield published_messages
+
+    clear_published_messages()
+
+
+def test_in_memory_channel_publishes_message(in_memory_messages):
+    connection = InMemoryBlockingConnection()
+    channel = connection.channel()
+    channel.basic_publish(exchange="test exchange", routing_key="test key", body="test body")
+
+    assert list(in_memory_messages) == [PublishedMessage("test exchange", "test key", "test body")]
+
+
+def test_in_memory_channel_declares_exchange():
+    channel = InMemoryBlockingConnection().channel()
+    channel.exchange_declare("test exchange", exchange_type="topic")
+
+    assert declared_exchanges["test exchange"] == "topic"
+
+
+def test_in_memory_channel_publish_on_closed_connection_raises(in_memory_messages):
+    connection = InMemoryBlockingConnection()
+    channel = connection.channel()
+    connection.close()
+
+    with pytest.raises(ChannelWrongStateError):
+        channel.basic_publish(exchange="test exchange", routing_key="test key", body="test body")
+
+    assert len(in_memory_messages) == 0
+
+
+def test_in_memory_connection_close_twice_raises():
+    connection = InMemoryBlockingConnection()
+    connection.close()
+
+    assert connection.is_closed
+    with pytest.raises(ConnectionWrongStateError):
+        connection.close()
@@ -1,3 +1,4 @@
+from unittest.mock import MagicMock
 from lighthouse.messages.message import Message
 
 
@@ -24,3 +25,12 @@ def test_messages_dict_message():
 def test_messages_array_message():
     message = Message([53, "value", {"test key": "test value"}])
     assert message.payload() == '[53, "value", {"test key": "test value"}]'
+
+
+def test_messages_uses_codec():
+    codec = MagicMock()
+    codec.encode.return_value = "encoded"
+    message = Message({"test key": "test value"}, codec)
+
+    assert message.payload() == "encoded"
+    codec.encode.assert_called_with({"test key": "test value"})
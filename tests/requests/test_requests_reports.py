@@ -2,10 +2,24 @@ from http import HTTPStatus
 from unittest.mock import patch
 
 import pandas as pd
-from lighthouse.constants import FIELD_COORDINATE, FIELD_PLATE_BARCODE, FIELD_ROOT_SAMPLE_ID
+from lighthouse.constants import (
+    FIELD_COORDINATE,
+    FIELD_PLATE_BARCODE,
+    FIELD_ROOT_SAMPLE_ID,
+    REPORT_JOB_STATUS_COMPLETED,
+)
+from lighthouse.jobs.reports import run_report_job
 
 
-def test_create_report(client, samples, samples_declarations, labwhere_samples_simple):
+def test_create_report(
+    client,
+    samples,
+    samples_declarations,
+    labwhere_samples_simple,
+    report_jobs,
+    report_catalogue,
+    report_runs,
+):
     with patch(
         "lighthouse.helpers.reports.get_cherrypicked_samples",
         return_value=pd.DataFrame(
@@ -13,8 +27,55 @@ def test_create_report(client, samples, samples_declarations, labwhere_samples_s
             columns=[FIELD_ROOT_SAMPLE_ID, FIELD_PLATE_BARCODE, "Result_lower", FIELD_COORDINATE],
         ),
     ):
-        response = client.post(
-            "/reports/new",
-            content_type="application/json",
-        )
-        assert response.status_code == HTTPStatus.CREATED
+        # run the job in the foreground so that it has finished by the time the job is fetched
+        with patch(
+            "lighthouse.blueprints.reports.run_report_job_in_background",
+            side_effect=run_report_job,
+        ):
+            response = client.post(
+                "/reports/new",
+                content_type="application/json",
+            )
+            assert response.status_code == HTTPStatus.ACCEPTED
+
+        job_response = client.get(response.headers["Location"])
+        assert job_response.status_code == HTTPStatus.OK
+        assert job_response.json["job"]["status"] == REPORT_JOB_STATUS_COMPLETED
+
+
+def test_create_report_with_cherrypicked_samples_index(
+    app,
+    client,
+    tmp_path,
+    samples,
+    samples_declarations,
+    labwhere_samples_simple,
+    cherrypicked_samples,
+    report_jobs,
+    report_catalogue,
+    report_runs,
+):
+    app.config["CHERRYPICKED_SAMPLES_INDEX"] = True
+    with patch(
+        "lighthouse.jobs.reports.get_new_report_name_and_path",
+        return_value=["test.xlsx", f"{tmp_path}/test.xlsx"],
+    ):
+        with patch("lighthouse.jobs.reports.refresh_cherrypicked_samples") as mock_refresh:
+            with patch("lighthouse.helpers.reports.get_cherrypicked_samples") as mock_get:
+                # run the job in the foreground so that it has finished by the time the job is
+                # fetched
+                with patch(
+                    "lighthouse.blueprints.reports.run_report_job_in_background",
+                    side_effect=run_report_job,
+                ):
+                    response = client.post(
+                        "/reports/new",
+                        content_type="application/json",
+                    )
+                    assert response.status_code == HTTPStatus.ACCEPTED
+                    assert response.json["job"]["status"] == REPORT_JOB_STATUS_COMPLETED
+                    assert response.json["job"]["report_names"] == ["test.xlsx"]
+
+    # the index is refreshed once and the warehouses are not otherwise queried
+    mock_refresh.assert_called_once_with()
+    mock_get.assert_not_called()
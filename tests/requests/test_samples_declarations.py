@@ -1,5 +1,10 @@
 import json
+from collections import Counter
+from datetime import datetime
 from http import HTTPStatus
+from unittest.mock import patch
+
+from lighthouse.validators.samples_declarations import SamplesDeclarationsValidator
 
 TIMESTAMP = "2013-04-04T10:29:13"
 
@@ -154,6 +159,120 @@ def test_inserts_new_declarations_even_when_other_declarations_are_wrong(
             assert len(li) == 1
 
 
+def test_inserts_valid_declarations_once_and_returns_them_in_place(
+    app, client, samples, empty_data_when_finish
+):
+    with CheckNumInstancesChangeBy(app, "samples_declarations", 2):
+        response = post_authorized_create_samples_declaration(
+            client,
+            [
+                {
+                    "root_sample_id": "MCM001",
+                    "value_in_sequencing": "Yes",
+                    "declared_at": TIMESTAMP,
+                },
+                {
+                    "root_sample_id": "MCM100",
+                    "value_in_sequencing": "Yes",
+                    "declared_at": TIMESTAMP,
+                },
+                {"root_sample_id": "MCM003", "value_in_sequencing": "No", "declared_at": TIMESTAMP},
+            ],
+        )
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, response.json
+        assert response.json["_status"] == "ERR"
+        assert len(response.json["_items"]) == 3
+        assert_has_error(
+            response.json["_items"][1],
+            "root_sample_id",
+            "Sample does not exist in database: MCM100",
+        )
+
+        with app.app_context():
+            for item, root_sample_id in (
+                (response.json["_items"][0], "MCM001"),
+                (response.json["_items"][2], "MCM003"),
+            ):
+                assert item["_status"] == "OK"
+                declarations = list(
+                    app.data.driver.db.samples_declarations.find({"root_sample_id": root_sample_id})
+                )
+                assert len(declarations) == 1
+                assert item["_id"] == str(declarations[0]["_id"])
+                assert declarations[0]["declared_at"].replace(tzinfo=None) == datetime(
+                    2013, 4, 4, 10, 29, 13
+                )
+
+            latest = app.data.driver.db.samples_declarations_latest.find_one(
+                {"root_sample_id": "MCM003"}
+            )
+            assert latest["value_in_sequencing"] == "No"
+
+
+def test_processes_each_valid_declaration_once(app, client, samples, empty_data_when_finish):
+    validated = Counter()
+    inserted = Counter()
+    validate_validation_errors = SamplesDeclarationsValidator._validate_validation_errors
+
+    def count_validated(validator, validation_errors, field, value):
+        validated[value] += 1
+        return validate_validation_errors(validator, validation_errors, field, value)
+
+    def count_inserted(documents):
+        inserted.update(document["root_sample_id"] for document in documents)
+
+    with app.app_context():
+        collection_class = type(app.data.driver.db.samples_declarations)
+
+    app.on_insert_samples_declarations += count_inserted
+    try:
+        with patch.object(
+            SamplesDeclarationsValidator, "_validate_validation_errors", count_validated
+        ):
+            with patch.object(
+                collection_class,
+                "insert_many",
+                autospec=True,
+                side_effect=collection_class.insert_many,
+            ) as insert_many:
+                response = post_authorized_create_samples_declaration(
+                    client,
+                    [
+                        {
+                            "root_sample_id": "MCM001",
+                            "value_in_sequencing": "Yes",
+                            "declared_at": TIMESTAMP,
+                        },
+                        {
+                            "root_sample_id": "MCM100",
+                            "value_in_sequencing": "Yes",
+                            "declared_at": TIMESTAMP,
+                        },
+                        {
+                            "root_sample_id": "MCM003",
+                            "value_in_sequencing": "No",
+                            "declared_at": TIMESTAMP,
+                        },
+                    ],
+                )
+    finally:
+        app.on_insert_samples_declarations -= count_inserted
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, response.json
+    assert [item["_status"] for item in response.json["_items"]] == ["OK", "ERR", "OK"]
+
+    # each item is validated once, by the original request, and only the valid items are inserted,
+    # once each and in a single unordered insert
+    assert validated == {"MCM001": 1, "MCM100": 1, "MCM003": 1}
+    assert inserted == {"MCM001": 1, "MCM003": 1}
+    declarations_inserts = [
+        call for call in insert_many.call_args_list if call.args[0].name == "samples_declarations"
+    ]
+    assert len(declarations_inserts) == 1
+    assert len(declarations_inserts[0].args[1]) == 2
+    assert declarations_inserts[0].kwargs == {"ordered": False}
+
+
 def test_wrong_value_for_value_in_sequencing(
     app, client, samples, samples_declarations, empty_data_when_finish
 ):
@@ -481,3 +600,27 @@ def test_get_last_samples_declaration_for_a_root_sample_id(client, samples_decla
 
     assert response.json["_items"][0]["value_in_sequencing"] == "Yes", response.json
     assert response.json["_items"][0]["declared_at"] == "2013-04-06T10:29:13", response.json
+
+
+def test_post_new_samples_declarations_updates_latest_declarations(
+    app, client, samples, empty_data_when_finish
+):
+    items = [
+        {"root_sample_id": "MCM001", "value_in_sequencing": "Yes", "declared_at": TIMESTAMP},
+        {
+            "root_sample_id": "MCM001",
+            "value_in_sequencing": "No",
+            "declared_at": "2013-04-05T10:29:13",
+        },
+    ]
+
+    response = post_authorized_create_samples_declaration(client, items)
+    assert response.status_code == HTTPStatus.CREATED, response.json
+
+    with app.app_context():
+        latest = list(
+            app.data.driver.db.samples_declarations_latest.find({"root_sample_id": "MCM001"})
+        )
+
+    assert len(latest) == 1
+    assert latest[0]["value_in_sequencing"] == "No"
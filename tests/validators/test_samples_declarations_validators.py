@@ -1,3 +1,6 @@
+from unittest.mock import patch
+
+from lighthouse.helpers.bloom_filter import BloomFilter
 from lighthouse.validators.samples_declarations import (
     find_duplicates,
     find_non_exist_samples,
@@ -21,6 +24,31 @@ def test_find_non_exist_samples(app, samples):
         assert sorted(find_non_exist_samples(["a", "b", "c"])) == sorted(["a", "b", "c"])
 
 
+def test_find_non_exist_samples_keeps_order_without_duplicates(app, samples):
+    with app.app_context():
+        assert find_non_exist_samples(["c", "MCM001", "a", "c", "b"]) == ["c", "a", "b"]
+
+
+def test_find_non_exist_samples_only_looks_up_known_samples(app, samples):
+    known_root_sample_ids = BloomFilter(10)
+    known_root_sample_ids.update(["MCM001", "MCM100"])
+
+    with app.app_context():
+        with patch(
+            "lighthouse.validators.samples_declarations.get_known_root_sample_ids",
+            return_value=known_root_sample_ids,
+        ):
+            with patch(
+                "lighthouse.validators.samples_declarations.find_existing_root_sample_ids",
+                return_value={"MCM001"},
+            ) as find_existing:
+                assert find_non_exist_samples(["MCM001", "MCM100", "MCM003"]) == [
+                    "MCM100",
+                    "MCM003",
+                ]
+                find_existing.assert_called_once_with(["MCM001", "MCM100"])
+
+
 def test_add_flags(app):
     obj = {"root_sample_id": "1234"}
     add_flags(obj, ["1234"], "TESTING_FLAG")
@@ -52,14 +80,10 @@ def test_build_clean_elems_object(app):
 
 
 def test_merge_response_into_payload():
-    class TestPayload:
-        def __init__(self, json):
-            self.json = json
-
-    payload = TestPayload({"_items": ["good response 1", "bad response 2", "good response 3"]})
+    payload_json = {"_items": ["good response 1", "bad response 2", "good response 3"]}
     response = {"_items": ["good response A", "good response B"]}
     clean_elems = {0: "good response 1", 2: "good response 2"}
 
-    assert merge_response_into_payload(payload, response, clean_elems).json == {
+    assert merge_response_into_payload(payload_json, response, clean_elems) == {
         "_items": ["good response A", "bad response 2", "good response B"]
     }